@@ -10,7 +10,10 @@ from typing import Any, Dict, List, Optional
 import openai
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from core.media_index import ImageIndex
 
 
 app = FastAPI()
@@ -290,26 +293,40 @@ async def get_property(property_id: str):
     raise HTTPException(status_code=404, detail="Property not found")
 
 
+MEDIA_INDEX_REFRESH_SECONDS = float(os.getenv("IMAGE_INDEX_REFRESH_SECONDS", "30"))
+# e.g. "/_media" -> X-Accel-Redirect: /_media/<filename>, proxy alias pointing at media_cache
+IMAGE_ACCEL_PREFIX = os.getenv("IMAGE_ACCEL_PREFIX", "").rstrip("/")
+
+
+media_index = ImageIndex(
+    [MEDIA_CACHE_DIR],
+    MEDIA_INDEX_REFRESH_SECONDS,
+    (lambda path: f"{IMAGE_ACCEL_PREFIX}/{path.name}") if IMAGE_ACCEL_PREFIX else None,
+)
+
+
 @app.get("/api/images/{filename}")
-async def get_image(filename: str):
+async def get_image(filename: str, request: Request):
     """Serve cached property images from media_cache folder."""
-    image_path = MEDIA_CACHE_DIR / filename
-    
-    if not image_path.exists() or not image_path.is_file():
+    if Path(filename).name != filename:
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    entry = media_index.get(filename)
+    if entry is None:
         raise HTTPException(status_code=404, detail=f"Image not found: {filename}")
-    
-    # Determine content type
-    content_type = "image/jpeg"
-    if filename.lower().endswith(".png"):
-        content_type = "image/png"
-    elif filename.lower().endswith(".webp"):
-        content_type = "image/webp"
-    
-    return FileResponse(
-        image_path,
-        media_type=content_type,
-        headers={"Cache-Control": "public, max-age=31536000"}  # Cache for 1 year
-    )
+
+    etag = entry.etag() if entry.has_etag else await run_in_threadpool(entry.etag)
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (t.strip().removeprefix("W/") for t in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    if entry.accel_path:
+        headers["X-Accel-Redirect"] = entry.accel_path
+        return Response(media_type=entry.media_type, headers=headers)
+
+    # Range requests and sendfile (where the server supports it) come from FileResponse
+    return FileResponse(entry.path, media_type=entry.media_type, stat_result=entry.stat, headers=headers)
 
 
 @app.post("/api/ai-yield")
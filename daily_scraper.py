@@ -2,7 +2,7 @@
 
 from core.browser_crawler import BrowserCrawler
 from core.writer import write_to_json
-from ui.wordpress_push import push_to_wordpress
+from ui.wordpress_push import publish_listings
 import yaml
 import datetime
 import logging
@@ -35,12 +35,15 @@ def run_scraper(config_path, source_name="Rightmove"):
     summary = {
         "scraped": len(listings),
         "uploaded": 0,
+        "updated": 0,
+        "skipped": 0,
         "failed": 0,
         "fail_reasons": []
     }
 
     if listings:
         write_to_json(listings)
+        ready = []
         for listing in listings:
             title = listing.get("title", "Untitled")
 
@@ -51,31 +54,41 @@ def run_scraper(config_path, source_name="Rightmove"):
                 summary["fail_reasons"].append(reason)
                 logging.warning(reason)
                 continue
+            ready.append(listing)
 
-            try:
-                if push_to_wordpress(listing):
-                    summary["uploaded"] += 1
-                    logging.info(f"[✅] {source_name} property posted: {title}")
-                else:
-                    summary["failed"] += 1
-                    reason = f"Upload failed for '{title}'"
-                    summary["fail_reasons"].append(reason)
-                    logging.error(reason)
-            except Exception as e:
+        # 🚀 Publish concurrently (shared session, parallel media uploads); unchanged listings are skipped
+        for listing, result, error in publish_listings(ready):
+            title = listing.get("title", "Untitled")
+            if result == "skipped":
+                summary["skipped"] += 1
+            elif result == "updated":
+                summary["updated"] += 1
+                logging.info(f"[🔄] {source_name} property updated: {title}")
+            elif result:
+                summary["uploaded"] += 1
+                logging.info(f"[✅] {source_name} property posted: {title}")
+            elif error is not None:
+                summary["failed"] += 1
+                reason = f"Exception for '{title}': {str(error)}"
+                summary["fail_reasons"].append(reason)
+                logging.error(reason, exc_info=error)
+            else:
                 summary["failed"] += 1
-                reason = f"Exception for '{title}': {str(e)}"
+                reason = f"Upload failed for '{title}'"
                 summary["fail_reasons"].append(reason)
-                logging.exception(reason)
+                logging.error(reason)
 
     # 📊 Print summary
     print("\n📊 Scraper Summary")
     print(f"🏡 Total scraped: {summary['scraped']}")
     print(f"✅ Uploaded: {summary['uploaded']}")
+    print(f"🔄 Updated: {summary['updated']}")
+    print(f"⏭️ Unchanged: {summary['skipped']}")
     print(f"❌ Failed: {summary['failed']}")
     for reason in summary["fail_reasons"]:
         print("   -", reason)
 
-    logging.info(f"📊 {source_name} Summary - Scraped: {summary['scraped']}, Uploaded: {summary['uploaded']}, Failed: {summary['failed']}")
+    logging.info(f"📊 {source_name} Summary - Scraped: {summary['scraped']}, Uploaded: {summary['uploaded']}, Updated: {summary['updated']}, Unchanged: {summary['skipped']}, Failed: {summary['failed']}")
 
 if __name__ == "__main__":
     logging.info("🚀 Starting Daily Scraper Run")
@@ -0,0 +1,147 @@
+"""
+Local stub of the WordPress REST endpoints used by ui/wordpress_push.py and
+ui/image_helper.py, for exercising the publishing stage offline.
+
+    uvicorn devtools.stub_wordpress:app --port 8766
+    WP_BASE_URL=http://127.0.0.1:8766 python daily_scraper.py
+
+Behaviour is configured with environment variables:
+
+    STUB_LATENCY            seconds added to every request (default 0.2)
+    STUB_FAILURE_RATE       probability of answering 500 before doing anything (default 0)
+    STUB_LOST_RESPONSE_RATE probability of doing the work and *then* answering 500,
+                            like a timeout after WordPress committed (default 0)
+
+GET /stub/stats reports request counts, bytes received and duplicate slugs, so
+retries that created a second post or media item show up.
+"""
+import asyncio
+import os
+import random
+import re
+from collections import Counter
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="WordPress REST stub")
+
+LATENCY = float(os.getenv("STUB_LATENCY", "0.2"))
+FAILURE_RATE = float(os.getenv("STUB_FAILURE_RATE", "0"))
+LOST_RESPONSE_RATE = float(os.getenv("STUB_LOST_RESPONSE_RATE", "0"))
+
+MEDIA = {}
+POSTS = {}
+STATS = Counter()
+_next_id = [100]
+
+
+def _new_id():
+    _next_id[0] += 1
+    return _next_id[0]
+
+
+def _slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", (text or "").lower()).strip("-") or "untitled"
+
+
+def _unique_slug(slug, taken, kind):
+    """WordPress appends -2, -3, ... to clashing slugs; count those as duplicates."""
+    candidate, n = slug, 1
+    while candidate in taken:
+        n += 1
+        candidate = f"{slug}-{n}"
+    if n > 1:
+        STATS[f"duplicate_{kind}"] += 1
+    return candidate
+
+
+async def _before(kind):
+    STATS[f"{kind}_requests"] += 1
+    await asyncio.sleep(LATENCY * random.uniform(0.5, 1.5))
+    if random.random() < FAILURE_RATE:
+        STATS["injected_failures"] += 1
+        raise HTTPException(status_code=500, detail="stub failure")
+
+
+def _after(body, status_code=201):
+    if random.random() < LOST_RESPONSE_RATE:
+        STATS["lost_responses"] += 1
+        return JSONResponse({"code": "stub_lost_response"}, status_code=500)
+    return JSONResponse(body, status_code=status_code)
+
+
+@app.post("/wp-json/wp/v2/media")
+async def create_media(request: Request):
+    await _before("media")
+    disposition = request.headers.get("content-disposition", "")
+    match = re.search(r'filename="?([^";]+)"?', disposition)
+    filename = match.group(1) if match else "upload.jpeg"
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+    if size == 0:
+        raise HTTPException(status_code=400, detail="empty upload")
+    STATS["media_bytes"] += size
+
+    media_id = _new_id()
+    slug = _unique_slug(_slugify(filename.rsplit(".", 1)[0]), {m["slug"] for m in MEDIA.values()}, "media")
+    MEDIA[media_id] = {
+        "id": media_id,
+        "slug": slug,
+        "title": {"rendered": filename},
+        "source_url": f"http://stub/wp-content/uploads/{filename}",
+        "media_details": {"filesize": size},
+        "mime_type": request.headers.get("content-type"),
+    }
+    return _after(MEDIA[media_id])
+
+
+@app.get("/wp-json/wp/v2/media")
+async def list_media(search: str = "", slug: str = ""):
+    await _before("lookup")
+    found = [
+        m for m in MEDIA.values()
+        if (not slug or m["slug"] == slug) and (not search or search.lower() in m["title"]["rendered"].lower())
+    ]
+    return found[:100]
+
+
+@app.post("/wp-json/wp/v2/ukproperty")
+async def create_post(request: Request):
+    await _before("post")
+    body = await request.json()
+    post_id = _new_id()
+    slug = _unique_slug(body.get("slug") or _slugify(body.get("title")), {p["slug"] for p in POSTS.values()}, "posts")
+    POSTS[post_id] = {**body, "id": post_id, "slug": slug}
+    return _after(POSTS[post_id])
+
+
+@app.get("/wp-json/wp/v2/ukproperty")
+async def list_posts(slug: str = "", status: str = "publish"):
+    await _before("lookup")
+    return [p for p in POSTS.values() if not slug or p["slug"] == slug]
+
+
+@app.api_route("/wp-json/wp/v2/ukproperty/{post_id}", methods=["POST", "PUT", "PATCH"])
+async def update_post(post_id: int, request: Request):
+    await _before("update")
+    if post_id not in POSTS:
+        raise HTTPException(status_code=404, detail="rest_post_invalid_id")
+    body = await request.json()
+    acf = {**POSTS[post_id].get("acf", {}), **body.pop("acf", {})}
+    POSTS[post_id].update(body, acf=acf)
+    return _after(POSTS[post_id], status_code=200)
+
+
+@app.get("/wp-json/wp/v2/ukproperty/{post_id}")
+async def get_post(post_id: int):
+    await _before("lookup")
+    if post_id not in POSTS:
+        raise HTTPException(status_code=404, detail="rest_post_invalid_id")
+    return POSTS[post_id]
+
+
+@app.get("/stub/stats")
+async def stats():
+    return {**STATS, "posts": len(POSTS), "media": len(MEDIA)}
@@ -3,7 +3,7 @@ import Image from 'next/image';
 import { useState } from 'react';
 import { Property } from '@/types/property';
 import { formatPrice } from '@/lib/formatUtils';
-import { normalizeImageUrl, getFallbackImage } from '@/lib/imageUtils';
+import { normalizeImageUrl, getFallbackImage, getImageVariants, buildSrcSet } from '@/lib/imageUtils';
 
 interface PropertyCardProps {
   property: Property;
@@ -51,10 +51,32 @@ export default function PropertyCard({ property, showEnquire = true, onEnquire }
   const isBackendImage = imgSrc.includes('/api/images/');
   const useRegularImg = isRightmoveImage || isBackendImage;
 
+  // Pre-generated AVIF/WebP variants (from the crawler) for the current image
+  const variants = !useFallback ? getImageVariants(currentImage, property.imageVariants) : undefined;
+  const avifSrcSet = variants ? buildSrcSet(variants, 'avif') : undefined;
+  const webpSrcSet = variants ? buildSrcSet(variants, 'webp') : undefined;
+  const cardSizes = '(max-width: 768px) 100vw, (max-width: 1200px) 50vw, 33vw';
+
   return (
     <div className="bg-card-bg rounded-2xl overflow-hidden shadow-md hover:shadow-lg transition-all duration-300 hover:scale-[1.02]">
       <div className="relative h-[220px] w-full bg-gray-200">
-        {useRegularImg ? (
+        {variants ? (
+          <picture>
+            {avifSrcSet && <source type="image/avif" srcSet={avifSrcSet} sizes={cardSizes} />}
+            {webpSrcSet && <source type="image/webp" srcSet={webpSrcSet} sizes={cardSizes} />}
+            <img
+              src={imgSrc}
+              alt={property.title}
+              width={variants.width}
+              height={variants.height}
+              loading="lazy"
+              decoding="async"
+              className="w-full h-full object-cover"
+              style={{ backgroundImage: `url(${variants.lqip})`, backgroundSize: 'cover' }}
+              onError={handleImageError}
+            />
+          </picture>
+        ) : useRegularImg ? (
           <img
             src={imgSrc}
             alt={property.title}
@@ -67,7 +89,7 @@ export default function PropertyCard({ property, showEnquire = true, onEnquire }
             alt={property.title}
             fill
             className="object-cover"
-            sizes="(max-width: 768px) 100vw, (max-width: 1200px) 50vw, 33vw"
+            sizes={cardSizes}
             onError={handleImageError}
           />
         )}
@@ -67,6 +67,7 @@ function normalizeProperty(data: any): Property {
       ? Number(data.estimatedRent) * 12
       : undefined,
     features: Array.isArray(data.features) ? data.features : undefined,
+    imageVariants: data.imageVariants && typeof data.imageVariants === 'object' ? data.imageVariants : undefined,
   };
 }
 
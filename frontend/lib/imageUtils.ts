@@ -3,6 +3,7 @@
  */
 import { FALLBACK_IMAGES } from './constants';
 import { SCRAPER_API_BASE_URL } from './constants';
+import { ImageVariants } from '@/types/property';
 
 /**
  * Get a unique fallback image based on property ID
@@ -98,3 +99,24 @@ export function processPropertyImages(
   return deduped.length > 0 ? deduped : getFallbackImageSet(propertyId, 4);
 }
 
+
+/**
+ * Look up pre-generated variants for an image URL ("/images/x.jpeg", "x.jpeg", ...)
+ */
+export function getImageVariants(
+  url: string | null | undefined,
+  variants: Record<string, ImageVariants> | undefined
+): ImageVariants | undefined {
+  if (!url || !variants) return undefined;
+  const filename = url.split('/').pop()?.split('?')[0];
+  return filename ? variants[filename] : undefined;
+}
+
+/**
+ * Build a srcset string ("{url} 160w, {url} 320w") for one variant format
+ */
+export function buildSrcSet(variants: ImageVariants, format: 'avif' | 'webp'): string | undefined {
+  const sources = variants.sources[format];
+  if (!sources || sources.length === 0) return undefined;
+  return sources.map(s => `${normalizeImageUrl(s.file)} ${s.w}w`).join(', ');
+}
@@ -1,3 +1,17 @@
+export type ImageVariantSource = {
+  file: string;
+  w: number;
+};
+
+/** Responsive variants pre-generated by the crawler for one cached image. */
+export type ImageVariants = {
+  src: string;
+  width: number;
+  height: number;
+  lqip: string;
+  sources: Partial<Record<'avif' | 'webp', ImageVariantSource[]>>;
+};
+
 export type Property = {
   id: string;
   title: string;
@@ -19,6 +33,7 @@ export type Property = {
   estimatedMonthlyRent?: number;
   estimatedAnnualRent?: number;
   features?: string[];
+  imageVariants?: Record<string, ImageVariants>;
 };
 
 export interface PropertyFilters {
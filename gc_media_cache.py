@@ -0,0 +1,223 @@
+"""Garbage-collect media_cache: drop images no listing references and collapse duplicates.
+
+The live set is every image referenced by the newest export of each family in
+data/exports (rightmove_*, rightmove_matched_*, ...): matched image_path /
+image_paths, the thumbnail filenames the crawler derives from image URLs, and
+any pre-generated imageVariants files.
+
+  * Unreferenced images older than ``--grace-hours`` are deleted.
+  * Live images with identical bytes (same size + SHA-256) are hardlinked to a
+    single copy, so filenames referenced by listings keep working.
+  * Live near-duplicates (dHash within ``--max-distance`` bits, e.g. the same
+    agent photo re-encoded) are reported, and hardlinked to the largest copy
+    with ``--link-near``.
+
+Run with ``--dry-run`` first to see what would change.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from core.image_hash import IMAGE_EXTENSIONS, HashStore
+
+EXPORTS_DIR = Path("data/exports")
+MEDIA_CACHE_DIR = Path("media_cache")
+VARIANT_EXTENSIONS = IMAGE_EXTENSIONS + (".avif",)
+
+_TIMESTAMP_RE = re.compile(r"_\d{8}(_\d{4})?$")
+_VARIANT_RE = re.compile(r"^(.*)\.w\d+$")  # "{filename}.w{width}.{fmt}", see core/image_variants.py
+
+
+def latest_exports(exports_dir=EXPORTS_DIR):
+    """Newest export file per family (name with the trailing timestamp removed)."""
+    families = {}
+    for path in sorted(Path(exports_dir).glob("rightmove_*.json")):
+        family = _TIMESTAMP_RE.sub("", path.stem)
+        families[family] = path  # sorted, so the last one per family wins
+    return sorted(families.values())
+
+
+def _basename(ref):
+    return re.split(r"[\\/]", ref.split("?")[0])[-1] if ref else None
+
+
+def live_images(export_files):
+    """Filenames in media_cache referenced by any listing in ``export_files``."""
+    live = set()
+    for path in export_files:
+        with open(path, "r", encoding="utf-8") as f:
+            properties = json.load(f)
+        for prop in properties:
+            refs = [prop.get("image_path"), prop.get("image")]
+            refs += list(prop.get("image_paths") or []) + list(prop.get("images") or [])
+            for ref in refs:
+                if not ref:
+                    continue
+                live.add(_basename(ref))
+                if "max_1024x768" in ref:  # crawler caches the thumbnail size
+                    live.add(_basename(ref.replace("max_1024x768", "max_476x317")))
+            for variants in (prop.get("imageVariants") or {}).values():
+                live.add(variants.get("src"))
+                for entries in variants.get("sources", {}).values():
+                    live.update(entry["file"] for entry in entries)
+    live.discard(None)
+    return live
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def exact_duplicates(entries):
+    """Groups of same-content files (only files sharing a size are hashed). Hardlinks count once."""
+    by_size = defaultdict(list)
+    for entry in entries:
+        by_size[entry.stat().st_size].append(entry)
+    groups = []
+    for same_size in by_size.values():
+        if len(same_size) < 2:
+            continue
+        by_digest = defaultdict(dict)
+        for entry in same_size:
+            inode = entry.stat().st_ino
+            digest = _sha256(entry.path)
+            by_digest[digest].setdefault(inode, []).append(entry.name)
+        for inodes in by_digest.values():
+            if len(inodes) > 1:
+                groups.append(sorted(sorted(names) for names in inodes.values()))
+    return groups
+
+
+def near_duplicates(names, store, max_distance):
+    """Clusters of perceptually identical, same-format images among ``names`` (single-link via the BK-tree)."""
+    names = [n for n in names if n in store.files]
+    tree = store.file_tree()
+    wanted = set(names)
+    parent = {n: n for n in names}
+
+    def find(n):
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    for name in names:
+        for _, other in tree.search(store.files[name]["dhash"], max_distance):
+            if other in wanted and Path(other).suffix.lower() == Path(name).suffix.lower():
+                parent[find(other)] = find(name)
+
+    clusters = defaultdict(list)
+    for name in names:
+        clusters[find(name)].append(name)
+    return [sorted(c) for c in clusters.values() if len(c) > 1]
+
+
+def _hardlink(canonical, target):
+    """Replace ``target`` with a hardlink to ``canonical`` atomically."""
+    tmp = target.with_name(f".{target.name}.gc.tmp")
+    os.link(canonical, tmp)
+    os.replace(tmp, target)
+
+
+def gc_media_cache(media_dir=MEDIA_CACHE_DIR, exports_dir=EXPORTS_DIR, dry_run=False,
+                   grace_hours=24, link_near=False, max_distance=2):
+    media_dir = Path(media_dir)
+    if not media_dir.exists():
+        print("❌ media_cache directory not found!")
+        return None
+    export_files = latest_exports(exports_dir)
+    if not export_files:
+        print("❌ No JSON export files found - refusing to treat every image as garbage")
+        return None
+
+    live = live_images(export_files)
+    print(f"📂 Live set from {len(export_files)} exports: {len(live)} referenced images")
+
+    entries = [e for e in os.scandir(media_dir) if e.is_file() and e.name.lower().endswith(VARIANT_EXTENSIONS)]
+    cutoff = time.time() - grace_hours * 3600
+    stats = {"scanned": len(entries), "deleted": 0, "linked": 0, "near_clusters": 0, "bytes_freed": 0}
+
+    # 1. Unreferenced images (kept while younger than the grace period: a crawl may be mid-run).
+    #    Responsive variants live as long as their source image does.
+    live_entries = []
+    for entry in entries:
+        variant = _VARIANT_RE.match(Path(entry.name).stem)
+        if entry.name in live or (variant and variant.group(1) in live):
+            live_entries.append(entry)
+            continue
+        stat = entry.stat()
+        if stat.st_mtime > cutoff:
+            live_entries.append(entry)
+            continue
+        if not dry_run:
+            os.remove(entry.path)
+        stats["deleted"] += 1
+        if stat.st_nlink == 1:
+            stats["bytes_freed"] += stat.st_size
+    print(f"[🗑️] {'Would delete' if dry_run else 'Deleted'} {stats['deleted']} unreferenced images")
+
+    # 2. Byte-identical live images -> one inode
+    for group in exact_duplicates(live_entries):
+        canonical = media_dir / group[0][0]
+        for names in group[1:]:
+            for name in names:
+                if not dry_run:
+                    _hardlink(canonical, media_dir / name)
+                stats["linked"] += 1
+            stats["bytes_freed"] += canonical.stat().st_size  # one fewer inode of this size
+    print(f"[🔗] {'Would hardlink' if dry_run else 'Hardlinked'} {stats['linked']} byte-identical duplicates")
+
+    # 3. Perceptual near-duplicates among what is left
+    store = HashStore()
+    store.refresh_files(media_dir)
+    if not dry_run:
+        store.save()
+    # Variants are downscaled copies of their source by design, so only source images are compared.
+    sources = [
+        e.name for e in live_entries
+        if os.path.exists(e.path) and not _VARIANT_RE.match(Path(e.name).stem)
+    ]
+    clusters = near_duplicates(sources, store, max_distance)
+    stats["near_clusters"] = len(clusters)
+    for cluster in clusters:
+        paths = [media_dir / name for name in cluster]
+        inodes = {p.stat().st_ino for p in paths}
+        if len(inodes) == 1:
+            continue
+        keep = max(paths, key=lambda p: p.stat().st_size)  # largest = least compressed
+        print(f"[≈] {len(cluster)} near-duplicates of {keep.name}: {', '.join(cluster[:4])}{' ...' if len(cluster) > 4 else ''}")
+        if not link_near:
+            continue
+        for path in paths:
+            if path.stat().st_ino == keep.stat().st_ino:
+                continue
+            if path.stat().st_nlink == 1:
+                stats["bytes_freed"] += path.stat().st_size
+            if not dry_run:
+                _hardlink(keep, path)
+            stats["linked"] += 1
+
+    print(f"📊 Scanned {stats['scanned']}, deleted {stats['deleted']}, linked {stats['linked']}, "
+          f"{stats['near_clusters']} near-duplicate clusters, {stats['bytes_freed'] / 1e6:.1f} MB "
+          f"{'reclaimable' if dry_run else 'freed'}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without touching files")
+    parser.add_argument("--grace-hours", type=float, default=24, help="never delete images newer than this")
+    parser.add_argument("--link-near", action="store_true", help="also hardlink perceptual near-duplicates")
+    parser.add_argument("--max-distance", type=int, default=2, help="dHash bits for near-duplicates")
+    args = parser.parse_args()
+    gc_media_cache(dry_run=args.dry_run, grace_hours=args.grace_hours,
+                   link_near=args.link_near, max_distance=args.max_distance)
@@ -0,0 +1,132 @@
+"""Match cached images in media_cache to listings by perceptual hash.
+
+Replaces the filename-prefix heuristics of match_all_images.py,
+match_cached_images.py and match_existing_images_only.py (now thin wrappers
+around this module). For every listing image URL we look for a cached
+thumbnail with the same filename first; otherwise the URL's dHash is looked
+up in a BK-tree of cached-image hashes and the nearest image within
+``max_distance`` bits wins. A cached image is assigned to at most one
+listing (closest match first), and unmatched listings are left without
+images instead of being handed someone else's photos.
+
+Hashes are persisted in data/image_hashes.json, so re-runs only hash
+images (and download URLs) that are new since the last run.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from core.image_hash import SAME_PHOTO_DISTANCE, HashStore
+
+EXPORTS_DIR = Path("data/exports")
+MEDIA_CACHE_DIR = Path("media_cache")
+DEFAULT_MAX_DISTANCE = SAME_PHOTO_DISTANCE
+
+
+def _latest_original_export():
+    files = [f for f in sorted(EXPORTS_DIR.glob("rightmove_*.json")) if "matched" not in f.name]
+    return files[-1] if files else None
+
+
+def _thumb_url(url):
+    return url.replace("max_1024x768", "max_476x317")
+
+
+def _listing_urls(prop):
+    urls = []
+    for url in [prop.get("image")] + list(prop.get("images") or []):
+        if url and url.startswith("http") and _thumb_url(url) not in urls:
+            urls.append(_thumb_url(url))
+    return urls
+
+
+def match_images(export_path=None, output_prefix="rightmove_matched_verified", max_distance=DEFAULT_MAX_DISTANCE, workers=8):
+    export_path = Path(export_path) if export_path else _latest_original_export()
+    if not export_path or not export_path.exists():
+        print("❌ No original JSON export files found!")
+        return None
+    if not MEDIA_CACHE_DIR.exists():
+        print("❌ media_cache directory not found!")
+        return None
+
+    print(f"📂 Loading: {export_path}")
+    with open(export_path, "r", encoding="utf-8") as f:
+        properties = json.load(f)
+
+    store = HashStore()
+    newly_hashed = store.refresh_files(MEDIA_CACHE_DIR)
+    print(f"📸 {len(store.files)} cached images ({newly_hashed} newly hashed)")
+    tree = store.file_tree()
+
+    # Hash listing URLs whose thumbnail isn't already cached under the same name
+    to_fetch = {
+        url
+        for prop in properties
+        for url in _listing_urls(prop)
+        if url.split("/")[-1].split("?")[0] not in store.files and url not in store.urls
+    }
+    if to_fetch:
+        print(f"🌐 Hashing {len(to_fetch)} new listing image URLs...")
+        with requests.Session() as session, ThreadPoolExecutor(max_workers=workers) as pool:
+            hashes = list(pool.map(lambda u: (u, store.url_hash(u, session)), sorted(to_fetch)))
+        print(f"   {sum(1 for _, h in hashes if h is not None)}/{len(hashes)} hashed")
+    store.save()
+
+    # Candidate (distance, property index, url position, cached filename) pairs
+    candidates = []
+    for p_idx, prop in enumerate(properties):
+        for u_idx, url in enumerate(_listing_urls(prop)):
+            filename = url.split("/")[-1].split("?")[0]
+            if filename in store.files:
+                candidates.append((0, p_idx, u_idx, filename))
+                continue
+            value = store.urls.get(url)
+            if value is None:
+                continue
+            for distance, name in tree.search(value, max_distance)[:3]:
+                candidates.append((distance, p_idx, u_idx, name))
+
+    # Greedy assignment, closest first: each cached image and listing slot used once
+    candidates.sort()
+    taken_files, taken_slots = set(), set()
+    assigned = {}
+    for distance, p_idx, u_idx, name in candidates:
+        if name in taken_files or (p_idx, u_idx) in taken_slots:
+            continue
+        taken_files.add(name)
+        taken_slots.add((p_idx, u_idx))
+        assigned.setdefault(p_idx, []).append((u_idx, name))
+
+    matched_count = 0
+    for p_idx, prop in enumerate(properties):
+        names = [name for _, name in sorted(assigned.get(p_idx, []))]
+        if names:
+            prop["image_path"] = os.path.join("media_cache", names[0])
+            prop["image_paths"] = [os.path.join("media_cache", n) for n in names]
+            matched_count += 1
+            print(f"✅ Matched {len(names)} images to: {prop.get('title', 'Unknown')[:50]}")
+        else:
+            prop.pop("image_path", None)
+            prop["image_paths"] = []
+
+    timestamp = export_path.stem.split("_", 1)[1] if "_" in export_path.stem else "updated"
+    output_file = EXPORTS_DIR / f"{output_prefix}_{timestamp}.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(properties, f, indent=2, ensure_ascii=False)
+
+    print(f"\n💾 Saved matched data to: {output_file}")
+    print(f"📊 Final stats: {matched_count} properties with images, {len(properties) - matched_count} without")
+    return output_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("export", nargs="?", help="export JSON (default: latest original export)")
+    parser.add_argument("--max-distance", type=int, default=DEFAULT_MAX_DISTANCE)
+    parser.add_argument("--output-prefix", default="rightmove_matched_verified")
+    args = parser.parse_args()
+    match_images(args.export, output_prefix=args.output_prefix, max_distance=args.max_distance)
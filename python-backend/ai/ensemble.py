@@ -0,0 +1,196 @@
+# ai/ensemble.py
+"""
+Parallel multi-model AI yield ensemble.
+
+Every model is queried concurrently against an OpenAI-compatible
+``/chat/completions`` endpoint (OpenRouter in production, a local stub in
+development, see ``devtools/stub_openai.py``). Latency is bounded at three levels:
+
+- hedging: if a model hasn't answered after ``hedge_after`` seconds (or its
+  first attempt fails) a second, identical request is fired and whichever
+  succeeds first wins;
+- per-model timeout: a model that still hasn't answered after
+  ``model_timeout`` seconds is reported as timed out;
+- global deadline: after ``deadline`` seconds the ensemble returns whatever
+  has answered and cancels the rest, so the slowest model never sets the
+  response time.
+
+Per-model latency and outcome counters are kept in ``ModelStats``.
+"""
+import asyncio
+import statistics
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from ai.yield_prompts import parse_reply
+from core.metrics import observe_upstream
+
+MODELS = [
+    "openai/gpt-4.1",
+    "openai/gpt-4.1-2025-04-14",
+    "anthropic/claude-3-opus",
+    "anthropic/claude-3.7-sonnet",
+    "meta-llama/llama-3.3-70b-instruct",
+    "mistralai/mistral-large-2411",
+    "google/gemini-2.0-flash-001",
+]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class ModelStats:
+    """Rolling latency window and outcome counters for one model."""
+
+    def __init__(self, window: int = 500):
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.deadline_misses = 0
+        self.hedges = 0
+        self.latencies_ms: deque = deque(maxlen=window)
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies_ms)
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "deadline_misses": self.deadline_misses,
+            "hedges": self.hedges,
+            "success_rate": round(self.successes / self.requests, 3) if self.requests else None,
+            "p50_ms": _percentile(ordered, 50),
+            "p95_ms": _percentile(ordered, 95),
+        }
+
+
+class YieldEnsemble:
+    def __init__(
+        self,
+        http: httpx.AsyncClient,
+        base_url: str,
+        api_key: Optional[str],
+        models: Optional[List[str]] = None,
+        deadline: float = 8.0,
+        model_timeout: float = 6.0,
+        hedge_after: Optional[float] = 2.5,
+    ):
+        self.http = http
+        self.base_url = base_url.rstrip("/")
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "HTTP-Referer": "http://localhost",
+            "X-Title": "uk-property-ai",
+        }
+        self.models = list(models or MODELS)
+        self.deadline = deadline
+        self.model_timeout = model_timeout
+        self.hedge_after = hedge_after
+        self.stats: Dict[str, ModelStats] = {m: ModelStats() for m in self.models}
+
+    async def _call(self, model: str, prompt: str) -> Dict[str, Any]:
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 256,
+            "temperature": 0.3,
+        }
+        started = time.perf_counter()
+        try:
+            resp = await self.http.post(f"{self.base_url}/chat/completions", headers=self.headers, json=payload)
+            resp.raise_for_status()
+            content = resp.json()["choices"][0]["message"]["content"]
+        except asyncio.CancelledError:
+            # Lost a hedge race or hit the deadline: neither a success nor an error
+            raise
+        except Exception as e:
+            observe_upstream("ensemble", model, started, e)
+            raise
+        observe_upstream("ensemble", model, started)
+        return parse_reply(content)
+
+    async def _first_success(self, model: str, prompt: str, attempts: List["asyncio.Task"]) -> Dict[str, Any]:
+        pending = set(attempts)
+        hedged = self.hedge_after is None
+        last_error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=None if hedged else self.hedge_after,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+            if not hedged and (not done or not pending):
+                # Hedge: the first attempt is slow (or already failed), so
+                # race a duplicate request instead of waiting on it alone
+                hedged = True
+                self.stats[model].hedges += 1
+                hedge = asyncio.ensure_future(self._call(model, prompt))
+                attempts.append(hedge)
+                pending.add(hedge)
+        raise last_error or RuntimeError("no attempt completed")
+
+    async def _query(self, model: str, prompt: str) -> Dict[str, Any]:
+        stats = self.stats[model]
+        stats.requests += 1
+        started = time.perf_counter()
+        attempts = [asyncio.ensure_future(self._call(model, prompt))]
+        try:
+            obj = await asyncio.wait_for(self._first_success(model, prompt, attempts), timeout=self.model_timeout)
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            stats.successes += 1
+            stats.latencies_ms.append(latency_ms)
+            return {**obj, "model": model, "latency_ms": latency_ms}
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            return {"model": model, "error": f"timed out after {self.model_timeout}s"}
+        except asyncio.CancelledError:
+            stats.deadline_misses += 1
+            raise
+        except Exception as e:
+            stats.errors += 1
+            return {"model": model, "error": str(e)}
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    async def run(self, prompt: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Query all models; return aggregated and per-model results within the deadline."""
+        deadline = self.deadline if deadline is None else min(deadline, self.deadline)
+        started = time.perf_counter()
+        tasks = {asyncio.ensure_future(self._query(m, prompt)): m for m in self.models}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        per_model = [task.result() for task in done]
+        per_model += [{"model": tasks[task], "error": f"missed {deadline}s deadline"} for task in pending]
+        per_model.sort(key=lambda r: self.models.index(r["model"]))
+
+        predicted = [r["predicted_yield"] for r in per_model if isinstance(r.get("predicted_yield"), (int, float))]
+        return {
+            "average_predicted_yield": round(sum(predicted) / len(predicted), 2) if predicted else None,
+            "median_predicted_yield": round(statistics.median(predicted), 2) if predicted else None,
+            "models_answered": len(predicted),
+            "models_total": len(self.models),
+            "partial": len(predicted) < len(self.models),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "per_model": per_model,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return {model: stats.snapshot() for model, stats in self.stats.items()}
@@ -0,0 +1,126 @@
+# ai/response_cache.py
+"""
+In-process caching for AI yield responses.
+
+- ``TTLCache``: LRU-bounded mapping whose entries expire after ``ttl`` seconds.
+- ``SingleFlight``: collapses concurrent calls for the same key onto one
+  in-flight coroutine, so N identical requests cost one upstream call.
+- ``yield_cache_key``: normalises an /api/ai-yield payload so trivially
+  different inputs (case, whitespace, £1k price differences) share an entry.
+"""
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+PRICE_BAND = 10000
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 2048, ttl: float = 6 * 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        # Keys whose call a second caller joined
+        self._shared: Set[Hashable] = set()
+
+    def get(self, key: Hashable) -> "Optional[asyncio.Future[Any]]":
+        return self._inflight.get(key)
+
+    def join(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> "asyncio.Future[Any]":
+        """
+        The in-flight call for ``key``, starting ``fn()`` if there is none.
+        Registers it before returning, so callers that start several calls at
+        once (a batch prompt answering many keys) can't race a concurrent caller.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._done(key))
+        else:
+            self._shared.add(key)
+        return task
+
+    def _done(self, key: Hashable) -> None:
+        self._inflight.pop(key, None)
+        self._shared.discard(key)
+
+    def shared(self, key: Hashable) -> bool:
+        """Whether a caller besides the one that started it is waiting on ``key``."""
+        return key in self._shared
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn()`` once per key at a time; concurrent callers await the same result.
+
+        The shared task is shielded, so one caller disconnecting does not cancel
+        the upstream call for everyone else waiting on it.
+        """
+        return await asyncio.shield(self.join(key, fn))
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+def _norm_text(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def price_band(purchase_price: Any) -> Optional[int]:
+    """Midpoint of the PRICE_BAND-wide band containing the price, e.g. 84,500 -> 85,000."""
+    try:
+        price = float(str(purchase_price).replace(",", "").replace("£", ""))
+    except (TypeError, ValueError):
+        return None
+    if price <= 0:
+        return None
+    return int(price // PRICE_BAND) * PRICE_BAND + PRICE_BAND // 2
+
+
+def yield_cache_key(data: Dict[str, Any]) -> Tuple[Any, ...]:
+    try:
+        bedrooms: Optional[int] = int(data.get("bedrooms"))
+    except (TypeError, ValueError):
+        bedrooms = None
+    return (
+        _norm_text(data.get("location")),
+        _norm_text(data.get("property_type")),
+        bedrooms,
+        _norm_text(data.get("strategy")),
+        price_band(data.get("purchase_price")),
+    )
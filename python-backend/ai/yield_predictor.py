@@ -1,44 +1,416 @@
 # ai/yield_predictor.py
+"""
+Local, deterministic UK buy-to-let yield model.
+
+Monthly rent is modelled in log space as a regression over purchase price,
+bedrooms and property type, plus a per-outcode offset table (with a per-city
+fallback) that captures local rent levels:
+
+    log(rent) = intercept + b_price * log(price) + b_beds * beds
+                + type[property_type] + outcode[outcode] (or city[city])
+
+Gross yield is then ``12 * rent / price``. Parameters are plain JSON so they
+can be fitted once from our own listings and shared between the scraper and
+the API. Single estimates are pure-Python arithmetic; ``estimate_batch``
+scores a whole dataset with numpy in one pass.
+"""
+import json
+import math
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+YIELD_PARAMS_FILE = Path(__file__).resolve().parents[1] / "config" / "yield_model.json"
+
+PROPERTY_TYPES = ("flat", "terraced", "semi-detached", "detached", "bungalow", "other")
+
+HIGH_YIELD_THRESHOLD = 7.0
+
+# Priors used until the model has been fitted on observed rents. Calibrated so a
+# £150k 2-bed flat rents for ~£850 pcm (≈6.8% gross); the city offsets keep the
+# direction of the old rule-based predictor (north-west high, London low yield).
+DEFAULT_PARAMS: Dict[str, Any] = {
+    "version": 1,
+    "intercept": 1.142,
+    "log_price": 0.45,
+    "beds": 0.12,
+    "type": {
+        "flat": 0.0,
+        "terraced": 0.02,
+        "semi-detached": 0.04,
+        "detached": 0.06,
+        "bungalow": 0.0,
+        "other": 0.0,
+    },
+    "outcode": {},
+    "city": {
+        "manchester": 0.05,
+        "liverpool": 0.08,
+        "leeds": 0.03,
+        "london": 0.2,
+    },
+    "high_yield_threshold": HIGH_YIELD_THRESHOLD,
+    "n_obs": 0,
+}
+
+# Shrinkage used when fitting: coefficients are pulled towards the priors and
+# sparse outcodes towards zero, so a handful of rents can't swing the model.
+RIDGE_LAMBDA = 5.0
+OFFSET_SHRINKAGE = 3.0
+
+_OUTCODE_RE = re.compile(r"\b([A-Z]{1,2}\d[A-Z\d]?)(?:\s*\d[A-Z]{2})?\b")
+_TYPE_ORDER = PROPERTY_TYPES[1:]  # "flat" is the regression baseline
+
+
+@lru_cache(maxsize=65536)
+def outcode_of(postcode: Optional[str]) -> Optional[str]:
+    """Return the outcode of a full or partial UK postcode, e.g. 'M14 5AB' -> 'M14'."""
+    if not postcode:
+        return None
+    match = _OUTCODE_RE.search(str(postcode).upper())
+    return match.group(1) if match else None
+
+
+@lru_cache(maxsize=1024)
+def normalise_property_type(raw: Optional[str]) -> str:
+    """Map free-text Rightmove property types onto PROPERTY_TYPES."""
+    text = str(raw or "").lower()
+    if any(word in text for word in ("flat", "apartment", "maisonette", "studio", "penthouse")):
+        return "flat"
+    if "semi" in text:
+        return "semi-detached"
+    if "terrace" in text or "town house" in text or "townhouse" in text:
+        return "terraced"
+    if "bungalow" in text:
+        return "bungalow"
+    if "detached" in text:
+        return "detached"
+    return "other"
+
+
+def _observed_rent(item: Dict[str, Any]) -> Optional[float]:
+    """Monthly rent actually observed for a listing (never one we estimated)."""
+    if item.get("yieldSource") == "model":
+        return None
+    for key in ("rent_pcm", "monthlyRent", "estimatedMonthlyRent"):
+        value = item.get(key)
+        try:
+            rent = float(value)
+        except (TypeError, ValueError):
+            continue
+        if rent > 0:
+            return rent
+    return None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+class YieldModel:
+    """Rent/yield estimator backed by a JSON-serialisable parameter dict."""
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        merged = json.loads(json.dumps(DEFAULT_PARAMS))
+        if params:
+            merged.update(params)
+        self.params = merged
+        self._intercept = float(merged["intercept"])
+        self._log_price = float(merged["log_price"])
+        self._beds = float(merged["beds"])
+        self._type = {k: float(v) for k, v in merged["type"].items()}
+        self._outcode = {k.upper(): float(v) for k, v in merged["outcode"].items()}
+        self._city = {k.lower(): float(v) for k, v in merged["city"].items()}
+        self.high_yield_threshold = float(merged.get("high_yield_threshold", HIGH_YIELD_THRESHOLD))
+
+    # ---------- persistence ----------
+
+    @classmethod
+    def load(cls, path: Path = YIELD_PARAMS_FILE) -> "YieldModel":
+        """Load parameters from ``path``; fall back to the priors if it is missing or invalid."""
+        try:
+            with Path(path).open("r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls()
+
+    def save(self, path: Path = YIELD_PARAMS_FILE) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(self.params, f, indent=2, sort_keys=True)
+        return path
+
+    # ---------- fitting ----------
+
+    @classmethod
+    def fit(cls, listings: Iterable[Dict[str, Any]], prior: Optional["YieldModel"] = None) -> "YieldModel":
+        """
+        Fit the regression and offset tables from listings that carry an observed rent.
+
+        Coefficients are ridge-regressed towards the prior, so with no or few
+        observations the fitted model degrades gracefully to the prior.
+        """
+        prior = prior or cls()
+        rows, targets, outcodes, cities = [], [], [], []
+        for item in listings:
+            rent = _observed_rent(item)
+            price = _to_float(item.get("price"))
+            if rent is None or price is None or price <= 0:
+                continue
+            beds = _to_float(item.get("beds", item.get("bedrooms"))) or 0.0
+            ptype = normalise_property_type(item.get("property_type"))
+            rows.append([1.0, math.log(price), beds] + [1.0 if ptype == t else 0.0 for t in _TYPE_ORDER])
+            targets.append(math.log(rent))
+            outcodes.append(outcode_of(item.get("postcode")))
+            cities.append(str(item.get("city") or "").strip().lower() or None)
+
+        params = json.loads(json.dumps(prior.params))
+        params["n_obs"] = len(rows)
+        if not rows:
+            return cls(params)
+
+        X = np.asarray(rows, dtype=float)
+        y = np.asarray(targets, dtype=float)
+        beta0 = np.array(
+            [prior._intercept, prior._log_price, prior._beds] + [prior._type.get(t, 0.0) for t in _TYPE_ORDER]
+        )
+        penalty = RIDGE_LAMBDA * np.eye(X.shape[1])
+        beta = np.linalg.solve(X.T @ X + penalty, X.T @ y + penalty @ beta0)
+
+        params["intercept"] = float(beta[0])
+        params["log_price"] = float(beta[1])
+        params["beds"] = float(beta[2])
+        params["type"] = {"flat": 0.0, **{t: float(b) for t, b in zip(_TYPE_ORDER, beta[3:])}}
+
+        residuals = y - X @ beta
+        params["outcode"] = _shrunk_means(outcodes, residuals)
+        params["city"] = {**prior._city, **_shrunk_means(cities, residuals)}
+        return cls(params)
+
+    # ---------- scoring ----------
+
+    def knows(self, outcode: Optional[str] = None, city: Optional[str] = None) -> bool:
+        """Whether the rent table has an offset for this outcode (or, if given instead, this city)."""
+        if outcode:
+            return outcode.upper() in self._outcode
+        return bool(city) and city.lower() in self._city
+
+    def _location_offset(self, outcode: Optional[str], city: Optional[str]) -> float:
+        if outcode and outcode in self._outcode:
+            return self._outcode[outcode]
+        if city:
+            return self._city.get(city.lower(), 0.0)
+        return 0.0
+
+    def estimate(
+        self,
+        price: Any,
+        beds: Any = 0,
+        property_type: Optional[str] = None,
+        postcode: Optional[str] = None,
+        city: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Score a single property. Returns the ``Property`` yield fields (None if unpriced)."""
+        price_num = _to_float(price)
+        if price_num is None or price_num <= 0:
+            return {"yield": None, "estimatedMonthlyRent": None, "estimatedAnnualRent": None, "isHighYield": None}
+        log_rent = (
+            self._intercept
+            + self._log_price * math.log(price_num)
+            + self._beds * (_to_float(beds) or 0.0)
+            + self._type.get(normalise_property_type(property_type), 0.0)
+            + self._location_offset(outcode_of(postcode), city)
+        )
+        monthly = round(math.exp(log_rent))
+        gross = round(monthly * 12 / price_num * 100, 2)
+        return {
+            "yield": gross,
+            "estimatedMonthlyRent": monthly,
+            "estimatedAnnualRent": monthly * 12,
+            "isHighYield": gross >= self.high_yield_threshold,
+        }
+
+    def estimate_batch(
+        self,
+        prices: Sequence[Any],
+        beds: Sequence[Any],
+        property_types: Sequence[Optional[str]],
+        postcodes: Sequence[Optional[str]],
+        cities: Sequence[Optional[str]],
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorised ``estimate`` over column sequences of equal length.
+
+        Returns float arrays ``yield``, ``estimatedMonthlyRent``,
+        ``estimatedAnnualRent`` (NaN where the price is unusable) and a bool
+        array ``isHighYield``.
+        """
+        price_arr = np.array([_to_float(p) or np.nan for p in prices], dtype=float)
+        price_arr[price_arr <= 0] = np.nan
+        beds_arr = np.array([_to_float(b) or 0.0 for b in beds], dtype=float)
+        type_arr = np.array([self._type.get(normalise_property_type(t), 0.0) for t in property_types], dtype=float)
+        loc_arr = np.array(
+            [self._location_offset(outcode_of(pc), c) for pc, c in zip(postcodes, cities)], dtype=float
+        )
+
+        with np.errstate(invalid="ignore"):
+            log_rent = (
+                self._intercept + self._log_price * np.log(price_arr) + self._beds * beds_arr + type_arr + loc_arr
+            )
+            monthly = np.round(np.exp(log_rent))
+            gross = np.round(monthly * 12 / price_arr * 100, 2)
+            high = gross >= self.high_yield_threshold
+        return {
+            "yield": gross,
+            "estimatedMonthlyRent": monthly,
+            "estimatedAnnualRent": monthly * 12,
+            "isHighYield": high,
+        }
+
+    def score_listings(self, listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Batch-score normalised listings; returns one yield-field dict per listing."""
+        cols = self.estimate_batch(
+            [x.get("price") for x in listings],
+            [x.get("beds", x.get("bedrooms")) for x in listings],
+            [x.get("property_type") for x in listings],
+            [x.get("postcode") or x.get("address") for x in listings],
+            [x.get("city") for x in listings],
+        )
+        out = []
+        for i in range(len(listings)):
+            if np.isnan(cols["yield"][i]):
+                out.append({"yield": None, "estimatedMonthlyRent": None, "estimatedAnnualRent": None, "isHighYield": None})
+                continue
+            out.append({
+                "yield": float(cols["yield"][i]),
+                "estimatedMonthlyRent": int(cols["estimatedMonthlyRent"][i]),
+                "estimatedAnnualRent": int(cols["estimatedAnnualRent"][i]),
+                "isHighYield": bool(cols["isHighYield"][i]),
+            })
+        return out
+
+
+def _shrunk_means(keys: List[Optional[str]], residuals: np.ndarray) -> Dict[str, float]:
+    """Per-key mean residual, shrunk towards 0 by n / (n + OFFSET_SHRINKAGE)."""
+    sums: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for key, r in zip(keys, residuals):
+        if not key:
+            continue
+        sums[key] = sums.get(key, 0.0) + float(r)
+        counts[key] = counts.get(key, 0) + 1
+    return {k: round(sums[k] / (counts[k] + OFFSET_SHRINKAGE), 4) for k in sums}
+
+
+_default_model: Optional[YieldModel] = None
+
+
+def get_model() -> YieldModel:
+    """Process-wide model loaded from YIELD_PARAMS_FILE (priors if not fitted yet)."""
+    global _default_model
+    if _default_model is None:
+        _default_model = YieldModel.load()
+    return _default_model
+
+
+def market_context(postcode: Optional[str], city: Optional[str], bedrooms: int) -> Optional[Dict[str, Any]]:
+    """Local asking-price stats from the materialised market table (no listing scan); None if the area is unknown."""
+    from core.market_stats import market_stats  # core.market_stats imports this module
+
+    found = market_stats().lookup(postcode=postcode, city=city)
+    if not found:
+        return None
+    scope, area, entry = found
+    for_beds = entry["byBeds"].get(str(bedrooms)) or {}
+    return {
+        "scope": scope,
+        "area": area,
+        "listings": entry["count"],
+        "median_price": entry["medianPrice"],
+        "median_price_per_sqft": entry["medianPricePerSqft"],
+        "median_price_for_beds": for_beds.get("medianPrice"),
+    }
+
 
 def predict_yield(params):
     """
-    Main AI/ML logic for UK property yield prediction.
+    UK property yield prediction.
     Params: dict with keys 'location', 'property_type', 'bedrooms', 'strategy', 'purchase_price'
-    Returns: dict with keys 'predicted_yield', 'summary', etc.
+    Returns: dict with keys 'predicted_yield', 'summary', 'market', etc. Without a
+    purchase price, the local median asking price for the bedroom count is used.
     """
-    # DEMO LOGIC — swap for AI/statistical/model call later
-    location = params.get('location', '').lower()
-    bedrooms = int(params.get('bedrooms', 1))
-    price = float(params.get('purchase_price', 100000))
-    ptype = params.get('property_type', 'Flat').lower()
-
-    # Naive rule-based fallback (plug GPT or model here)
-    if "manchester" in location:
-        predicted_yield = 7.6 + (0.3 if bedrooms > 2 else 0)
-        trend = "Manchester city student lets: strong historic returns, rising rents."
-    elif "liverpool" in location:
-        predicted_yield = 8.1
-        trend = "Liverpool: consistently top yields for BTL, especially 2-bed flats."
-    elif "london" in location:
-        predicted_yield = 4.2
-        trend = "London: lower yield but higher appreciation potential."
+    model = get_model()
+    location = str(params.get('location', '') or '')
+    # A studio is 0 bedrooms: only a missing value defaults to 1
+    bedrooms = params.get('bedrooms')
+    bedrooms = 1 if bedrooms is None else int(bedrooms)
+    ptype = str(params.get('property_type', 'Flat') or 'Flat')
+
+    outcode = outcode_of(location)
+    city = location.split(",")[0].strip() or None
+    market = market_context(outcode, city, bedrooms)
+    price = float(
+        params.get('purchase_price')
+        or (market and (market["median_price_for_beds"] or market["median_price"]))
+        or 100000
+    )
+    estimate = model.estimate(price, bedrooms, ptype, postcode=outcode, city=city)
+
+    if model.knows(outcode=outcode):
+        trend = f"Based on the {outcode} outcode rent table."
+        confidence = "High" if model.params.get("n_obs", 0) else "Medium"
+    elif model.knows(city=city):
+        trend = f"Based on {city} city-level rents."
+        confidence = "Medium"
     else:
-        predicted_yield = 6.0
-        trend = "Typical regional UK BTL yield."
+        trend = "Typical regional UK BTL rent level."
+        confidence = "Low"
+
+    if market and market["median_price"]:
+        trend += f" Median asking price in {market['area']}: £{market['median_price']:,.0f} ({market['listings']} listings)."
 
+    predicted_yield = estimate["yield"] or 0.0
     summary = (
-        f"Predicted net yield for a {bedrooms}-bed {ptype} in {params.get('location','')}: "
-        f"{predicted_yield:.1f}% — based on historic and current market data."
+        f"Predicted gross yield for a {bedrooms}-bed {ptype.lower()} in {location}: "
+        f"{predicted_yield:.1f}% (≈£{estimate['estimatedMonthlyRent'] or 0:,} pcm)."
     )
     return {
-        "predicted_yield": round(predicted_yield, 2),
+        "predicted_yield": predicted_yield,
+        "estimated_monthly_rent": estimate["estimatedMonthlyRent"],
+        "is_high_yield": estimate["isHighYield"],
         "summary": summary,
         "trend_note": trend,
-        "ai_confidence": "Medium",
+        "ai_confidence": confidence,
+        "market": market,
     }
 
-# For CLI/dev test
+# For CLI/dev test, or to refit the shared parameter file:
+#   python -m ai.yield_predictor --fit data/exports/rightmove_*.json data/properties.json
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fit", nargs="+", metavar="JSON", help="listing files with observed rents")
+    parser.add_argument("--out", default=str(YIELD_PARAMS_FILE))
+    args = parser.parse_args()
+
+    if args.fit:
+        observed = []
+        for path in args.fit:
+            with open(path, "r", encoding="utf-8") as f:
+                observed.extend(json.load(f))
+        fitted = YieldModel.fit(observed, prior=YieldModel.load(Path(args.out)))
+        print(f"[💾] Fitted on {fitted.params['n_obs']} rents → {fitted.save(Path(args.out))}")
+        raise SystemExit(0)
+
     print(predict_yield({
         "location": "Manchester, M14",
         "property_type": "Flat",
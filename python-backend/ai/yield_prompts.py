@@ -0,0 +1,73 @@
+# ai/yield_prompts.py
+"""Prompt construction and reply parsing shared by the AI yield endpoints."""
+import json
+import re
+
+from ai.response_cache import price_band
+
+PROMPT_TEMPLATE = (
+    "You are an expert UK property investment AI. "
+    "Based on UK market data from 2020–2025, local yields, rental trends, "
+    "and BTL returns, estimate a realistic NET yield for a {bedrooms}-bed {property_type} in {location} using the '{strategy}' strategy. "
+    "Purchase price: £{purchase_price}. "
+    "Return a valid JSON: predicted_yield (number), summary (sentence), trend_note (sentence), ai_confidence (Low/Medium/High). "
+    "Respond with JSON only. Do not say anything else."
+)
+
+
+def build_prompt(data):
+    return PROMPT_TEMPLATE.format(
+        location=data.get("location"),
+        property_type=data.get("property_type"),
+        bedrooms=data.get("bedrooms"),
+        strategy=data.get("strategy"),
+        purchase_price=price_band(data.get("purchase_price")) or data.get("purchase_price"),
+    )
+
+
+def parse_reply(reply):
+    """Extract the first JSON object from a model reply."""
+    match = re.search(r'({.*?})', reply, re.DOTALL)
+    json_str = match.group(1) if match else reply
+    return json.loads(json_str)
+
+
+BATCH_PROMPT_TEMPLATE = (
+    "You are an expert UK property investment AI. "
+    "Based on UK market data from 2020–2025, local yields, rental trends, and BTL returns, "
+    "estimate a realistic NET yield for EACH property in the JSON array below, using its own strategy and purchase price. "
+    'Return a valid JSON object shaped as {{"results": [{{"index": number, "predicted_yield": number, '
+    '"summary": sentence, "trend_note": sentence, "ai_confidence": "Low"|"Medium"|"High"}}]}} '
+    "with exactly one entry per property, echoing its index. "
+    "Respond with JSON only. Do not say anything else.\n"
+    "Properties: {items}"
+)
+
+
+def build_batch_prompt(items):
+    """One prompt for several property descriptors; ``items`` is a list of request dicts."""
+    packed = [
+        {
+            "index": i,
+            "location": data.get("location"),
+            "property_type": data.get("property_type"),
+            "bedrooms": data.get("bedrooms"),
+            "strategy": data.get("strategy"),
+            "purchase_price": price_band(data.get("purchase_price")) or data.get("purchase_price"),
+        }
+        for i, data in enumerate(items)
+    ]
+    return BATCH_PROMPT_TEMPLATE.format(items=json.dumps(packed, ensure_ascii=False))
+
+
+def parse_batch_reply(reply):
+    """Map item index -> result object from a batch reply."""
+    match = re.search(r'({.*})', reply, re.DOTALL)
+    obj = json.loads(match.group(1) if match else reply)
+    results = obj.get("results", []) if isinstance(obj, dict) else obj
+    parsed = {}
+    for entry in results:
+        if isinstance(entry, dict) and isinstance(entry.get("index"), int):
+            index = entry.pop("index")
+            parsed[index] = entry
+    return parsed
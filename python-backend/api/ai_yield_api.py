@@ -2,18 +2,63 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-import openai
-import re
+import asyncio
+import functools
 import json
+import time
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import httpx
+import openai
 from fastapi.middleware.cors import CORSMiddleware
 
+from ai.ensemble import MODELS, YieldEnsemble
+from ai.response_cache import SingleFlight, TTLCache, yield_cache_key
+from ai.yield_prompts import build_batch_prompt, build_prompt, parse_batch_reply, parse_reply
+from core.metrics import AI_CACHE_REQUESTS, PrometheusMiddleware, metrics_endpoint, observe_upstream
+
 app = FastAPI()
 
-client = openai.OpenAI(
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-    base_url="https://openrouter.ai/api/v1"
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_API_BASE = os.getenv("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1")
+
+# Async client: awaiting the model no longer blocks the event loop, so one slow
+# completion doesn't stall every other request served by this process.
+client = openai.AsyncOpenAI(
+    api_key=OPENROUTER_API_KEY,
+    base_url=OPENROUTER_API_BASE,
+    timeout=float(os.getenv("AI_YIELD_TIMEOUT", "60")),
+)
+
+# Identical (normalised) questions are answered from cache, and concurrent
+# identical questions share a single upstream call.
+response_cache = TTLCache(
+    maxsize=int(os.getenv("AI_YIELD_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("AI_YIELD_CACHE_TTL", str(6 * 3600))),
+)
+inflight = SingleFlight()
+
+# Batch scoring: cache misses are packed BATCH_CHUNK_SIZE to a prompt and at
+# most BATCH_CONCURRENCY prompts run at once.
+BATCH_MAX_ITEMS = int(os.getenv("AI_BATCH_MAX_ITEMS", "200"))
+BATCH_CHUNK_SIZE = int(os.getenv("AI_BATCH_CHUNK_SIZE", "10"))
+batch_slots = asyncio.Semaphore(int(os.getenv("AI_BATCH_CONCURRENCY", "4")))
+
+# Multi-model ensemble: all models in parallel over one pooled HTTP client,
+# bounded by per-model timeouts, hedging and a global deadline. The client has
+# no timeout of its own (httpx defaults to 5s): the ensemble's asyncio
+# deadlines decide, so a slow model counts as timed out, not as an error.
+ensemble = YieldEnsemble(
+    http=httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        timeout=None,
+    ),
+    base_url=OPENROUTER_API_BASE,
+    api_key=OPENROUTER_API_KEY,
+    models=[m.strip() for m in os.getenv("AI_ENSEMBLE_MODELS", ",".join(MODELS)).split(",") if m.strip()],
+    deadline=float(os.getenv("AI_ENSEMBLE_DEADLINE", "8")),
+    model_timeout=float(os.getenv("AI_ENSEMBLE_MODEL_TIMEOUT", "6")),
+    hedge_after=float(os.getenv("AI_ENSEMBLE_HEDGE_AFTER", "2.5")),
 )
 
 
@@ -24,126 +69,198 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(PrometheusMiddleware, app_name="ai_yield")
+app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
 
-@app.post("/api/ai-yield")
-async def ai_yield(request: Request):
-    data = await request.json()
-    location = data.get("location")
-    property_type = data.get("property_type")
-    bedrooms = data.get("bedrooms")
-    strategy = data.get("strategy")
-    purchase_price = data.get("purchase_price")
-
-    prompt = (
-        f"You are an expert UK property investment AI. "
-        f"Based on UK market data from 2020–2025, local yields, rental trends, "
-        f"and BTL returns, estimate a realistic NET yield for a {bedrooms}-bed {property_type} in {location} using the '{strategy}' strategy. "
-        f"Purchase price: £{purchase_price}. "
-        f"Return a valid JSON: predicted_yield (number), summary (sentence), trend_note (sentence), ai_confidence (Low/Medium/High). "
-        f"Respond with JSON only. Do not say anything else."
-    )
+MODEL = "anthropic/claude-3-sonnet"  # Or another model OpenRouter supports
 
+
+async def _ask_model(key, data):
+    started = time.perf_counter()
     try:
-        response = client.chat.completions.create(
-            model="anthropic/claude-3-sonnet",  # Or another model OpenRouter supports
-            messages=[{"role": "user", "content": prompt}],
+        response = await client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": build_prompt(data)}],
             max_tokens=256,
             temperature=0.3,
         )
-        reply = response.choices[0].message.content
-        print("AI raw reply:", reply)
-        match = re.search(r'({.*?})', reply, re.DOTALL)
-        json_str = match.group(1) if match else reply
-        result = json.loads(json_str)
-        return JSONResponse(result)
+    except Exception as e:
+        observe_upstream("single", MODEL, started, e)
+        raise
+    observe_upstream("single", MODEL, started)
+    reply = response.choices[0].message.content
+    print("AI raw reply:", reply)
+    result = parse_reply(reply)
+    response_cache.set(key, result)
+    return result
+
+
+@app.post("/api/ai-yield")
+async def ai_yield(request: Request):
+    data = await request.json()
+    key = yield_cache_key(data)
+
+    cached = response_cache.get(key)
+    if cached is not None:
+        AI_CACHE_REQUESTS.labels("single", "hit").inc()
+        return JSONResponse(cached, headers={"X-Cache": "HIT"})
+    AI_CACHE_REQUESTS.labels("single", "miss").inc()
+
+    try:
+        result = await inflight.do(key, lambda: _ask_model(key, data))
+        return JSONResponse(result, headers={"X-Cache": "MISS"})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
-# import asyncio
-# import os
-# import json
-# from dotenv import load_dotenv
-# import httpx
-# from fastapi import FastAPI, Request
-# from fastapi.responses import JSONResponse
-
-# load_dotenv()
-
-# OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-# OPENROUTER_API_BASE = "https://openrouter.ai/api/v1"
-# HEADERS = {
-#     "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-#     "HTTP-Referer": "http://localhost",
-#     "X-Title": "uk-property-ai"
-# }
-
-# MODELS = [
-#     "openai/gpt-4.1",
-#     "openai/gpt-4.1-2025-04-14",
-#     "anthropic/claude-3-opus",
-#     "anthropic/claude-3.7-sonnet",
-#     "meta-llama/llama-3.3-70b-instruct",
-#     "mistralai/mistral-large-2411",
-#     "google/gemini-2.0-flash-001"
-# ]
-
-# app = FastAPI()
-
-# PROMPT_TEMPLATE = (
-#     "You are an expert UK property investment AI. Based on UK market data from 2020–2025, local yields, "
-#     "rental trends, and BTL returns, estimate a realistic NET yield for a {bedrooms}-bed {property_type} in {location} "
-#     "using the '{strategy}' strategy. Purchase price: £{purchase_price}. "
-#     "Return a valid JSON: predicted_yield (number), summary (sentence), trend_note (sentence), ai_confidence (Low/Medium/High). "
-#     "Respond with JSON only. Do not say anything else."
-# )
-
-# async def query_model(model, prompt):
-#     payload = {
-#         "model": model,
-#         "messages": [{"role": "user", "content": prompt}],
-#         "max_tokens": 256,
-#         "temperature": 0.3
-#     }
-#     async with httpx.AsyncClient(timeout=60.0) as client:
-#         try:
-#             resp = await client.post(
-#                 f"{OPENROUTER_API_BASE}/chat/completions",
-#                 headers=HEADERS,
-#                 json=payload
-#             )
-#             print(f"\n--- {model} RAW RESPONSE ---\n", resp.status_code, resp.text)  # 👈 DEBUG print
-#             data = resp.json()
-#             content = data["choices"][0]["message"]["content"]
-#             # Try to extract only the JSON object
-#             import re
-#             match = re.search(r'({.*?})', content, re.DOTALL)
-#             obj = json.loads(match.group(1)) if match else {"error": "AI did not return valid JSON"}
-#             obj["model"] = model
-#             return obj
-#         except Exception as e:
-#             return {"error": str(e), "model": model}
-
-# @app.post("/api/ai-yield")
-# async def ai_yield(request: Request):
-#     data = await request.json()
-#     prompt = PROMPT_TEMPLATE.format(
-#         location=data.get("location"),
-#         property_type=data.get("property_type"),
-#         bedrooms=data.get("bedrooms"),
-#         strategy=data.get("strategy"),
-#         purchase_price=data.get("purchase_price")
-#     )
-
-#     # Run all models in parallel
-#     results = await asyncio.gather(*(query_model(model, prompt) for model in MODELS))
-
-#     # Aggregate predictions
-#     predicted_yields = [r.get("predicted_yield") for r in results if isinstance(r.get("predicted_yield"), (int, float))]
-#     avg_yield = round(sum(predicted_yields)/len(predicted_yields), 2) if predicted_yields else None
-
-#     response = {
-#         "average_predicted_yield": avg_yield,
-#         "per_model": results
-#     }
-#     return JSONResponse(response)
+async def _ask_model_batch(keys, items):
+    """One multi-item prompt; returns key -> result and caches every answered item."""
+    async with batch_slots:
+        started = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": build_batch_prompt(items)}],
+                max_tokens=160 * len(items) + 64,
+                temperature=0.3,
+                response_format={"type": "json_object"},
+            )
+        except Exception as e:
+            observe_upstream("batch", MODEL, started, e)
+            raise
+        observe_upstream("batch", MODEL, started)
+    parsed = parse_batch_reply(response.choices[0].message.content)
+    answered = {}
+    for index, key in enumerate(keys):
+        if index in parsed:
+            response_cache.set(key, parsed[index])
+            answered[key] = parsed[index]
+    return answered
+
+
+async def _batch_answer(prompt, key):
+    """One item's answer from a shared multi-item prompt."""
+    answered = await prompt
+    if key not in answered:
+        raise LookupError("Item missing from model reply")
+    return answered[key]
+
+
+@app.post("/api/ai-yield/batch")
+async def ai_yield_batch(request: Request):
+    """
+    Score many property descriptors in one call.
+
+    Body: {"items": [{location, property_type, bedrooms, strategy, purchase_price}, ...]}.
+    Items are deduped on the normalised cache key; cache hits are streamed
+    back immediately and the misses are packed into a few multi-item prompts
+    run concurrently. Misses share in-flight calls with /api/ai-yield and
+    other batches, so a key is never asked twice at once. The response is
+    NDJSON, one line per input item in completion order: {"index", "cached",
+    "result"} or {"index", "error"}.
+    """
+    data = await request.json()
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="Expected a non-empty 'items' list")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+
+    # Dedupe: each distinct key is asked once, whichever items share it
+    positions = {}
+    for index, item in enumerate(items):
+        positions.setdefault(yield_cache_key(item if isinstance(item, dict) else {}), []).append(index)
+
+    async def stream():
+        misses = []
+        for key, indices in positions.items():
+            cached = response_cache.get(key)
+            AI_CACHE_REQUESTS.labels("batch", "miss" if cached is None else "hit").inc()
+            if cached is None:
+                misses.append(key)
+                continue
+            for index in indices:
+                yield json.dumps({"index": index, "cached": True, "result": cached}) + "\n"
+
+        # Keys another request is already asking the model about are joined, not asked again;
+        # the rest are packed into prompts and registered in flight for later requests to join
+        calls = {key: inflight.get(key) for key in misses}
+        fresh = [key for key, call in calls.items() if call is None]
+        prompts = []
+        for i in range(0, len(fresh), BATCH_CHUNK_SIZE):
+            chunk = fresh[i:i + BATCH_CHUNK_SIZE]
+            prompt = asyncio.ensure_future(_ask_model_batch(chunk, [items[positions[key][0]] for key in chunk]))
+            prompts.append((prompt, chunk))
+            for key in chunk:
+                calls[key] = inflight.join(key, functools.partial(_batch_answer, prompt, key))
+
+        async def answer(key):
+            try:
+                return key, await asyncio.shield(calls[key]), None
+            except Exception as e:
+                return key, None, str(e)
+
+        waits = [asyncio.ensure_future(answer(key)) for key in misses]
+        try:
+            for finished in asyncio.as_completed(waits):
+                key, result, error = await finished
+                for index in positions[key]:
+                    if error is None:
+                        yield json.dumps({"index": index, "cached": False, "result": result}) + "\n"
+                    else:
+                        yield json.dumps({"index": index, "error": error}) + "\n"
+        finally:
+            for wait in waits:
+                wait.cancel()
+            # Client went away mid-stream: don't keep paying for prompts nobody else is waiting on
+            for prompt, chunk in prompts:
+                if not any(inflight.shared(key) for key in chunk):
+                    prompt.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/api/ai-yield/cache")
+async def ai_yield_cache_stats():
+    return {**response_cache.stats(), "inflight": len(inflight)}
+
+
+@app.post("/api/ai-yield/ensemble")
+async def ai_yield_ensemble(request: Request):
+    """
+    Ask every ensemble model in parallel and aggregate their predictions.
+
+    Returns within the deadline (optionally shortened via a "deadline" field
+    in the body) with whatever models have answered; "partial" is true if
+    any model errored, timed out or missed the deadline.
+    """
+    data = await request.json()
+    key = ("ensemble",) + yield_cache_key(data)
+
+    cached = response_cache.get(key)
+    if cached is not None:
+        AI_CACHE_REQUESTS.labels("ensemble", "hit").inc()
+        return JSONResponse(cached, headers={"X-Cache": "HIT"})
+    AI_CACHE_REQUESTS.labels("ensemble", "miss").inc()
+
+    deadline = data.get("deadline")
+    try:
+        deadline = float(deadline) if deadline is not None else None
+    except (TypeError, ValueError):
+        deadline = None
+
+    result = await ensemble.run(build_prompt(data), deadline=deadline)
+    # Only complete answers are cached; a partial one should be retried
+    if not result["partial"]:
+        response_cache.set(key, result)
+    return JSONResponse(result, headers={"X-Cache": "MISS"})
+
+
+@app.get("/api/ai-yield/ensemble/metrics")
+async def ai_yield_ensemble_metrics():
+    return ensemble.metrics()
+
+
+@app.on_event("shutdown")
+async def _close_clients():
+    await ensemble.http.aclose()
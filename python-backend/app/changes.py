@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+import threading
+from bisect import bisect_right
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from core.paths import CHANGE_LOG_FILE
+
+# How often waiting clients (long-poll, SSE) look for new events
+POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "0.5"))
+
+
+class ChangeLog:
+	"""
+	In-memory tail of the scraper's change log (core/change_feed.py).
+
+	The scraper appends from another process, so refresh() stats the file and
+	reads only the complete lines past the last offset; compaction replaces
+	the file (new inode), which starts the read over.
+	"""
+
+	def __init__(self, path: Path = CHANGE_LOG_FILE):
+		self.path = path
+		self._lock = threading.Lock()
+		self._events: List[dict] = []
+		self._seqs: List[int] = []
+		self._offset = 0
+		self._inode: Optional[int] = None
+
+	def _reset(self, inode: Optional[int]) -> None:
+		self._events, self._seqs, self._offset, self._inode = [], [], 0, inode
+
+	def refresh(self) -> None:
+		try:
+			st = self.path.stat()
+		except FileNotFoundError:
+			with self._lock:
+				self._reset(None)
+			return
+		with self._lock:
+			if st.st_ino != self._inode or st.st_size < self._offset:
+				self._reset(st.st_ino)
+			if st.st_size == self._offset:
+				return
+			with self.path.open("rb") as f:
+				f.seek(self._offset)
+				chunk = f.read(st.st_size - self._offset)
+			# Whole lines only: the writer may be mid-append
+			end = chunk.rfind(b"\n") + 1
+			for line in chunk[:end].splitlines():
+				try:
+					event = json.loads(line)
+				except json.JSONDecodeError:
+					continue
+				seq = event.get("seq") if isinstance(event, dict) else None
+				if isinstance(seq, int) and (not self._seqs or seq > self._seqs[-1]):
+					self._events.append(event)
+					self._seqs.append(seq)
+			self._offset += end
+
+	def read(self, since: int, limit: int) -> Tuple[List[dict], int, int]:
+		"""Up to ``limit`` events after seq ``since``, plus the oldest and latest seq held (0 if none)."""
+		with self._lock:
+			start = bisect_right(self._seqs, since)
+			events = self._events[start:start + limit]
+			oldest = self._seqs[0] if self._seqs else 0
+			latest = self._seqs[-1] if self._seqs else 0
+		return events, oldest, latest
+
+	async def wait(self, since: int, timeout: float) -> None:
+		"""Return as soon as an event after ``since`` is logged, or after ``timeout`` seconds."""
+		loop = asyncio.get_running_loop()
+		deadline = loop.time() + timeout
+		while True:
+			self.refresh()
+			if self._seqs and self._seqs[-1] > since:
+				return
+			remaining = deadline - loop.time()
+			if remaining <= 0:
+				return
+			await asyncio.sleep(min(POLL_INTERVAL, remaining))
+
+
+change_log = ChangeLog()
@@ -0,0 +1,169 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ai.response_cache import TTLCache
+
+# Price band edges (GBP); the last band is open-ended
+PRICE_BANDS = [0, 50000, 100000, 150000, 200000, 250000, 300000, 400000, 500000]
+
+# Keys include the snapshot version, so entries never go stale; the TTL only
+# bounds how long an unused filter lingers.
+facet_cache = TTLCache(maxsize=int(os.getenv("FACET_CACHE_SIZE", "512")), ttl=3600)
+_cache_lock = threading.Lock()
+
+
+def _number(value: Any, default: float) -> float:
+	if isinstance(value, bool):
+		return default
+	try:
+		return float(value)
+	except (TypeError, ValueError):
+		return default
+
+
+class SnapshotColumns:
+	"""Column arrays of one snapshot for vectorised filtering and group-bys."""
+
+	def __init__(self, items: List[dict]):
+		# Same coercions as the list filter: missing price/beds count as 0
+		self.price = np.array([_number(p.get("price", 0), 0.0) for p in items], dtype=np.float64)
+		self.yield_ = np.array([_number(p.get("yield"), np.nan) for p in items], dtype=np.float64)
+		self.beds = np.array([int(_number(p.get("beds", 0), 0.0)) for p in items], dtype=np.int64)
+
+		# Cities grouped case-insensitively, labelled by their first spelling
+		codes: Dict[str, int] = {}
+		self.city_labels: List[str] = []
+		city_codes = []
+		for p in items:
+			label = str(p.get("city", "") or "")
+			key = label.lower()
+			code = codes.get(key)
+			if code is None:
+				code = codes[key] = len(self.city_labels)
+				self.city_labels.append(label)
+			city_codes.append(code)
+		self.city_keys = list(codes)
+		self.city = np.array(city_codes, dtype=np.int64)
+		self.price_band = np.searchsorted(PRICE_BANDS, self.price, side="right") - 1
+
+	def city_mask(self, city: str) -> np.ndarray:
+		# Substring match on the lower-cased city, as list_properties does
+		needle = city.lower()
+		matching = [code for code, key in enumerate(self.city_keys) if needle in key]
+		return np.isin(self.city, matching)
+
+
+def _stats(values: np.ndarray) -> Dict[str, Optional[float]]:
+	values = values[~np.isnan(values)]
+	if not len(values):
+		return {"min": None, "max": None, "median": None}
+	return {"min": float(values.min()), "max": float(values.max()), "median": float(np.median(values))}
+
+
+def _group_stats(codes: np.ndarray, values: np.ndarray, groups: int) -> Dict[str, np.ndarray]:
+	"""Per-group min/max/median of ``values`` (NaNs ignored), via one lexsort."""
+	valid = ~np.isnan(values)
+	c, v = codes[valid], values[valid]
+	order = np.lexsort((v, c))
+	c, v = c[order], v[order]
+	counts = np.bincount(c, minlength=groups)
+	starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+	present = counts > 0
+	out = {name: np.full(groups, np.nan) for name in ("min", "max", "median")}
+	s, n = starts[present], counts[present]
+	out["min"][present] = v[s]
+	out["max"][present] = v[s + n - 1]
+	out["median"][present] = (v[s + (n - 1) // 2] + v[s + n // 2]) / 2
+	return out
+
+
+def _facet(cols: SnapshotColumns, codes: np.ndarray, mask: np.ndarray, groups: int) -> List[Dict[str, Any]]:
+	codes = codes[mask]
+	counts = np.bincount(codes, minlength=groups)
+	price = _group_stats(codes, cols.price[mask], groups)
+	yld = _group_stats(codes, cols.yield_[mask], groups)
+
+	def value(stats, key, g):
+		x = stats[key][g]
+		return None if np.isnan(x) else float(x)
+
+	rows = []
+	for g in np.flatnonzero(counts):
+		rows.append({
+			"code": int(g),
+			"count": int(counts[g]),
+			"price": {k: value(price, k, g) for k in ("min", "max", "median")},
+			"yield": {k: value(yld, k, g) for k in ("min", "max", "median")},
+		})
+	return rows
+
+
+def compute_facets(
+	cols: SnapshotColumns,
+	positions: Optional[List[int]],
+	minPrice: Optional[float],
+	maxPrice: Optional[float],
+	city: Optional[str],
+	beds: Optional[int],
+) -> Dict[str, Any]:
+	"""
+	Counts and price/yield stats per city, bed count and price band.
+
+	``positions`` is what the index-backed filters (q, geo, yield) left, None
+	for everything. Each facet ignores its own filter, so the panel can still
+	show the alternatives to the current selection; the totals apply all of them.
+	"""
+	n = len(cols.price)
+	base = np.ones(n, dtype=bool)
+	if positions is not None:
+		base = np.zeros(n, dtype=bool)
+		base[np.asarray(positions, dtype=np.int64)] = True
+
+	price_ok = np.ones(n, dtype=bool)
+	if minPrice is not None:
+		price_ok &= cols.price >= minPrice
+	if maxPrice is not None:
+		price_ok &= cols.price <= maxPrice
+	city_ok = cols.city_mask(city) if city else np.ones(n, dtype=bool)
+	beds_ok = cols.beds >= beds if beds is not None else np.ones(n, dtype=bool)
+
+	matched = base & price_ok & city_ok & beds_ok
+
+	cities = _facet(cols, cols.city, base & price_ok & beds_ok, len(cols.city_labels))
+	for row in cities:
+		row["value"] = cols.city_labels[row.pop("code")]
+	cities.sort(key=lambda r: (-r["count"], r["value"]))
+
+	bed_values = np.clip(cols.beds, 0, None)
+	beds_rows = _facet(cols, bed_values, base & price_ok & city_ok, int(bed_values.max(initial=0)) + 1)
+	for row in beds_rows:
+		row["value"] = row.pop("code")
+
+	bands = _facet(cols, np.clip(cols.price_band, 0, None), base & city_ok & beds_ok, len(PRICE_BANDS))
+	for row in bands:
+		i = row.pop("code")
+		low = PRICE_BANDS[i]
+		high = PRICE_BANDS[i + 1] if i + 1 < len(PRICE_BANDS) else None
+		row.update({"value": f"{low}-{high}" if high is not None else f"{low}+", "min": low, "max": high})
+
+	return {
+		"total": int(matched.sum()),
+		"price": _stats(cols.price[matched]),
+		"yield": _stats(cols.yield_[matched]),
+		"facets": {"city": cities, "beds": beds_rows, "priceBand": bands},
+	}
+
+
+def cached_facets(version: str, key: tuple, compute) -> Dict[str, Any]:
+	"""Memoise facet results per (snapshot version, filter) in an LRU."""
+	cache_key = (version,) + key
+	with _cache_lock:
+		result = facet_cache.get(cache_key)
+	if result is None:
+		result = compute()
+		with _cache_lock:
+			facet_cache.set(cache_key, result)
+	return result
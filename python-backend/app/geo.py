@@ -0,0 +1,101 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.geo import valid_coordinates
+
+EARTH_RADIUS_KM = 6371.0088
+# ~5.5 km of latitude per cell: a city-sized radius touches a handful of cells
+CELL_DEGREES = 0.05
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+	lat1, lng1 = math.radians(lat), math.radians(lng)
+	lat2, lng2 = np.radians(lats), np.radians(lngs)
+	a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+	return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoIndex:
+	"""
+	Uniform lat/lng grid over one snapshot's listings.
+
+	Each cell holds the positions of the listings inside it (a numpy array);
+	a radius or bounding-box query gathers the cells overlapping its box and
+	filters just those candidates exactly, so cost follows the number of
+	listings in the area, not the inventory.
+	"""
+
+	def __init__(self, items: List[dict]):
+		positions, lats, lngs = [], [], []
+		for idx, p in enumerate(items):
+			coords = valid_coordinates(p.get("latitude"), p.get("longitude"))
+			if coords:
+				positions.append(idx)
+				lats.append(coords[0])
+				lngs.append(coords[1])
+		self.size = len(positions)
+		self._lats = np.array(lats, dtype=np.float64)
+		self._lngs = np.array(lngs, dtype=np.float64)
+		rows = np.floor(self._lats / CELL_DEGREES).astype(np.int64)
+		cols = np.floor(self._lngs / CELL_DEGREES).astype(np.int64)
+
+		# Group entries (indexes into the arrays above) by cell
+		self._cells: Dict[Tuple[int, int], np.ndarray] = {}
+		self._positions = np.array(positions, dtype=np.int64)
+		if self.size:
+			order = np.lexsort((cols, rows))
+			keys = np.stack([rows[order], cols[order]], axis=1)
+			starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+			for chunk in np.split(order, starts):
+				self._cells[(int(rows[chunk[0]]), int(cols[chunk[0]]))] = chunk
+
+	def _candidates(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+		r0, r1 = math.floor(south / CELL_DEGREES), math.floor(north / CELL_DEGREES)
+		c0, c1 = math.floor(west / CELL_DEGREES), math.floor(east / CELL_DEGREES)
+		if (r1 - r0 + 1) * (c1 - c0 + 1) > len(self._cells):
+			# Box larger than the occupied grid: walk the cells we have instead
+			chunks = [e for (r, c), e in self._cells.items() if r0 <= r <= r1 and c0 <= c <= c1]
+		else:
+			chunks = [
+				self._cells[(r, c)]
+				for r in range(r0, r1 + 1)
+				for c in range(c0, c1 + 1)
+				if (r, c) in self._cells
+			]
+		return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+	def within_radius(self, lat: float, lng: float, radius_km: float) -> Tuple[List[int], List[float]]:
+		"""Positions of listings within radius_km of (lat, lng), nearest first, with their distances."""
+		dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+		# Longitude degrees shrink with latitude; clamp near the poles
+		dlng = dlat / max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 1e-6)
+		entries = self._candidates(lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+		if not len(entries):
+			return [], []
+		dist = haversine_km(lat, lng, self._lats[entries], self._lngs[entries])
+		inside = dist <= radius_km
+		entries, dist = entries[inside], dist[inside]
+		order = np.lexsort((self._positions[entries], dist))
+		return self._positions[entries[order]].tolist(), dist[order].tolist()
+
+	def in_bbox(self, south: float, west: float, north: float, east: float) -> List[int]:
+		"""Positions (in export order) of listings inside a map viewport."""
+		entries = self._candidates(south, west, north, east)
+		if not len(entries):
+			return []
+		lats, lngs = self._lats[entries], self._lngs[entries]
+		inside = (lats >= south) & (lats <= north) & (lngs >= west) & (lngs <= east)
+		return np.sort(self._positions[entries[inside]]).tolist()
+
+
+def parse_bbox(value: str) -> Optional[Tuple[float, float, float, float]]:
+	"""Parse "minLng,minLat,maxLng,maxLat" (GeoJSON order) into (south, west, north, east); None if malformed."""
+	try:
+		west, south, east, north = (float(v) for v in value.split(","))
+	except ValueError:
+		return None
+	if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+		return None
+	return south, west, north, east
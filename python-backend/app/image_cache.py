@@ -0,0 +1,126 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from ai.response_cache import SingleFlight
+from core.image_variants import render_variant, variant_name
+from core.media_index import ImageIndex
+
+from .snapshot import BASE_DIR
+
+# Media roots, in lookup order (python-backend/media_cache, then repo-root media_cache);
+# IMAGE_MEDIA_DIRS overrides them with an os.pathsep-separated list
+MEDIA_DIRS = (
+	[Path(p) for p in os.getenv("IMAGE_MEDIA_DIRS", "").split(os.pathsep) if p]
+	or [BASE_DIR / "media_cache", BASE_DIR.parent / "media_cache"]
+)
+
+VARIANT_DIR = Path(os.getenv("IMAGE_VARIANT_DIR", str(BASE_DIR / "media_cache" / "_variants")))
+VARIANT_CACHE_BYTES = int(float(os.getenv("IMAGE_VARIANT_CACHE_MB", "512")) * 1024 * 1024)
+
+# How often the index rescans its directories to pick up new, changed and deleted files.
+IMAGE_INDEX_REFRESH_SECONDS = float(os.getenv("IMAGE_INDEX_REFRESH_SECONDS", "30"))
+
+# When set (e.g. "/_media"), image responses carry X-Accel-Redirect: <prefix>/<path
+# relative to ACCEL_ROOT> and an empty body, and the reverse proxy sends the file:
+#
+#     location /_media/ { internal; alias /srv/yieldbase/; }
+#
+ACCEL_PREFIX = os.getenv("IMAGE_ACCEL_PREFIX", "").rstrip("/")
+ACCEL_ROOT = Path(os.getenv("IMAGE_ACCEL_ROOT", str(BASE_DIR.parent))).resolve()
+
+# Encodes are CPU-bound: keep them on a small dedicated pool so a cold gallery
+# page can't starve the default threadpool that serves sync routes.
+_encode_pool = ThreadPoolExecutor(max_workers=int(os.getenv("IMAGE_ENCODE_WORKERS", "2")), thread_name_prefix="img-encode")
+
+
+def _accel_path(path: Path) -> Optional[str]:
+	if not ACCEL_PREFIX:
+		return None
+	try:
+		return f"{ACCEL_PREFIX}/{path.resolve().relative_to(ACCEL_ROOT).as_posix()}"
+	except ValueError:  # outside the proxied tree: serve it ourselves
+		return None
+
+
+image_index = ImageIndex(MEDIA_DIRS + [VARIANT_DIR], IMAGE_INDEX_REFRESH_SECONDS, _accel_path)
+
+
+class VariantCache:
+	"""
+	Derived-image cache on disk with a byte budget and LRU eviction.
+
+	The LRU order lives in memory (seeded from file mtimes at startup) so a hit
+	costs a dict lookup, not a directory scan. Concurrent requests for the same
+	variant share one encode.
+	"""
+
+	def __init__(self, root: Path, max_bytes: int):
+		self.root = root
+		self.max_bytes = max_bytes
+		self._entries: "OrderedDict[str, int]" = OrderedDict()
+		self._bytes = 0
+		self._lock = threading.Lock()
+		self._inflight = SingleFlight()
+		self._scan()
+
+	def _scan(self) -> None:
+		if not self.root.exists():
+			return
+		files = sorted(
+			(p for p in self.root.iterdir() if p.is_file() and not p.name.startswith(".")),
+			key=lambda p: p.stat().st_mtime,
+		)
+		for p in files:
+			size = p.stat().st_size
+			self._entries[p.name] = size
+			self._bytes += size
+
+	def _touch(self, name: str) -> bool:
+		with self._lock:
+			if name not in self._entries:
+				return False
+			self._entries.move_to_end(name)
+			return True
+
+	def _add(self, name: str, size: int) -> None:
+		evicted = []
+		with self._lock:
+			self._bytes += size - self._entries.pop(name, 0)
+			self._entries[name] = size
+			while self._bytes > self.max_bytes and len(self._entries) > 1:
+				old, old_size = self._entries.popitem(last=False)
+				self._bytes -= old_size
+				evicted.append(old)
+		for old in evicted:
+			image_index.discard(old)
+			try:
+				(self.root / old).unlink()
+			except FileNotFoundError:
+				pass
+
+	async def get(self, src: Path, width: int, fmt: str) -> Path:
+		"""Path of the ``width``/``fmt`` variant of ``src``, rendering it on a miss."""
+		name = variant_name(src.name, width, fmt)
+		path = self.root / name
+		if self._touch(name) and path.exists():
+			return path
+
+		async def render() -> Path:
+			loop = asyncio.get_running_loop()
+			size = await loop.run_in_executor(_encode_pool, render_variant, src, path, width, fmt)
+			self._add(name, size)
+			image_index.add(path)
+			return path
+
+		return await self._inflight.do(name, render)
+
+	def stats(self) -> dict:
+		return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+variant_cache = VariantCache(VARIANT_DIR, VARIANT_CACHE_BYTES)
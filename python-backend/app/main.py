@@ -1,7 +1,22 @@
+import time
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from core.metrics import (
+    IMAGE_INDEX_ENTRIES,
+    IMAGE_VARIANT_CACHE_BYTES,
+    SNAPSHOT_AGE,
+    SNAPSHOT_LISTINGS,
+    PrometheusMiddleware,
+    metrics_endpoint,
+)
+from .image_cache import image_index, variant_cache
+from .routes.changes import router as changes_router
+from .routes.market import router as market_router
 from .routes.properties import router as properties_router
+from .routes.saved_searches import router as saved_searches_router
 from .routes.health import router as health_router
+from .snapshot import current_snapshot
 import app.routes.properties as _props
 print("PROPS_MODULE_FILE:", _props.__file__)
 
@@ -19,8 +34,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so latency includes CORS handling
+app.add_middleware(PrometheusMiddleware, app_name="backend")
+
 # Routes
 app.include_router(properties_router, prefix="/api")
+app.include_router(market_router, prefix="/api")
+app.include_router(changes_router, prefix="/api")
+app.include_router(saved_searches_router, prefix="/api")
 app.include_router(health_router, prefix="/api") 
 
 
@@ -29,3 +50,22 @@ def health():
     return {"status": "ok"}
 
 
+def _snapshot_age() -> float:
+    snap = current_snapshot()
+    if snap is None or snap.source is None:
+        return 0.0
+    try:
+        return time.time() - snap.source.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+# Evaluated at scrape time
+SNAPSHOT_LISTINGS.set_function(lambda: len(current_snapshot().items) if current_snapshot() else 0)
+SNAPSHOT_AGE.set_function(_snapshot_age)
+IMAGE_INDEX_ENTRIES.set_function(lambda: image_index.stats()["entries"])
+IMAGE_VARIANT_CACHE_BYTES.set_function(lambda: variant_cache.stats()["bytes"])
+
+app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+
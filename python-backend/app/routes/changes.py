@@ -0,0 +1,74 @@
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..changes import change_log
+
+router = APIRouter()
+
+# Idle SSE streams get a comment line this often, so proxies keep them open
+SSE_HEARTBEAT_SECONDS = 15
+SSE_BATCH = 500
+
+
+def _check_cursor(since: int, oldest: int) -> None:
+	# Events after the cursor were compacted away: the consumer has to resync.
+	# since=0 is a new consumer, which starts at the oldest event held
+	if since and oldest and since < oldest - 1:
+		raise HTTPException(
+			status_code=410,
+			detail=f"Cursor {since} is older than the change log (oldest seq {oldest}); resync from /api/properties",
+		)
+
+
+async def _sse(request: Request, since: int):
+	cursor = since
+	yield "retry: 3000\n\n"
+	while not await request.is_disconnected():
+		events, _, _ = change_log.read(cursor, SSE_BATCH)
+		if not events:
+			await change_log.wait(cursor, SSE_HEARTBEAT_SECONDS)
+			events, _, _ = change_log.read(cursor, SSE_BATCH)
+			if not events:
+				yield ": keep-alive\n\n"
+				continue
+		for event in events:
+			yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+		cursor = events[-1]["seq"]
+
+
+@router.get("/changes")
+async def list_changes(
+	request: Request,
+	since: int = Query(0, ge=0),
+	limit: int = Query(500, ge=1, le=5000),
+	wait: float = Query(0, ge=0, le=60),
+):
+	"""
+	Listing changes (new / price_changed / removed) after the ``since`` cursor.
+
+	JSON: {events, next, latest}; pass ``next`` back as ``since`` (0, the
+	default, starts at the oldest event still held). With ``wait``
+	the request is held until an event arrives (long-poll). With
+	``Accept: text/event-stream`` the events are streamed as SSE instead,
+	resuming from Last-Event-ID when the client reconnects.
+	"""
+	change_log.refresh()
+	if "text/event-stream" in request.headers.get("accept", ""):
+		last_event_id = request.headers.get("last-event-id", "")
+		if last_event_id.isdigit():
+			since = int(last_event_id)
+		_check_cursor(since, change_log.read(since, 1)[1])
+		return StreamingResponse(
+			_sse(request, since),
+			media_type="text/event-stream",
+			headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+		)
+
+	events, oldest, latest = change_log.read(since, limit)
+	_check_cursor(since, oldest)
+	if not events and wait:
+		await change_log.wait(since, wait)
+		events, _, latest = change_log.read(since, limit)
+	return {"events": events, "next": events[-1]["seq"] if events else since, "latest": latest}
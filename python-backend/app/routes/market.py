@@ -0,0 +1,27 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+
+from core.market_stats import market_stats as load_market_stats
+from core.paths import MARKET_STATS_FILE
+
+router = APIRouter()
+
+# MARKET_STATS_FILE is written by the scraper after each run; reloaded here whenever it changes
+
+
+@router.get("/market-stats")
+def market_stats(outcode: Optional[str] = None, city: Optional[str] = None):
+	"""Per-outcode and per-city price statistics; ?outcode= or ?city= returns just that area."""
+	stats = load_market_stats(MARKET_STATS_FILE)
+	if outcode:
+		entry = stats.outcodes.get(outcode.strip().upper())
+		if entry is None:
+			raise HTTPException(status_code=404, detail="No statistics for that outcode")
+		return {"outcode": outcode.strip().upper(), **entry}
+	if city:
+		entry = stats.cities.get(city.strip().lower())
+		if entry is None:
+			raise HTTPException(status_code=404, detail="No statistics for that city")
+		return entry
+	return stats.summary()
@@ -1,17 +1,25 @@
-import json
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import FileResponse
+from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
 from pathlib import Path
+from starlette.concurrency import run_in_threadpool
 
-router = APIRouter(tags=["properties"])
+from core.image_variants import VARIANT_WIDTHS, snap_width, supported_formats, variant_name
+from core.media_index import ImageEntry
+
+from ..facets import cached_facets, compute_facets
+from ..geo import parse_bbox
+from ..image_cache import image_index, variant_cache
+from ..snapshot import (
+	BASE_DIR,
+	EXPORTS_DIR,
+	FALLBACK_FILE,
+	_get_latest_export_file,
+	get_snapshot,
+)
 
-# Paths (Path-based)
-BASE_DIR = Path(__file__).resolve().parents[2]
-DATA_DIR = BASE_DIR / "data"
-EXPORTS_DIR = DATA_DIR / "exports"
-FALLBACK_FILE = DATA_DIR / "properties.json"
+router = APIRouter(tags=["properties"])
 
 
 class Property(BaseModel):
@@ -35,6 +43,11 @@ class Property(BaseModel):
 	estimatedMonthlyRent: Optional[float] = None
 	estimatedAnnualRent: Optional[float] = None
 	isHighYield: Optional[bool] = None
+	imageVariants: Optional[Dict[str, dict]] = None  # filename -> {lqip, sources: {avif|webp: [{file, w}]}}
+	latitude: Optional[float] = None
+	longitude: Optional[float] = None
+	locationPrecision: Optional[str] = None  # exact (map pin) | postcode | outcode (centroid)
+	duplicates: Optional[List[dict]] = None  # same property listed by other agents / seeds: [{id, sourceUrl, price}]
 
 	def model_dump_public(self) -> dict:
 		"""Dump with 'yield' key instead of yield_."""
@@ -44,46 +57,16 @@ class Property(BaseModel):
 		return data
 
 
-def _get_latest_export_file() -> Optional[Path]:
-	if not EXPORTS_DIR.exists():
-		return None
-	exports = sorted(EXPORTS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
-	return exports[0] if exports else None
-
-
 def _load_properties() -> List[dict]:
-	# Try newest export first
-	try_file: Optional[Path] = _get_latest_export_file()
-
-	# If no exports, try fallback file
-	if try_file is None:
-		try_file = FALLBACK_FILE if FALLBACK_FILE.exists() else None
-
-	# If nothing available
-	if try_file is None:
-		return []
-
-	# Attempt to read chosen file; on error, fall back to fallback file
-	def _read_json(path: Path) -> Optional[List[dict]]:
-		try:
-			with path.open("r", encoding="utf-8") as f:
-				data = json.load(f)
-			# Ensure list return
-			return data if isinstance(data, list) else []
-		except (FileNotFoundError, json.JSONDecodeError):
-			return None
-
-	primary = _read_json(try_file)
-	if primary is not None:
-		return primary
+	return get_snapshot().items
 
-	# Fallback attempt (if primary was an export)
-	if try_file != FALLBACK_FILE and FALLBACK_FILE.exists():
-		fallback = _read_json(FALLBACK_FILE)
-		if fallback is not None:
-			return fallback
 
-	return []
+def _narrow(positions: Optional[List[int]], subset: List[int]) -> List[int]:
+	"""Positions in both; keeps the order of ``positions`` (None = all, so ``subset``'s order)."""
+	if positions is None:
+		return subset
+	keep = set(subset)
+	return [i for i in positions if i in keep]
 
 
 @router.get("/properties")
@@ -94,8 +77,17 @@ def list_properties(
 	beds: Optional[int] = None,
 	yield_param: Optional[float] = Query(None, alias="yield"),
 	page: Optional[int] = None,
+	q: Optional[str] = Query(None, max_length=200),
+	lat: Optional[float] = Query(None, ge=-90, le=90),
+	lng: Optional[float] = Query(None, ge=-180, le=180),
+	radiusKm: Optional[float] = Query(None, gt=0, le=500),
+	bbox: Optional[str] = Query(None, description="minLng,minLat,maxLng,maxLat"),
 ):
-	items = _load_properties()
+	snapshot = get_snapshot()
+	items = snapshot.items
+	positions = _index_positions(snapshot, q, lat, lng, radiusKm, bbox, yield_param)
+	if positions is not None:
+		items = [items[i] for i in positions]
 
 	def matches(p: dict) -> bool:
 		# price filters
@@ -110,14 +102,6 @@ def list_properties(
 		# beds filter
 		if beds is not None and int(p.get("beds", 0)) < int(beds):
 			return False
-		# yield filter
-		if yield_param is not None:
-			prop_yield = p.get("yield")
-			try:
-				if prop_yield is None or float(prop_yield) < float(yield_param):
-					return False
-			except Exception:
-				return False
 		return True
 
 	filtered = [p for p in items if matches(p)]
@@ -128,30 +112,133 @@ def list_properties(
 	return filtered
 
 
+def _index_positions(
+	snapshot,
+	q: Optional[str],
+	lat: Optional[float],
+	lng: Optional[float],
+	radiusKm: Optional[float],
+	bbox: Optional[str],
+	yield_param: Optional[float],
+) -> Optional[List[int]]:
+	"""
+	Apply the index-backed filters (text, geo, yield) as a list of positions;
+	the first ranked one (text relevance, then distance) sets the order.
+	None means no such filter was given, i.e. every listing in export order.
+	"""
+	positions: Optional[List[int]] = None
+	if q and q.strip():
+		positions = snapshot.search(q)
+	if lat is not None or lng is not None or radiusKm is not None:
+		if lat is None or lng is None or radiusKm is None:
+			raise HTTPException(status_code=400, detail="lat, lng and radiusKm must be given together")
+		positions = _narrow(positions, snapshot.geo_index().within_radius(lat, lng, radiusKm)[0])
+	if bbox is not None:
+		box = parse_bbox(bbox)
+		if box is None:
+			raise HTTPException(status_code=400, detail="bbox must be minLng,minLat,maxLng,maxLat")
+		positions = _narrow(positions, snapshot.geo_index().in_bbox(*box))
+	# yield filter: served from the snapshot's sorted yield index
+	if yield_param is not None:
+		positions = _narrow(positions, snapshot.positions_with_min_yield(yield_param))
+	return positions
+
+
+@router.get("/properties/facets")
+def property_facets(
+	minPrice: Optional[float] = None,
+	maxPrice: Optional[float] = None,
+	city: Optional[str] = None,
+	beds: Optional[int] = None,
+	yield_param: Optional[float] = Query(None, alias="yield"),
+	q: Optional[str] = Query(None, max_length=200),
+	lat: Optional[float] = Query(None, ge=-90, le=90),
+	lng: Optional[float] = Query(None, ge=-180, le=180),
+	radiusKm: Optional[float] = Query(None, gt=0, le=500),
+	bbox: Optional[str] = Query(None, description="minLng,minLat,maxLng,maxLat"),
+):
+	"""Counts and min/max/median price and yield per city, bed count and price band for the filter."""
+	snapshot = get_snapshot()
+	key = (
+		minPrice, maxPrice, (city or "").lower() or None, beds, yield_param,
+		(q or "").strip() or None, lat, lng, radiusKm, bbox,
+	)
+
+	def compute() -> dict:
+		positions = _index_positions(snapshot, q, lat, lng, radiusKm, bbox, yield_param)
+		return compute_facets(snapshot.columns(), positions, minPrice, maxPrice, city, beds)
+
+	return cached_facets(snapshot.version, key, compute)
+
+
 @router.get("/properties/{property_id}")
 def get_property(property_id: str):
-	items = _load_properties()
-	for p in items:
-		if str(p.get("id")) == str(property_id):
-			return p
+	p = get_snapshot().by_id.get(str(property_id))
+	if p is not None:
+		return p
 	raise HTTPException(status_code=404, detail="Property not found")
 
 
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+	if if_none_match.strip() == "*":
+		return True
+	return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+async def _serve_image(request: Request, entry: ImageEntry) -> Response:
+	"""
+	Send an indexed file without reading it in Python: 304 on a matching
+	If-None-Match, X-Accel-Redirect when a proxy prefix is configured, otherwise
+	FileResponse (Range support, and sendfile/pathsend where the server offers it).
+	"""
+	etag = entry.etag() if entry.has_etag else await run_in_threadpool(entry.etag)
+	headers = {"ETag": etag, "Cache-Control": IMMUTABLE}
+
+	if_none_match = request.headers.get("if-none-match")
+	if if_none_match and _etag_matches(if_none_match, etag):
+		return Response(status_code=304, headers=headers)
+
+	if entry.accel_path:
+		headers["X-Accel-Redirect"] = entry.accel_path
+		return Response(media_type=entry.media_type, headers=headers)
+
+	return FileResponse(entry.path, media_type=entry.media_type, stat_result=entry.stat, headers=headers)
+
+
 @router.get("/images/{filename}")
-def get_image(filename: str):
+async def get_image(
+	request: Request,
+	filename: str,
+	w: Optional[int] = Query(None, ge=16, le=4096),
+	fmt: Optional[str] = Query(None, pattern="^(webp|avif|jpeg)$"),
+):
 	safe = Path(filename).name
 	if safe != filename:
 		raise HTTPException(status_code=400, detail="Invalid filename")
 
-	backend_root = Path(__file__).resolve().parents[2]  # python-backend/
-	p1 = backend_root / "media_cache" / safe
-	p2 = backend_root.parent / "media_cache" / safe
+	src = image_index.get(safe)
+	if src is None:
+		raise HTTPException(status_code=404, detail="Not Found")
+
+	# No transform requested: serve the cached original as-is
+	if w is None and fmt is None:
+		return await _serve_image(request, src)
+
+	out_fmt = fmt or "webp"
+	if out_fmt not in supported_formats():
+		raise HTTPException(status_code=415, detail=f"Format not supported on this server: {out_fmt}")
+	width = snap_width(w) if w is not None else VARIANT_WIDTHS[-1]
 
-	if p1.exists():
-		return FileResponse(str(p1))
-	if p2.exists():
-		return FileResponse(str(p2))
-	raise HTTPException(status_code=404, detail="Not Found")
+	# Pre-generated during the crawl (or rendered earlier)? Then there is nothing to encode.
+	name = variant_name(safe, width, out_fmt)
+	variant = image_index.get(name)
+	if variant is None:
+		path = await variant_cache.get(src.path, width, out_fmt)
+		variant = image_index.get(name) or image_index.add(path)
+	return await _serve_image(request, variant)
 
 
 @router.get("/debug/source")
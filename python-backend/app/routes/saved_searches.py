@@ -0,0 +1,56 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from pydantic import BaseModel, Field
+
+from core.alerts import CRITERIA, SavedSearchStore
+from core.paths import SAVED_SEARCHES_FILE
+
+router = APIRouter()
+
+# Read by the scraper's alert stage after each run (core/alerts.py)
+saved_searches = SavedSearchStore(SAVED_SEARCHES_FILE)
+
+
+class SavedSearchIn(BaseModel):
+	email: str = Field(..., max_length=254, pattern=r"^[^@\s]+@[^@\s]+$")
+	name: Optional[str] = Field(None, max_length=100)
+	city: Optional[str] = Field(None, max_length=100)
+	minPrice: Optional[float] = Field(None, ge=0)
+	maxPrice: Optional[float] = Field(None, ge=0)
+	minBeds: Optional[int] = Field(None, ge=0, le=20)
+	minYield: Optional[float] = Field(None, ge=0, le=100)
+	maxYield: Optional[float] = Field(None, ge=0, le=100)
+
+
+@router.post("/saved-searches", status_code=201)
+def create_saved_search(search: SavedSearchIn):
+	"""
+	Save a search; its new and re-priced matches go to the alerts outbox after
+	each scrape. The response's ``token`` is needed to read or delete it and
+	is not shown again.
+	"""
+	data = search.model_dump()
+	if all(data[k] is None for k in CRITERIA):
+		raise HTTPException(status_code=400, detail="A saved search needs at least one criterion")
+	for low, high in (("minPrice", "maxPrice"), ("minYield", "maxYield")):
+		if data[low] is not None and data[high] is not None and data[low] > data[high]:
+			raise HTTPException(status_code=400, detail=f"{low} is above {high}")
+	return saved_searches.add(data)
+
+
+# Unknown id and wrong token both answer 404, so ids can't be probed
+
+@router.get("/saved-searches/{search_id}")
+def get_saved_search(search_id: str, token: str = Query(..., max_length=100)):
+	search = saved_searches.get(search_id, token)
+	if search is None:
+		raise HTTPException(status_code=404, detail="Saved search not found")
+	return search
+
+
+@router.delete("/saved-searches/{search_id}", status_code=204)
+def delete_saved_search(search_id: str, token: str = Query(..., max_length=100)):
+	if not saved_searches.remove(search_id, token):
+		raise HTTPException(status_code=404, detail="Saved search not found")
+	return Response(status_code=204)
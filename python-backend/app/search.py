@@ -0,0 +1,139 @@
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Indexed fields and their BM25 term-frequency weights. key_features comes
+# from scrape_detail_page; older exports call it features.
+FIELDS = (("title", 2.0), ("key_features", 1.5), ("features", 1.5), ("description", 1.0), ("address", 1.0))
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def _fold(token: str) -> str:
+	# Light plural folding so "gardens" finds "garden" and "hmos" finds "hmo"
+	if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+		return token[:-1]
+	return token
+
+
+def tokenize(text: str) -> List[str]:
+	# Single letters ("garden's" -> "s") carry nothing; single digits (beds) do
+	return [_fold(t) for t in _TOKEN.findall(text.lower()) if len(t) > 1 or t.isdigit()]
+
+
+def _field_text(value) -> str:
+	if isinstance(value, list):
+		# Separate list items so a phrase can't run from one feature into the next
+		return " | ".join(str(v) for v in value if v)
+	return str(value) if value else ""
+
+
+def parse_query(q: str) -> Tuple[List[str], List[List[str]]]:
+	"""Split a query into bare terms and "quoted phrases" (each a token list)."""
+	terms: List[str] = []
+	phrases: List[List[str]] = []
+	for phrase, word in _QUERY.findall(q):
+		if phrase:
+			tokens = tokenize(phrase)
+			if len(tokens) > 1:
+				phrases.append(tokens)
+			terms.extend(tokens)
+		else:
+			terms.extend(tokenize(word))
+	return terms, phrases
+
+
+class SearchIndex:
+	"""
+	In-memory BM25 inverted index over one snapshot's listings.
+
+	Postings are per term: sorted doc positions plus weighted term frequencies
+	as numpy arrays. A query is an AND of its terms, starting from the rarest
+	term's postings and searchsorted-intersecting the others, with BM25 scored
+	vectorised; quoted phrases are then checked against each candidate's
+	normalised text.
+	"""
+
+	def __init__(self, items: List[dict]):
+		postings: Dict[str, Tuple[list, list]] = {}
+		self._texts: List[str] = []
+		lengths = []
+		for doc, p in enumerate(items):
+			weights: Dict[str, float] = {}
+			field_tokens = []
+			length = 0
+			for field, weight in FIELDS:
+				text = _field_text(p.get(field))
+				if not text:
+					continue
+				# Phrase text keeps " | " between fields and list items
+				segments = [tokenize(segment) for segment in text.split(" | ")]
+				field_tokens.append(" | ".join(" ".join(tokens) for tokens in segments if tokens))
+				for tokens in segments:
+					length += len(tokens)
+					for t in tokens:
+						weights[t] = weights.get(t, 0.0) + weight
+			self._texts.append(" " + " | ".join(field_tokens) + " ")
+			lengths.append(length)
+			for t, w in weights.items():
+				entry = postings.get(t)
+				if entry is None:
+					entry = postings[t] = ([], [])
+				entry[0].append(doc)
+				entry[1].append(w)
+
+		self._postings = {
+			t: (np.array(docs, dtype=np.int32), np.array(tfs, dtype=np.float32))
+			for t, (docs, tfs) in postings.items()
+		}
+		self._lengths = np.array(lengths, dtype=np.float32)
+		self.size = len(items)
+		self._avg_length = float(self._lengths.mean()) if lengths else 0.0
+
+	def _idf(self, df: int) -> float:
+		return math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+
+	def search(self, q: str, limit: Optional[int] = None) -> List[int]:
+		"""Positions of matching listings, best match first."""
+		terms, phrases = parse_query(q)
+		terms = list(dict.fromkeys(terms))
+		if not terms:
+			return []
+		lists = []
+		for t in terms:
+			entry = self._postings.get(t)
+			if entry is None:
+				return []
+			lists.append(entry)
+		lists.sort(key=lambda e: len(e[0]))
+
+		docs, tfs = lists[0]
+		scores = self._bm25(len(docs), tfs, docs)
+		for other_docs, other_tfs in lists[1:]:
+			idx = np.searchsorted(other_docs, docs)
+			idx[idx == len(other_docs)] = 0
+			hit = other_docs[idx] == docs
+			docs, idx = docs[hit], idx[hit]
+			scores = scores[hit] + self._bm25(len(other_docs), other_tfs[idx], docs)
+			if not len(docs):
+				return []
+
+		if phrases:
+			needles = [" " + " ".join(p) + " " for p in phrases]
+			keep = np.fromiter(
+				(all(n in self._texts[d] for n in needles) for d in docs.tolist()), dtype=bool, count=len(docs)
+			)
+			docs, scores = docs[keep], scores[keep]
+
+		# Best score first, ties in export order
+		ranked = docs[np.lexsort((docs, -scores))]
+		return (ranked[:limit] if limit else ranked).tolist()
+
+	def _bm25(self, df: int, tf: np.ndarray, docs: np.ndarray) -> np.ndarray:
+		norm = K1 * (1 - B + B * self._lengths[docs] / self._avg_length) if self._avg_length else K1
+		return self._idf(df) * tf * (K1 + 1) / (tf + norm)
@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.metrics import EXPORT_LOAD_SECONDS, SNAPSHOT_RELOADS
+from core.paths import BASE_DIR, DATA_DIR, EXPORTS_DIR
+
+from .facets import SnapshotColumns
+from .geo import GeoIndex
+from .search import SearchIndex
+
+# Paths shared with the scraper (core/paths.py); YIELDBASE_DATA_DIR points both
+# at another data dir (e.g. a load test's)
+FALLBACK_FILE = DATA_DIR / "properties.json"
+
+
+def _get_latest_export_file() -> Optional[Path]:
+	if not EXPORTS_DIR.exists():
+		return None
+	exports = sorted(EXPORTS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+	return exports[0] if exports else None
+
+
+def _read_json(path: Path) -> Optional[List[dict]]:
+	try:
+		with path.open("r", encoding="utf-8") as f:
+			data = json.load(f)
+		# Ensure list return
+		return data if isinstance(data, list) else []
+	except (FileNotFoundError, json.JSONDecodeError):
+		return None
+
+
+def _as_number(value: Any) -> Optional[float]:
+	if isinstance(value, bool) or not isinstance(value, (int, float)):
+		try:
+			value = float(value)
+		except (TypeError, ValueError):
+			return None
+	return float(value)
+
+
+class PropertySnapshot:
+	"""An immutable, indexed view of one export file."""
+
+	def __init__(self, items: List[dict], source: Optional[Path], mtime_ns: int = 0):
+		self.items = items
+		self.source = source
+		self.version = f"{source.name if source else 'empty'}:{mtime_ns}"
+		self.loaded_at = time.time()
+		self.by_id: Dict[str, dict] = {str(p.get("id")): p for p in items}
+
+		# Yield index: (yield, position) sorted ascending, so a minimum-yield
+		# filter is a bisect + slice instead of a scan over every listing.
+		pairs: List[Tuple[float, int]] = []
+		for idx, p in enumerate(items):
+			y = _as_number(p.get("yield"))
+			if y is not None:
+				pairs.append((y, idx))
+		pairs.sort()
+		self._yield_keys = [y for y, _ in pairs]
+		self._yield_positions = [i for _, i in pairs]
+
+		# Full-text and geo indexes and facet columns: built once per snapshot,
+		# in the background after a reload
+		self._search_index: Optional[SearchIndex] = None
+		self._geo_index: Optional[GeoIndex] = None
+		self._columns: Optional[SnapshotColumns] = None
+		self._index_lock = threading.Lock()
+
+	def positions_with_min_yield(self, min_yield: float) -> List[int]:
+		"""Positions (in original order) of listings whose yield is >= min_yield."""
+		start = bisect_left(self._yield_keys, float(min_yield))
+		return sorted(self._yield_positions[start:])
+
+	def search_index(self) -> SearchIndex:
+		if self._search_index is None:
+			with self._index_lock:
+				if self._search_index is None:
+					self._search_index = SearchIndex(self.items)
+		return self._search_index
+
+	def geo_index(self) -> GeoIndex:
+		if self._geo_index is None:
+			with self._index_lock:
+				if self._geo_index is None:
+					self._geo_index = GeoIndex(self.items)
+		return self._geo_index
+
+	def columns(self) -> SnapshotColumns:
+		if self._columns is None:
+			with self._index_lock:
+				if self._columns is None:
+					self._columns = SnapshotColumns(self.items)
+		return self._columns
+
+	def build_indexes(self) -> None:
+		self.columns()
+		self.geo_index()
+		self.search_index()
+
+	def search(self, q: str) -> List[int]:
+		"""Positions of listings matching a text query, best match first."""
+		return self.search_index().search(q)
+
+
+_lock = threading.Lock()
+_current: Optional[PropertySnapshot] = None
+_current_key: Optional[Tuple[Optional[Path], int]] = None
+
+
+def _choose_source() -> Tuple[Optional[Path], int]:
+	# Try newest export first, then the fallback file
+	path = _get_latest_export_file()
+	if path is None and FALLBACK_FILE.exists():
+		path = FALLBACK_FILE
+	if path is None:
+		return None, 0
+	try:
+		return path, path.stat().st_mtime_ns
+	except FileNotFoundError:
+		return None, 0
+
+
+def _build(path: Optional[Path], mtime_ns: int) -> PropertySnapshot:
+	if path is None:
+		return PropertySnapshot([], None)
+
+	primary = _read_json(path)
+	if primary is not None:
+		return PropertySnapshot(primary, path, mtime_ns)
+
+	# Fallback attempt (if primary was an export)
+	if path != FALLBACK_FILE and FALLBACK_FILE.exists():
+		fallback = _read_json(FALLBACK_FILE)
+		if fallback is not None:
+			return PropertySnapshot(fallback, FALLBACK_FILE, FALLBACK_FILE.stat().st_mtime_ns)
+
+	return PropertySnapshot([], None)
+
+
+def get_snapshot() -> PropertySnapshot:
+	"""Return the current snapshot, rebuilding it only when the chosen file changes."""
+	global _current, _current_key
+	key = _choose_source()
+	if _current is not None and key == _current_key:
+		return _current
+	with _lock:
+		if _current is None or key != _current_key:
+			with EXPORT_LOAD_SECONDS.time():
+				_current = _build(*key)
+			SNAPSHOT_RELOADS.inc()
+			_current_key = key
+			threading.Thread(target=_current.build_indexes, name="snapshot-indexes", daemon=True).start()
+	return _current
+
+
+def current_snapshot() -> Optional[PropertySnapshot]:
+	"""The last loaded snapshot, without checking for a newer export (for metrics)."""
+	return _current
@@ -0,0 +1,20 @@
+"""Parsing: search result pages (extract_data) and property detail pages."""
+import pytest
+
+from core.detail_scraper import parse_detail_html
+from core.extractor import extract_data
+from devtools.rightmove_fixtures import search_page_html
+
+
+@pytest.mark.benchmark(group="parse")
+def test_extract_search_page(benchmark, config):
+    html = search_page_html(24)
+    listings = benchmark(extract_data, html, config)
+    assert len(listings) == 24
+    assert listings[0]["link"].startswith("https://www.rightmove.co.uk/properties/")
+
+
+@pytest.mark.benchmark(group="parse")
+def test_parse_detail_page(benchmark, detail_html):
+    details = benchmark(parse_detail_html, detail_html)
+    assert details
@@ -0,0 +1,108 @@
+"""Scrape-side pipeline stages after parsing: normalise, collapse near-duplicates, write the export, update market stats, match alerts."""
+import json
+
+import pytest
+
+from core.alerts import SearchMatcher, matches
+from core.market_stats import MarketStats
+from core.near_dupes import ListingFeatures, cluster, same_property
+from core.normalizer import normalize_listing
+from core.writer import write_to_json
+from devtools.rightmove_fixtures import saved_searches, with_duplicates
+
+SAVED_SEARCHES = 10000
+# All-pairs comparison is quadratic: only run the baseline up to this size
+PAIRWISE_MAX = 10000
+
+
+@pytest.mark.benchmark(group="normalize")
+def test_normalize(benchmark, raw):
+    listings = benchmark(lambda: [normalize_listing(x) for x in raw])
+    assert listings[0]["price"] > 0 and listings[0]["city"]
+
+
+@pytest.fixture
+def relisted(export_file):
+    # The export plus a 10% re-listing by other agents / overlapping seeds
+    with open(export_file, "r", encoding="utf-8") as f:
+        return with_duplicates(json.load(f))
+
+
+@pytest.mark.benchmark(group="near_dupes")
+def test_near_dupes_lsh(benchmark, relisted):
+    listings, originals = relisted
+    groups = benchmark(cluster, listings)
+    found = {frozenset(listings[i]["id"] for i in group) for group in groups}
+    caught = sum(1 for dup, orig in originals.items() if frozenset((dup, orig)) in found)
+    assert caught >= 0.95 * len(originals)
+
+
+@pytest.mark.benchmark(group="near_dupes")
+def test_near_dupes_pairwise(benchmark, size, relisted):
+    # Baseline: verify every pair, no LSH
+    if size > PAIRWISE_MAX:
+        pytest.skip(f"all-pairs baseline only up to n={PAIRWISE_MAX}")
+    listings, _ = relisted
+    features = [ListingFeatures(x) for x in listings]
+    benchmark.pedantic(
+        lambda: [(a, b) for a in range(len(features)) for b in range(a + 1, len(features))
+                 if same_property(features[a], features[b])],
+        rounds=1,
+    )
+
+
+@pytest.mark.benchmark(group="export")
+def test_write_export(benchmark, size, export_file, tmp_path, capsys):
+    with open(export_file, "r", encoding="utf-8") as f:
+        listings = json.load(f)
+    path = benchmark(write_to_json, listings, "bench", tmp_path)
+    capsys.readouterr()
+    assert path.endswith(".json")
+
+
+@pytest.mark.benchmark(group="market_stats")
+def test_market_stats_rebuild(benchmark, export_file, tmp_path):
+    with open(export_file, "r", encoding="utf-8") as f:
+        listings = json.load(f)
+    result = benchmark(lambda: MarketStats(tmp_path / "none.json").update(listings))
+    assert result["outcodes"]
+
+
+@pytest.mark.benchmark(group="market_stats")
+def test_market_stats_incremental(benchmark, export_file, tmp_path):
+    # A re-scrape where 1% of listings changed price: only their areas re-aggregate
+    with open(export_file, "r", encoding="utf-8") as f:
+        listings = json.load(f)
+    stats = MarketStats(tmp_path / "none.json")
+    stats.update(listings)
+    changed = listings[::100]
+
+    def rescrape():
+        for listing in changed:
+            listing["price"] += 1000
+        return stats.update(listings)
+
+    result = benchmark(rescrape)
+    assert result["changed"] == len(changed)
+
+
+@pytest.fixture(scope="module")
+def searches():
+    return saved_searches(SAVED_SEARCHES)
+
+
+@pytest.mark.benchmark(group="alerts")
+def test_match_alerts_indexed(benchmark, export_file, searches):
+    # A run's churn (1% of the export) against the saved searches
+    with open(export_file, "r", encoding="utf-8") as f:
+        changed = json.load(f)[::100]
+    matcher = SearchMatcher(searches)
+    benchmark(lambda: [matcher.match(listing) for listing in changed])
+
+
+@pytest.mark.benchmark(group="alerts")
+def test_match_alerts_scan(benchmark, export_file, searches):
+    # Baseline: every search against every changed listing
+    with open(export_file, "r", encoding="utf-8") as f:
+        changed = json.load(f)[::100]
+    benchmark.pedantic(lambda: [[s for s in searches if matches(s, listing)] for listing in changed], rounds=3)
@@ -0,0 +1,116 @@
+"""
+API-side stages over a snapshot: loading an export, filtering, lookup,
+pagination and JSON serialisation, plus one full request through the app.
+"""
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.routes import properties
+from app.snapshot import _build
+
+
+def list_properties(minPrice=None, maxPrice=None, city=None, beds=None, min_yield=None, page=None, q=None,
+                    lat=None, lng=None, radiusKm=None, bbox=None):
+    # Called directly, so every Query() default has to be passed explicitly
+    return properties.list_properties(minPrice, maxPrice, city, beds, min_yield, page, q, lat, lng, radiusKm, bbox)
+
+
+def property_facets(minPrice=None, maxPrice=None, city=None, beds=None, min_yield=None, q=None,
+                    lat=None, lng=None, radiusKm=None, bbox=None):
+    return properties.property_facets(minPrice, maxPrice, city, beds, min_yield, q, lat, lng, radiusKm, bbox)
+
+
+@pytest.fixture
+def snapshot(export_file, monkeypatch):
+    snap = _build(export_file, export_file.stat().st_mtime_ns)
+    monkeypatch.setattr(properties, "get_snapshot", lambda: snap)
+    return snap
+
+
+@pytest.mark.benchmark(group="snapshot")
+def test_load_snapshot(benchmark, export_file):
+    snap = benchmark(_build, export_file, export_file.stat().st_mtime_ns)
+    assert snap.items
+
+
+@pytest.mark.benchmark(group="filter")
+def test_filter_price_city_beds(benchmark, snapshot):
+    result = benchmark(list_properties, 80000, 250000, "man", 2)
+    assert all(80000 <= p["price"] <= 250000 for p in result)
+
+
+@pytest.mark.benchmark(group="filter")
+def test_filter_min_yield(benchmark, snapshot):
+    result = benchmark(list_properties, min_yield=8.0)
+    assert all(p["yield"] >= 8.0 for p in result)
+
+
+@pytest.mark.benchmark(group="search")
+def test_build_search_index(benchmark, snapshot):
+    from app.search import SearchIndex
+
+    index = benchmark.pedantic(SearchIndex, args=(snapshot.items,), rounds=3)
+    assert index.size == len(snapshot.items)
+
+
+@pytest.mark.benchmark(group="search")
+def test_search(benchmark, snapshot):
+    snapshot.search("warm")
+    queries = ["hmo", "garden parking", '"chain free" flat', "terraced house 3"]
+    benchmark(lambda: [list_properties(q=q) for q in queries])
+
+
+@pytest.mark.benchmark(group="geo")
+def test_radius(benchmark, snapshot):
+    snapshot.geo_index()
+    result = benchmark(list_properties, lat=53.4808, lng=-2.2426, radiusKm=5)
+    assert result
+
+
+@pytest.mark.benchmark(group="geo")
+def test_bbox(benchmark, snapshot):
+    snapshot.geo_index()
+    result = benchmark(list_properties, bbox="-2.35,53.42,-2.10,53.55")
+    assert result
+
+
+@pytest.mark.benchmark(group="facets")
+def test_facets(benchmark, snapshot, monkeypatch):
+    # Uncached: time the aggregation, not the LRU
+    monkeypatch.setattr(properties, "cached_facets", lambda version, key, compute: compute())
+    snapshot.columns()
+    filters = [{}, {"city": "man", "beds": 2}, {"maxPrice": 150000, "min_yield": 7.0}, {"q": "garden"}]
+    result = benchmark(lambda: [property_facets(**f) for f in filters])
+    assert result[0]["total"] == len(snapshot.items)
+
+
+@pytest.mark.benchmark(group="filter")
+def test_lookup_by_id(benchmark, snapshot):
+    ids = [p["id"] for p in snapshot.items[::97]]
+    benchmark(lambda: [properties.get_property(i) for i in ids])
+
+
+@pytest.mark.benchmark(group="paginate")
+def test_paginate(benchmark, snapshot):
+    # The API returns every match and the frontend pages client-side (24 per
+    # page); time slicing out every page of the unfiltered list
+    items = list_properties()
+    benchmark(lambda: [items[i:i + 24] for i in range(0, len(items), 24)])
+
+
+@pytest.mark.benchmark(group="serialise")
+def test_serialise(benchmark, snapshot):
+    items = list_properties()
+    body = benchmark(lambda: JSONResponse(jsonable_encoder(items)).body)
+    assert body.startswith(b"[")
+
+
+@pytest.mark.benchmark(group="request")
+def test_request_properties(benchmark, snapshot):
+    from app.main import app
+
+    client = TestClient(app)
+    resp = benchmark(client.get, "/api/properties", params={"maxPrice": 150000, "beds": 2, "page": 2})
+    assert resp.status_code == 200
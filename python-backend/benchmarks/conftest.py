@@ -0,0 +1,65 @@
+"""
+Shared fixtures for the offline benchmarks. Listing counts come from
+BENCH_SIZES (comma separated, default 1000,10000,100000); synthetic exports
+are generated once per size and session.
+"""
+import json
+import os
+from pathlib import Path
+
+import pytest
+import yaml
+
+from core.telemetry import telemetry
+from devtools.rightmove_fixtures import export_listings, raw_listings
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SIZES = [int(s) for s in os.getenv("BENCH_SIZES", "1000,10000,100000").split(",") if s.strip()]
+
+
+def pytest_generate_tests(metafunc):
+    if "size" in metafunc.fixturenames:
+        metafunc.parametrize("size", SIZES, ids=[f"n={n}" for n in SIZES])
+
+
+@pytest.fixture(autouse=True)
+def _quiet_telemetry():
+    # Instrumented code appends a span per call; don't let that grow unbounded
+    telemetry.reset()
+    yield
+    telemetry.reset()
+
+
+@pytest.fixture(scope="session")
+def config():
+    with open(BACKEND_DIR / "config" / "rightmove.yaml", "r") as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture(scope="session")
+def detail_html():
+    return (BACKEND_DIR / "sample-html.txt").read_text(encoding="utf-8")
+
+
+_exports = {}
+
+
+@pytest.fixture(scope="session")
+def export_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("exports")
+
+
+@pytest.fixture
+def export_file(size, export_dir):
+    """Path to a synthetic export of ``size`` listings (written as the scraper does)."""
+    if size not in _exports:
+        path = export_dir / f"rightmove_synthetic_{size}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(export_listings(size), f, indent=2, ensure_ascii=False)
+        _exports[size] = path
+    return _exports[size]
+
+
+@pytest.fixture
+def raw(size):
+    return raw_listings(size)
@@ -0,0 +1,50 @@
+"""
+Run the offline benchmarks and fail on regressions against a stored baseline.
+
+    python benchmarks/run.py                      # compare with the baseline; exit 1 on regression
+    python benchmarks/run.py --save-baseline      # record a new baseline on this machine
+    python benchmarks/run.py --sizes 1000,500000 -- -k snapshot
+
+Baselines are kept per machine/interpreter under benchmarks/.baseline/ (timings
+from different hardware are not comparable). Without a baseline the run just
+reports and saves one.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+STORAGE = BENCH_DIR / ".baseline"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--sizes", default=None, help="listing counts, e.g. 1000,10000,100000,500000")
+    parser.add_argument("--fail-over", default="median:20%",
+                        help="regression threshold per benchmark (pytest-benchmark --benchmark-compare-fail)")
+    parser.add_argument("pytest_args", nargs="*", help="extra pytest arguments (after --)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.sizes:
+        env["BENCH_SIZES"] = args.sizes
+
+    cmd = [sys.executable, "-m", "pytest", str(BENCH_DIR), f"--benchmark-storage=file://{STORAGE}"]
+    has_baseline = any(STORAGE.glob("*/*_baseline.json"))
+    if args.save_baseline or not has_baseline:
+        if not has_baseline:
+            print("[i] No baseline yet: this run will be saved as the baseline")
+        cmd.append("--benchmark-save=baseline")
+    else:
+        cmd += ["--benchmark-compare=*baseline", f"--benchmark-compare-fail={args.fail_over}"]
+    cmd += args.pytest_args
+
+    print("[⏱️]", " ".join(cmd))
+    sys.exit(subprocess.call(cmd, cwd=BENCH_DIR.parent, env=env))
+
+
+if __name__ == "__main__":
+    main()
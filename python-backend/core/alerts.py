@@ -0,0 +1,406 @@
+"""
+Saved-search alerts: match each scrape's new and re-priced listings (the
+change feed's events) against investors' saved searches, and append the
+matches to an outbox for a notifier to send (stdlib only).
+
+A saved search is {id, name, email, city, minPrice, maxPrice, minBeds,
+minYield, maxYield}; any criterion may be left out. Creating one returns a
+secret token, stored only as a hash, which reading or deleting it requires. Rather than testing every
+search against every listing, the matcher indexes the searches: a hash
+bucket per city (plus one for "any city"), each holding interval trees over
+the searches' price and yield ranges, so a listing only checks the searches
+whose ranges contain its price and yield.
+
+Alerts fire for a new listing that matches, and for a price change that
+either brings a listing into a search or lowers its price. The stage reads
+the change log from its own cursor (the last seq it matched), so events from
+a run whose alert stage failed are matched by the next run.
+
+    SAVED_SEARCHES_FILE   the store (default data/saved_searches.json, see core/paths.py)
+    ALERTS_OUTBOX_FILE    matches for the notifier, JSON lines (default data/alerts_outbox.jsonl)
+    ALERTS_CURSOR_FILE    last change feed seq matched (default data/alerts_cursor.json)
+"""
+import hashlib
+import hmac
+import json
+import math
+import os
+import secrets
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: the store is then only safe within one process (one uvicorn worker)
+    fcntl = None
+
+from core.paths import ALERTS_CURSOR_FILE, ALERTS_OUTBOX_FILE, CHANGE_LOG_FILE, SAVED_SEARCHES_FILE
+
+CRITERIA = ("city", "minPrice", "maxPrice", "minBeds", "minYield", "maxYield")
+ANY_CITY = ""
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _bounds(search, low_key, high_key):
+    low, high = _number(search.get(low_key)), _number(search.get(high_key))
+    return (-math.inf if low is None else low), (math.inf if high is None else high)
+
+
+def matches(search, listing):
+    """Whether a listing (or change-event summary) meets every criterion the search sets."""
+    city = str(search.get("city") or "").strip().lower()
+    if city and str(listing.get("city") or "").strip().lower() != city:
+        return False
+    price = _number(listing.get("price"))
+    low, high = _bounds(search, "minPrice", "maxPrice")
+    if price is None or not low <= price <= high:
+        return False
+    min_beds = _number(search.get("minBeds"))
+    if min_beds is not None and (_number(listing.get("beds")) or 0) < min_beds:
+        return False
+    low, high = _bounds(search, "minYield", "maxYield")
+    if (low, high) != (-math.inf, math.inf):
+        value = _number(listing.get("yield"))
+        if value is None or not low <= value <= high:
+            return False
+    return True
+
+
+class IntervalTree:
+    """
+    Static centred interval tree over closed intervals (low, high, key).
+
+    stab(x) returns the keys of every interval containing x in
+    O(log n + matches): each node keeps the intervals straddling its centre,
+    sorted by low and by high, and only one side of the tree is descended.
+    """
+
+    def __init__(self, intervals):
+        self._root = self._build(list(intervals))
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        finite = sorted(v for low, high, _ in intervals for v in (low, high) if math.isfinite(v))
+        center = finite[len(finite) // 2] if finite else 0.0
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        return (
+            center,
+            sorted(here, key=lambda i: i[0]),
+            sorted(here, key=lambda i: -i[1]),
+            self._build(left),
+            self._build(right),
+        )
+
+    def stab(self, x):
+        found = []
+        node = self._root
+        while node is not None:
+            center, by_low, by_high, left, right = node
+            if x < center:
+                # Straddlers all end past x; those starting at or before x contain it
+                for low, _, key in by_low:
+                    if low > x:
+                        break
+                    found.append(key)
+                node = left
+            else:
+                for _, high, key in by_high:
+                    if high < x:
+                        break
+                    found.append(key)
+                node = right if x > center else None
+        return found
+
+
+class SearchMatcher:
+    """Saved searches indexed by city bucket, then by price and yield range."""
+
+    def __init__(self, searches):
+        self.searches = {s["id"]: s for s in searches}
+        grouped = {}
+        for search in searches:
+            city = str(search.get("city") or "").strip().lower()
+            grouped.setdefault(city, []).append(search)
+        self._buckets = {}
+        for city, group in grouped.items():
+            price = IntervalTree((*_bounds(s, "minPrice", "maxPrice"), s["id"]) for s in group)
+            constrained = [s for s in group if _bounds(s, "minYield", "maxYield") != (-math.inf, math.inf)]
+            yields = IntervalTree((*_bounds(s, "minYield", "maxYield"), s["id"]) for s in constrained)
+            self._buckets[city] = (price, yields, {s["id"] for s in constrained})
+
+    def candidates(self, listing):
+        """Ids of searches whose city, price and yield criteria admit the listing."""
+        price = _number(listing.get("price"))
+        if price is None:
+            return []
+        value = _number(listing.get("yield"))
+        city = str(listing.get("city") or "").strip().lower()
+        found = []
+        for key in {city, ANY_CITY}:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            price_tree, yield_tree, constrained = bucket
+            by_price = price_tree.stab(price)
+            # Searches with a yield range must also contain the listing's yield
+            in_yield = set(yield_tree.stab(value)) if value is not None else set()
+            found.extend(i for i in by_price if i not in constrained or i in in_yield)
+        return found
+
+    def match(self, listing):
+        """Searches the listing fully matches: the candidates that also pass their beds minimum."""
+        beds = _number(listing.get("beds")) or 0
+        found = []
+        for i in self.candidates(listing):
+            search = self.searches[i]
+            min_beds = _number(search.get("minBeds"))
+            if min_beds is None or beds >= min_beds:
+                found.append(search)
+        return found
+
+
+class SavedSearchStore:
+    """
+    Saved searches in one JSON file, written atomically. Updates hold an
+    exclusive lock on a sidecar ``.lock`` file across the read-modify-write,
+    so API workers (uvicorn --workers N) don't lose each other's changes.
+    """
+
+    def __init__(self, path=SAVED_SEARCHES_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_name(self.path.name + ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self):
+        """The stored searches; raises ValueError if the file is unreadable (missing is empty)."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"{self.path} unreadable: {e}") from e
+        return data.get("searches", []) if isinstance(data, dict) else []
+
+    def load(self):
+        """The stored searches, or none (logged) if the file is unreadable."""
+        try:
+            return self.read()
+        except ValueError as e:
+            print(f"[⚠️] Saved searches: {e}")
+            return []
+
+    def _load_for_update(self):
+        try:
+            return self.read()
+        except ValueError as e:
+            # Keep the damaged file for recovery rather than overwrite it
+            aside = self.path.with_name(f"{self.path.name}.corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+            os.replace(self.path, aside)
+            print(f"[⚠️] Saved searches: {e}; moved to {aside}, starting a new store")
+            return []
+
+    def _save(self, searches):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"searches": searches}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def add(self, search):
+        """
+        Store a search (criteria plus optional name/email). Returns it with its
+        id, createdAt and ``token``: the only copy of the secret that get() and
+        remove() require, since the store keeps just its hash.
+        """
+        token = secrets.token_urlsafe(24)
+        entry = {k: v for k, v in search.items() if v is not None}
+        entry["id"] = uuid.uuid4().hex[:12]
+        entry["createdAt"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        entry["tokenHash"] = _token_hash(token)
+        with self._locked():
+            searches = self._load_for_update()
+            searches.append(entry)
+            self._save(searches)
+        return dict(public(entry), token=token)
+
+    def get(self, search_id, token):
+        """The search (without its token hash) if ``token`` is its secret, else None."""
+        for search in self.load():
+            if search.get("id") == search_id:
+                return public(search) if _token_ok(search, token) else None
+        return None
+
+    def remove(self, search_id, token):
+        """Delete the search if ``token`` is its secret; False if there is no such search or the token is wrong."""
+        with self._locked():
+            searches = self._load_for_update()
+            kept = [s for s in searches if not (s.get("id") == search_id and _token_ok(s, token))]
+            if len(kept) == len(searches):
+                return False
+            self._save(kept)
+        return True
+
+
+def _token_hash(token):
+    return hashlib.sha256(str(token).encode("utf-8")).hexdigest()
+
+
+def _token_ok(search, token):
+    stored = search.get("tokenHash")
+    return bool(stored and token) and hmac.compare_digest(stored, _token_hash(token))
+
+
+def public(search):
+    """A stored search as the API returns it: without the token hash."""
+    return {k: v for k, v in search.items() if k != "tokenHash"}
+
+
+def _reason(search, event):
+    """Why a matching change event is worth an alert, or None if it isn't."""
+    if event["type"] == "new":
+        return "new"
+    previous = dict(event["listing"], price=event.get("previousPrice"))
+    if not matches(search, previous):
+        return "now_matches"
+    if (_number(event.get("price")) or 0) < (_number(event.get("previousPrice")) or 0):
+        return "price_drop"
+    # Still matching and not cheaper: already alerted on
+    return None
+
+
+def _read_cursor(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(json.load(f)["seq"])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"[⚠️] Alerts cursor unreadable ({e}); matching this run's events only")
+        return None
+
+
+def _save_cursor(path, seq):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"seq": seq}, f)
+    os.replace(tmp, path)
+
+
+def _logged_events(log_path, since):
+    """Change log events after seq ``since``, oldest first."""
+    events = []
+    try:
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(event, dict) and isinstance(event.get("seq"), int) and event["seq"] > since:
+                    events.append(event)
+    except FileNotFoundError:
+        pass
+    return events
+
+
+def match_alerts(
+    events,
+    store_path=SAVED_SEARCHES_FILE,
+    outbox_path=ALERTS_OUTBOX_FILE,
+    log_path=CHANGE_LOG_FILE,
+    cursor_path=ALERTS_CURSOR_FILE,
+):
+    """
+    Pipeline stage: match new / price_changed events against saved searches;
+    append alerts to the outbox.
+
+    ``events`` are this run's; with a cursor from an earlier run the change
+    log is read from it instead, picking up any run whose alerts were never
+    matched. The cursor only advances once the alerts are in the outbox.
+    """
+    cursor = _read_cursor(cursor_path)
+    if cursor is not None:
+        events = _logged_events(log_path, cursor)
+        if events and events[0]["seq"] > cursor + 1:
+            print(f"[⚠️] Alerts: change log compacted past cursor {cursor}; events up to {events[0]['seq'] - 1} skipped")
+    seqs = [e["seq"] for e in events if isinstance(e.get("seq"), int)]
+    if cursor is None and not seqs:
+        # First run with nothing to match: start after the log's history, not before it
+        seqs = [e["seq"] for e in _logged_events(log_path, 0)[-1:]]
+    latest = max([cursor or 0] + seqs)
+
+    try:
+        searches = SavedSearchStore(store_path).read()
+    except ValueError as e:
+        # Leave the cursor: these events are matched once the store is readable again
+        print(f"[⚠️] Alerts skipped: {e}")
+        return []
+    changes = [e for e in events if e.get("type") in ("new", "price_changed") and e.get("listing")]
+    if not searches or not changes:
+        print(f"[🔔] Alerts: {len(searches)} saved searches, {len(changes)} new/re-priced listings; nothing to match")
+        _save_cursor(cursor_path, latest)
+        return []
+
+    matcher = SearchMatcher(searches)
+    at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    alerts = []
+    for event in changes:
+        for search in matcher.match(event["listing"]):
+            reason = _reason(search, event)
+            if reason is None:
+                continue
+            alerts.append({
+                "id": f"{search['id']}:{event['id']}:{event['seq']}",
+                "searchId": search["id"],
+                "email": search.get("email"),
+                "listingId": event["id"],
+                "reason": reason,
+                "seq": event["seq"],
+                "at": at,
+                "listing": event["listing"],
+            })
+
+    if alerts:
+        outbox = Path(outbox_path)
+        outbox.parent.mkdir(parents=True, exist_ok=True)
+        with open(outbox, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(a, ensure_ascii=False) + "\n" for a in alerts))
+            f.flush()
+            os.fsync(f.fileno())
+    _save_cursor(cursor_path, latest)
+    print(f"[🔔] Alerts: {len(alerts)} matches for {len(searches)} saved searches over {len(changes)} listings → {outbox_path}")
+    return alerts
@@ -2,16 +2,45 @@ from playwright.sync_api import sync_playwright
 import os
 import time
 import random
+import multiprocessing
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from core.extractor import extract_data
 from core.detail_scraper import scrape_detail_page
+from core.image_variants import generate_listing_variants
+from core.site import polite_delay, retry_after, site_url
+from core.telemetry import telemetry
 
 class BrowserCrawler:
-    def __init__(self, base_url, config):
+    def __init__(self, base_url, config, variant_workers=2, retries=3, deduper=None):
         self.base_url = base_url
         self.config = config
+        self.retries = retries
+        # Shared core.near_dupes.CrawlDeduper: cards already enriched by this
+        # or an earlier (finished) seed skip their detail page and thumbnails.
+        self.deduper = deduper
+        # Responsive WebP/AVIF variants + LQIP are encoded in background
+        # processes while the crawl keeps going; 0 disables pre-generation.
+        self.variant_workers = variant_workers
 
     def crawl(self, pages=1, limit=None):
+        variant_jobs = []
+        try:
+            with self._variant_pool() as pool:
+                all_listings = self._crawl_pages(pages, limit, pool, variant_jobs)
+                with telemetry.span("variants.wait"):
+                    self._collect_variants(variant_jobs)
+        except BaseException:
+            # The caller drops this seed: later seeds mustn't skip cards as its duplicates
+            if self.deduper:
+                self.deduper.discard()
+            raise
+        if self.deduper:
+            self.deduper.commit()
+        return all_listings
+
+    def _crawl_pages(self, pages, limit, pool, variant_jobs):
         all_listings = []
 
         with sync_playwright() as p:
@@ -20,8 +49,9 @@ class BrowserCrawler:
                 "AppleWebKit/537.36 (KHTML, like Gecko) "
                 "Chrome/124.0.0.0 Safari/537.36"
             )
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(user_agent=user_agent)
+            with telemetry.span("browser.launch"):
+                browser = p.chromium.launch(headless=True)
+                page = browser.new_page(user_agent=user_agent)
 
             for page_num in range(pages):
                 page_url = (
@@ -30,18 +60,22 @@ class BrowserCrawler:
                     self.base_url
                 )
                 print(f"\n🌐 [INFO] Crawling page {page_num + 1}: {page_url}")
-                page.goto(page_url, timeout=60000)
+                self._goto(page, page_url)
 
                 try:
-                    page.wait_for_selector(
-                        self.config['selectors']['item'],
-                        timeout=15000,
-                        state="visible"
-                    )
+                    with telemetry.span("page.wait_for_selector"):
+                        page.wait_for_selector(
+                            self.config['selectors']['item'],
+                            timeout=15000,
+                            state="visible"
+                        )
                 except Exception as e:
+                    telemetry.count("page.selector_missing")
                     print(f"[⚠️ WARN] Selector not found on page {page_num + 1}: {e}")
 
-                html = page.content()
+                with telemetry.span("page.content"):
+                    html = page.content()
+                telemetry.count("bytes.search_page", len(html.encode("utf-8")))
                 listings = extract_data(html, self.config)
 
                 # Apply per-seed limit BEFORE enrichment
@@ -54,16 +88,26 @@ class BrowserCrawler:
                         pass
 
                 for i, listing in enumerate(listings):
+                    duplicate_of = self.deduper.claim(listing) if self.deduper else None
+                    if duplicate_of:
+                        # Folded into the enriched listing by core.near_dupes.collapse_duplicates
+                        listing["duplicate_of"] = duplicate_of
+                        telemetry.count("listings.duplicate_skipped")
+                        print(f"\n♻️ [DETAIL] Skipping listing {i+1}/{len(listings)}: duplicate of {duplicate_of}")
+                        continue
+
                     print(f"\n🔍 [DETAIL] Enriching listing {i+1}/{len(listings)}")
 
                     # Detail page enrich
                     detail_url = listing.get("link")
                     if detail_url:
-                        details = scrape_detail_page(detail_url)
+                        with telemetry.span("detail.total"):
+                            details = scrape_detail_page(detail_url)
                         listing.update(details)
 
                         # Be polite with a delay
-                        time.sleep(random.uniform(5.0, 9.5))
+                        with telemetry.span("detail.polite_sleep"):
+                            time.sleep(polite_delay(random.uniform(5.0, 9.5)))
 
                     # ✅ Featured thumbnail
                     thumb_url = listing.get("image", "").replace("max_1024x768", "max_476x317")
@@ -72,6 +116,7 @@ class BrowserCrawler:
                         if path:
                             listing["image"] = Path(path).name  # Just filename, no directory
                             listing["image_path"] = path  # Keep full path for backwards compatibility
+                            self._queue_variants(pool, variant_jobs, listing, path)
 
                     # ✅ Gallery thumbnails
                     thumb_paths = []
@@ -84,6 +129,7 @@ class BrowserCrawler:
                         if path:
                             thumb_paths.append(path)  # Full path
                             thumb_filenames.append(Path(path).name)  # Just filename
+                            self._queue_variants(pool, variant_jobs, listing, path)
                     listing["images"] = thumb_filenames  # Just filenames for frontend
                     listing["image_paths"] = thumb_paths  # Keep full paths for backwards compatibility
 
@@ -91,32 +137,87 @@ class BrowserCrawler:
                 all_listings.extend(listings)
 
                 # Delay between pages
-                time.sleep(random.uniform(7.0, 12.0))
+                with telemetry.span("page.polite_sleep"):
+                    time.sleep(polite_delay(random.uniform(7.0, 12.0)))
 
             browser.close()
 
         return all_listings
 
+    def _goto(self, page, page_url):
+        """Load a search page, backing off on 429 as the server's Retry-After asks."""
+        for attempt in range(self.retries + 1):
+            with telemetry.span("page.goto"):
+                resp = page.goto(site_url(page_url), timeout=60000)
+            telemetry.count("requests.search_page")
+            if resp is None or resp.status != 429 or attempt == self.retries:
+                return resp
+            telemetry.count("http.429")
+            wait = retry_after(resp.headers.get("retry-after"), 2 ** (attempt + 1))
+            print(f"[WAIT] 429 on search page. Retrying in {wait:.1f}s...")
+            with telemetry.span("page.backoff_sleep"):
+                time.sleep(wait)
+
+    def _variant_pool(self):
+        if not self.variant_workers:
+            return nullcontext(None)
+        # spawn, not fork: the parent process is running Playwright threads
+        return ProcessPoolExecutor(
+            max_workers=self.variant_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def _queue_variants(self, pool, variant_jobs, listing, path):
+        if pool is not None:
+            variant_jobs.append((listing, pool.submit(generate_listing_variants, path)))
+
+    def _collect_variants(self, variant_jobs):
+        """Attach finished variant metadata to listings as imageVariants[filename]."""
+        done = 0
+        for listing, future in variant_jobs:
+            try:
+                meta = future.result()
+            except Exception as e:
+                print(f"[⚠️] Variant generation failed: {e}")
+                continue
+            listing.setdefault("imageVariants", {})[meta["src"]] = meta
+            done += 1
+        if variant_jobs:
+            print(f"[🖼️] Pre-generated responsive variants for {done}/{len(variant_jobs)} images")
+
     def _download_thumbnail(self, page, url):
         referer = url.split("/dir/")[0]
         path = self._save_path_for(url)
 
         # ✅ Skip if already downloaded
         if os.path.exists(path):
+            telemetry.count("thumbnail.cache_hit")
             print(f"[⚡] Skipped cached image: {path}")
             return path
 
         try:
-            resp = page.request.get(url, headers={"Referer": referer})
+            for attempt in range(self.retries + 1):
+                with telemetry.span("thumbnail.download"):
+                    resp = page.request.get(site_url(url), headers={"Referer": referer})
+                    body = resp.body() if resp.ok else b""
+                telemetry.count("requests.thumbnail")
+                if resp.status != 429 or attempt == self.retries:
+                    break
+                telemetry.count("http.429")
+                with telemetry.span("thumbnail.backoff_sleep"):
+                    time.sleep(retry_after(resp.headers.get("retry-after"), 2 ** (attempt + 1)))
             if resp.ok:
+                telemetry.count("bytes.thumbnail", len(body))
                 os.makedirs(os.path.dirname(path), exist_ok=True)
                 with open(path, "wb") as f:
-                    f.write(resp.body())
+                    f.write(body)
                 print(f"[✅] Downloaded thumbnail → {path}")
                 return path
             else:
+                telemetry.count("thumbnail.failed")
                 print(f"[❌] Thumbnail download failed ({resp.status}) for: {url}")
         except Exception as e:
+            telemetry.count("thumbnail.failed")
             print(f"[❌] Exception downloading thumbnail: {url} | {e}")
         return None
 
@@ -0,0 +1,191 @@
+"""
+Listing change feed: each scrape is diffed by ID against the previous run's
+state and the differences are appended to data/changes.jsonl (stdlib only).
+
+One JSON event per line, with a sequence number that only grows:
+
+    {"seq": 42, "type": "new" | "price_changed" | "removed", "id": ..., "at": ...,
+     "runId": ..., "price": ..., "previousPrice": ..., "listing": {summary}}
+
+Consumers keep the last seq they processed and ask for what came after it
+(GET /api/changes?since=). Delivery is at-least-once: if a run dies between
+appending events and saving its state, the next run emits them again.
+
+    CHANGE_LOG_FILE         the event log (default data/changes.jsonl, see core/paths.py)
+    CHANGE_STATE_FILE       previous-run state (default data/change_state.json)
+    CHANGE_LOG_MAX_EVENTS   events kept in the log; older ones are compacted away (default 50000)
+"""
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from core.paths import CHANGE_LOG_FILE, CHANGE_STATE_FILE
+
+MAX_EVENTS = int(os.getenv("CHANGE_LOG_MAX_EVENTS", "50000"))
+
+# Listing fields carried on new / price_changed events, enough for a consumer
+# to act without fetching the listing
+SUMMARY_FIELDS = ("id", "title", "price", "city", "postcode", "beds", "yield", "sourceUrl", "image")
+
+
+def _price(listing):
+    try:
+        return int(float(listing.get("price") or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def summary(listing):
+    return {k: listing.get(k) for k in SUMMARY_FIELDS if listing.get(k) is not None}
+
+
+def diff_listings(previous, listings, complete=True):
+    """
+    Events (without seq) turning ``previous`` (id -> price) into ``listings``.
+
+    Removals are only reported for a ``complete`` run; after a partial one
+    (a seed failed, or --limit) the missing listings are carried over instead.
+    Returns (events, state) where state is the new id -> price map.
+    """
+    events = []
+    state = {}
+    for listing in listings:
+        listing_id = str(listing.get("id") or "")
+        if not listing_id or listing_id in state:
+            continue
+        price = _price(listing)
+        state[listing_id] = price
+        if listing_id not in previous:
+            events.append({"type": "new", "id": listing_id, "price": price, "listing": summary(listing)})
+        elif previous[listing_id] != price:
+            events.append({
+                "type": "price_changed",
+                "id": listing_id,
+                "price": price,
+                "previousPrice": previous[listing_id],
+                "listing": summary(listing),
+            })
+    for listing_id, price in previous.items():
+        if listing_id in state:
+            continue
+        if complete:
+            events.append({"type": "removed", "id": listing_id, "previousPrice": price})
+        else:
+            state[listing_id] = price
+    return events, state
+
+
+class ChangeFeed:
+    """Writer side: previous-run state plus the append-only event log."""
+
+    def __init__(self, log_path=CHANGE_LOG_FILE, state_path=CHANGE_STATE_FILE):
+        self.log_path = Path(log_path)
+        self.state_path = Path(state_path)
+        self.seq = 0
+        self.logged = 0
+        self.listings = None
+        self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"[⚠️] Change state unreadable ({e}); next run is treated as the first")
+            # Carry on from the log's last seq, so consumer cursors stay valid
+            self.seq = self._last_logged_seq()
+            return
+        self.seq = int(state.get("seq", 0))
+        self.logged = int(state.get("logged", 0)) if self.log_path.exists() else 0
+        self.listings = state.get("listings")
+
+    def _last_logged_seq(self):
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(max(0, f.seek(0, os.SEEK_END) - 65536))
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return 0
+        for line in reversed(lines):
+            try:
+                return int(json.loads(line)["seq"])
+            except (ValueError, KeyError, TypeError):
+                continue
+        return 0
+
+    def record(self, listings, complete=True, run_id=None):
+        """Diff a run against the previous one, append its events and save the new state. Returns the events."""
+        events, state = diff_listings(self.listings or {}, listings, complete)
+        if self.listings is None:
+            # First run: a baseline, not thousands of "new" events
+            events = []
+
+        at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        for event in events:
+            self.seq += 1
+            event.update({"seq": self.seq, "at": at, "runId": run_id})
+        if events:
+            self._append(events)
+        self.listings = state
+        self._save_state()
+        return events
+
+    def _append(self, events):
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        # Field order: cursor and type first, for people reading the file
+        lines = "".join(
+            json.dumps({"seq": e["seq"], "type": e["type"], **e}, ensure_ascii=False) + "\n" for e in events
+        )
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.logged += len(events)
+        if self.logged > MAX_EVENTS:
+            self._compact()
+
+    def _compact(self):
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()[-MAX_EVENTS:]
+        tmp = self.log_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        # Readers notice the new inode and re-read from the start
+        os.replace(tmp, self.log_path)
+        self.logged = len(lines)
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": self.seq, "logged": self.logged, "listings": self.listings}, f, separators=(",", ":"))
+        os.replace(tmp, self.state_path)
+
+
+def previous_ids(state_path=CHANGE_STATE_FILE):
+    """IDs the previous run exported (empty before the first run), for stages that keep ids stable."""
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return set(json.load(f).get("listings") or {})
+    except (OSError, json.JSONDecodeError, AttributeError):
+        return set()
+
+
+def record_changes(listings, complete=True, log_path=CHANGE_LOG_FILE, state_path=CHANGE_STATE_FILE):
+    """Pipeline stage: append this run's new / price_changed / removed events to the change log."""
+    feed = ChangeFeed(log_path, state_path)
+    baseline = feed.listings is None
+    events = feed.record(listings, complete=complete)
+    if baseline:
+        print(f"[🔔] Change feed: baseline of {len(feed.listings)} listings → {feed.state_path}")
+        return events
+    counts = {}
+    for e in events:
+        counts[e["type"]] = counts.get(e["type"], 0) + 1
+    detail = ", ".join(f"{n} {kind}" for kind, n in sorted(counts.items())) or "no changes"
+    note = "" if complete else " (partial run: removals withheld)"
+    print(f"[🔔] Change feed: {detail}{note}; seq {feed.seq} → {feed.log_path}")
+    return events
@@ -2,11 +2,13 @@ import requests
 import time
 from fake_useragent import UserAgent
 from core.extractor import extract_data
+from core.site import polite_delay, retry_after, site_url
 
 class Crawler:
-    def __init__(self, base_url, config):
+    def __init__(self, base_url, config, retries=3):
         self.base_url = base_url
         self.config = config
+        self.retries = retries
         self.ua = UserAgent()
 
     def crawl(self, pages=1):
@@ -16,14 +18,21 @@ class Crawler:
             headers = {"User-Agent": self.ua.random}
 
             print(f"[INFO] Crawling page {page + 1}: {page_url}")
-            response = requests.get(page_url, headers=headers)
+            response = requests.get(site_url(page_url), headers=headers)
+            for attempt in range(1, self.retries + 1):
+                if response.status_code != 429:
+                    break
+                wait = retry_after(response.headers.get("Retry-After"), 2 ** attempt)
+                print(f"[WAIT] 429 Too Many Requests. Retrying in {wait:.1f}s...")
+                time.sleep(wait)
+                response = requests.get(site_url(page_url), headers=headers)
 
             if response.status_code == 200:
                 html = response.text
                 data = extract_data(html, self.config)
                 print(f"[INFO] ✅ Extracted {len(data)} items from page {page + 1}")
                 all_listings.extend(data)
-                time.sleep(2)  # small delay
+                time.sleep(polite_delay(2))  # small delay
             else:
                 print(f"[ERROR] Failed to load {page_url} — status code {response.status_code}")
 
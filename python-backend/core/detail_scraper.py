@@ -3,6 +3,11 @@ import random
 import re
 import requests
 from bs4 import BeautifulSoup
+from core.site import retry_after, site_url
+from core.telemetry import telemetry
+
+# Map pin from the page model embedded in the detail page's scripts
+LOCATION_RE = re.compile(r'"location"\s*:\s*\{\s*"latitude"\s*:\s*(-?\d+(?:\.\d+)?)\s*,\s*"longitude"\s*:\s*(-?\d+(?:\.\d+)?)')
 
 HEADERS = {
     "User-Agent": (
@@ -17,107 +22,130 @@ HEADERS = {
 
 def scrape_detail_page(url, retries=5):
     attempt = 0
+    wait = None
 
     while attempt < retries:
         try:
             if attempt > 0:
-                wait = min(60, (2 ** attempt) + random.uniform(1.0, 4.0))
+                # Server-specified Retry-After wins over our own backoff
+                if wait is None:
+                    wait = min(60, (2 ** attempt) + random.uniform(1.0, 4.0))
                 print(f"[WAIT] 429 Too Many Requests. Retrying in {wait:.1f}s...")
-                time.sleep(wait)
+                with telemetry.span("detail.backoff_sleep"):
+                    time.sleep(wait)
 
             print(f"🔍 [DETAIL] Requesting detail page (attempt {attempt + 1})")
-            resp = requests.get(url, headers=HEADERS, timeout=15)
+            with telemetry.span("detail.request"):
+                resp = requests.get(site_url(url), headers=HEADERS, timeout=15)
+            telemetry.count("requests.detail")
+            telemetry.count("bytes.detail", len(resp.content))
 
             if resp.status_code == 429:
+                telemetry.count("http.429")
+                wait = retry_after(resp.headers.get("Retry-After"), None)
                 attempt += 1
                 continue
 
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "html.parser")
-            data = {}
-
-            # --- Core property meta (Type, Beds, Baths, Size, Tenure) ---
-            for container in soup.find_all("div", class_="_3gIoc-NFXILAOZEaEjJi1n"):
-                dt = container.find("dt")
-                dd = container.find("dd")
-                if not dt or not dd:
-                    continue
-                label = dt.get_text(strip=True).lower()
-                value = dd.get_text(strip=True)
-                if "property type" in label:
-                    data["property_type"] = value
-                elif "bedrooms" in label:
-                    data["bedrooms"] = value
-                elif "bathrooms" in label:
-                    data["bathrooms"] = value
-                elif "size" in label:
-                    data["size"] = value
-                elif "tenure" in label:
-                    data["tenure"] = value
-
-            # --- Key Features ---
-            features_heading = soup.find("h2", string=lambda t: t and "key features" in t.lower())
-            if features_heading:
-                ul = features_heading.find_next("ul")
-                if ul:
-                    data["key_features"] = [li.get_text(strip=True) for li in ul.find_all("li")]
-
-            # --- Description ---
-            desc_heading = soup.find("h2", string=lambda t: t and "description" in t.lower())
-            if desc_heading:
-                desc_div = desc_heading.find_next("div")
-                if desc_div:
-                    data["description"] = desc_div.get_text(separator="\n", strip=True)
-
-            # --- Brochure PDF ---
-            pdf_link = soup.find("a", href=lambda h: h and ".pdf" in h)
-            if pdf_link:
-                data["brochure_pdf"] = pdf_link["href"]
-
-            # --- Council Tax, Parking, Garden, Accessibility ---
-            dt_blocks = soup.find_all("dt", class_="_17A0LehXZKxGHbPeiLQ1BI")
-            for dt in dt_blocks:
-                label = dt.get_text(strip=True).lower()
-                dd = dt.find_next("dd")
-                if not dd:
-                    continue
-                value = dd.get_text(strip=True)
-                if "council tax" in label:
-                    data["council_tax"] = value
-                elif "parking" in label:
-                    data["parking"] = value
-                elif "garden" in label:
-                    data["garden"] = value
-                elif "accessibility" in label:
-                    data["accessibility"] = value
-
-            # --- Floorplan image ---
-            for a in soup.find_all("a", href=True):
-                if "floorplan" in a["href"]:
-                    img = a.find("img")
-                    if img and img.get("src"):
-                        data["floorplan"] = img["src"]
-                        break
-
-            # --- Postcode (from address or meta) ---
-            address = None
-            addr_tag = soup.find("address")
-            if addr_tag:
-                address = addr_tag.get_text(strip=True)
-            else:
-                meta_desc = soup.find("meta", attrs={"name": "description"})
-                if meta_desc:
-                    address = meta_desc.get("content", "")
-            if address:
-                postcode_match = re.search(r'([A-Z]{1,2}\d{1,2}[A-Z]?\s?\d[A-Z]{2})', address)
-                if postcode_match:
-                    data["postcode"] = postcode_match.group(1)
-
-            return data
+            with telemetry.span("detail.parse"):
+                return parse_detail_html(resp.text)
 
         except Exception as e:
+            telemetry.count("detail.failed")
             print(f"[❌] Failed to scrape detail page {url}: {e}")
             return {}
 
+    telemetry.count("detail.gave_up")
     print(f"[❌] Gave up scraping {url} after {retries} retries due to repeated 429s.")
     return {}
+
+
+def parse_detail_html(html):
+    """Extract the detail fields from a property page's HTML."""
+    soup = BeautifulSoup(html, "html.parser")
+    data = {}
+
+    # --- Core property meta (Type, Beds, Baths, Size, Tenure) ---
+    for container in soup.find_all("div", class_="_3gIoc-NFXILAOZEaEjJi1n"):
+        dt = container.find("dt")
+        dd = container.find("dd")
+        if not dt or not dd:
+            continue
+        label = dt.get_text(strip=True).lower()
+        value = dd.get_text(strip=True)
+        if "property type" in label:
+            data["property_type"] = value
+        elif "bedrooms" in label:
+            data["bedrooms"] = value
+        elif "bathrooms" in label:
+            data["bathrooms"] = value
+        elif "size" in label:
+            data["size"] = value
+        elif "tenure" in label:
+            data["tenure"] = value
+
+    # --- Key Features ---
+    features_heading = soup.find("h2", string=lambda t: t and "key features" in t.lower())
+    if features_heading:
+        ul = features_heading.find_next("ul")
+        if ul:
+            data["key_features"] = [li.get_text(strip=True) for li in ul.find_all("li")]
+
+    # --- Description ---
+    desc_heading = soup.find("h2", string=lambda t: t and "description" in t.lower())
+    if desc_heading:
+        desc_div = desc_heading.find_next("div")
+        if desc_div:
+            data["description"] = desc_div.get_text(separator="\n", strip=True)
+
+    # --- Brochure PDF ---
+    pdf_link = soup.find("a", href=lambda h: h and ".pdf" in h)
+    if pdf_link:
+        data["brochure_pdf"] = pdf_link["href"]
+
+    # --- Council Tax, Parking, Garden, Accessibility ---
+    dt_blocks = soup.find_all("dt", class_="_17A0LehXZKxGHbPeiLQ1BI")
+    for dt in dt_blocks:
+        label = dt.get_text(strip=True).lower()
+        dd = dt.find_next("dd")
+        if not dd:
+            continue
+        value = dd.get_text(strip=True)
+        if "council tax" in label:
+            data["council_tax"] = value
+        elif "parking" in label:
+            data["parking"] = value
+        elif "garden" in label:
+            data["garden"] = value
+        elif "accessibility" in label:
+            data["accessibility"] = value
+
+    # --- Floorplan image ---
+    for a in soup.find_all("a", href=True):
+        if "floorplan" in a["href"]:
+            img = a.find("img")
+            if img and img.get("src"):
+                data["floorplan"] = img["src"]
+                break
+
+    # --- Postcode (from address or meta) ---
+    address = None
+    addr_tag = soup.find("address")
+    if addr_tag:
+        address = addr_tag.get_text(strip=True)
+    else:
+        meta_desc = soup.find("meta", attrs={"name": "description"})
+        if meta_desc:
+            address = meta_desc.get("content", "")
+    if address:
+        postcode_match = re.search(r'([A-Z]{1,2}\d{1,2}[A-Z]?\s?\d[A-Z]{2})', address)
+        if postcode_match:
+            data["postcode"] = postcode_match.group(1)
+
+    # --- Coordinates (map data) ---
+    location = LOCATION_RE.search(html)
+    if location:
+        data["latitude"] = float(location.group(1))
+        data["longitude"] = float(location.group(2))
+
+    return data
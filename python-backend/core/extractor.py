@@ -1,9 +1,17 @@
 from bs4 import BeautifulSoup
 import re
+from core.telemetry import telemetry
 
 def extract_data(html, config):
-    soup = BeautifulSoup(html, "html.parser")
-    items = soup.select(config['selectors']['item'])
+    with telemetry.span("extract.parse_html"):
+        soup = BeautifulSoup(html, "html.parser")
+        items = soup.select(config['selectors']['item'])
+    with telemetry.span("extract.fields"):
+        extracted = _extract_items(items, config)
+    telemetry.count("listings.extracted", len(extracted))
+    return extracted
+
+def _extract_items(items, config):
     extracted = []
 
     for item in items:
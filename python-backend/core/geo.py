@@ -0,0 +1,126 @@
+"""
+Listing coordinates: postcode-centroid fallback for listings whose detail page
+had no map pin (stdlib only).
+
+The lookup file is a CSV with a header naming a postcode column (postcode/pcd)
+and latitude/longitude columns (latitude/lat, longitude/lng/long), e.g. an
+extract of the ONS Postcode Directory or Code-Point Open. Full postcodes and
+outcodes are both accepted; outcode centroids are also averaged from full
+postcodes, so a bare outcode (or an unknown full postcode) still resolves.
+
+    POSTCODE_CENTROIDS_CSV   path to the file (default data/postcode_centroids.csv)
+"""
+import csv
+import os
+import re
+from pathlib import Path
+
+CENTROIDS_FILE = Path(os.getenv("POSTCODE_CENTROIDS_CSV", "data/postcode_centroids.csv"))
+
+_OUTCODE = re.compile(r"^[A-Z]{1,2}\d[A-Z\d]?$")
+
+
+def _key(postcode):
+    return re.sub(r"\s+", "", str(postcode or "")).upper()
+
+
+def _outcode(key):
+    # Full postcodes end in a 3-character inward code ("LU71AB" -> "LU7")
+    return key if _OUTCODE.match(key) else key[:-3]
+
+
+def _column(header, names):
+    lowered = [h.strip().lower() for h in header]
+    for name in names:
+        if name in lowered:
+            return lowered.index(name)
+    raise ValueError(f"postcode centroid file needs one of the columns: {', '.join(names)}")
+
+
+class PostcodeCentroids:
+    def __init__(self, path=CENTROIDS_FILE):
+        self.path = Path(path)
+        self.postcodes = {}
+        self.outcodes = {}
+        if self.path.exists():
+            self._load()
+
+    def _load(self):
+        sums = {}
+        with open(self.path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None) or []
+            pc_col = _column(header, ["postcode", "pcd", "pcds", "outcode"])
+            lat_col = _column(header, ["latitude", "lat"])
+            lng_col = _column(header, ["longitude", "lng", "long", "lon"])
+            for row in reader:
+                try:
+                    key = _key(row[pc_col])
+                    lat, lng = float(row[lat_col]), float(row[lng_col])
+                except (IndexError, ValueError):
+                    continue
+                if not key or (lat == 0 and lng == 0):
+                    continue
+                if _OUTCODE.match(key):
+                    self.outcodes[key] = (lat, lng)
+                    continue
+                self.postcodes[key] = (lat, lng)
+                s = sums.setdefault(_outcode(key), [0.0, 0.0, 0])
+                s[0] += lat
+                s[1] += lng
+                s[2] += 1
+        for outcode, (lat, lng, n) in sums.items():
+            self.outcodes.setdefault(outcode, (lat / n, lng / n))
+        print(f"[📍] Loaded {len(self.postcodes)} postcode and {len(self.outcodes)} outcode centroids from {self.path}")
+
+    def lookup(self, postcode):
+        """(lat, lng, precision) for a postcode, precision "postcode" or "outcode"; None if unknown."""
+        key = _key(postcode)
+        if not key:
+            return None
+        if key in self.postcodes:
+            return (*self.postcodes[key], "postcode")
+        outcode = _outcode(key)
+        if outcode in self.outcodes:
+            return (*self.outcodes[outcode], "outcode")
+        return None
+
+
+_centroids = None
+
+
+def postcode_centroids():
+    """The shared lookup, loaded on first use."""
+    global _centroids
+    if _centroids is None:
+        _centroids = PostcodeCentroids()
+    return _centroids
+
+
+def valid_coordinates(lat, lng):
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or (lat == 0 and lng == 0):
+        return None
+    return lat, lng
+
+
+def fill_coordinates(listing):
+    """
+    Ensure ``latitude``/``longitude`` on a listing: keep the detail page's map
+    pin (precision "exact"), else use the postcode centroid. Sets
+    ``locationPrecision``; leaves the listing without coordinates if neither works.
+    """
+    coords = valid_coordinates(listing.get("latitude"), listing.get("longitude"))
+    if coords:
+        listing["latitude"], listing["longitude"] = coords
+        listing["locationPrecision"] = "exact"
+        return listing
+    listing.pop("latitude", None)
+    listing.pop("longitude", None)
+    found = postcode_centroids().lookup(listing.get("postcode"))
+    if found:
+        listing["latitude"], listing["longitude"], listing["locationPrecision"] = found
+    return listing
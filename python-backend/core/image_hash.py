@@ -0,0 +1,161 @@
+"""Perceptual image hashing (dHash), a BK-tree for Hamming-distance lookups, and a
+persistent hash store so repeated runs only hash new images."""
+import io
+import json
+import os
+from pathlib import Path
+
+import requests
+from PIL import Image
+
+HASH_STORE_FILE = Path("data") / "image_hashes.json"
+IMAGE_EXTENSIONS = (".jpeg", ".jpg", ".png", ".webp")
+# Max differing dHash bits for "the same photo" (resized, re-encoded, lightly cropped)
+SAME_PHOTO_DISTANCE = 6
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept": "image/webp,image/apng,image/*,*/*;q=0.8",
+}
+
+
+def dhash(image, hash_size=8):
+    """64-bit difference hash: robust to resizing, re-encoding and small crops."""
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def dhash_file(path):
+    with Image.open(path) as img:
+        return dhash(img)
+
+
+def dhash_bytes(data):
+    with Image.open(io.BytesIO(data)) as img:
+        return dhash(img)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes under Hamming distance."""
+
+    def __init__(self):
+        self.root = None  # [hash, [values], {distance: child}]
+        self.size = 0
+
+    def add(self, hash_value, value):
+        self.size += 1
+        if self.root is None:
+            self.root = [hash_value, [value], {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(hash_value, node[0])
+            if d == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [hash_value, [value], {}]
+                return
+            node = child
+
+    def search(self, hash_value, max_distance):
+        """All (distance, value) within ``max_distance`` of ``hash_value``, nearest first."""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = hamming(hash_value, node[0])
+            if d <= max_distance:
+                found.extend((d, v) for v in node[1])
+            for edge, child in node[2].items():
+                if d - max_distance <= edge <= d + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+class HashStore:
+    """
+    JSON-backed cache of perceptual hashes.
+
+    Files are keyed by name and revalidated by size + mtime; URLs are keyed
+    by URL. Only images that are new (or changed) since the last run are
+    opened or downloaded.
+    """
+
+    def __init__(self, path=HASH_STORE_FILE):
+        self.path = Path(path)
+        self.files = {}
+        self.urls = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.urls = data.get("urls", {})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "urls": self.urls}, f)
+        os.replace(tmp, self.path)
+
+    def refresh_files(self, media_dir):
+        """Hash new/changed images in ``media_dir``; drop entries for deleted files. Returns #hashed."""
+        media_dir = Path(media_dir)
+        present = set()
+        hashed = 0
+        for entry in os.scandir(media_dir) if media_dir.exists() else []:
+            if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            present.add(entry.name)
+            stat = entry.stat()
+            cached = self.files.get(entry.name)
+            if cached and cached["size"] == stat.st_size and cached["mtime"] == int(stat.st_mtime):
+                continue
+            try:
+                value = dhash_file(entry.path)
+            except Exception as e:
+                print(f"[⚠️] Could not hash {entry.name}: {e}")
+                continue
+            self.files[entry.name] = {"size": stat.st_size, "mtime": int(stat.st_mtime), "dhash": value}
+            hashed += 1
+        for name in set(self.files) - present:
+            del self.files[name]
+        return hashed
+
+    def url_hash(self, url, session=None):
+        """dHash of a remote image, downloaded at most once across runs."""
+        if url in self.urls:
+            return self.urls[url]
+        http = session or requests
+        try:
+            resp = http.get(url, headers={**HEADERS, "Referer": url.split("/dir/")[0]}, timeout=12)
+            resp.raise_for_status()
+            value = dhash_bytes(resp.content)
+        except Exception as e:
+            print(f"[⚠️] Could not hash {url}: {e}")
+            return None
+        self.urls[url] = value
+        return value
+
+    def file_tree(self):
+        tree = BKTree()
+        for name, entry in self.files.items():
+            tree.add(entry["dhash"], name)
+        return tree
@@ -0,0 +1,127 @@
+import base64
+import io
+import mimetypes
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image, ImageFilter, ImageOps, features
+
+try:  # AVIF needs Pillow >= 11.3 built with libavif, or the pillow-avif-plugin
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+mimetypes.add_type("image/avif", ".avif")
+mimetypes.add_type("image/webp", ".webp")
+
+# Widths we are willing to produce; requests snap up to the next one so the
+# number of cached variants per image stays small.
+VARIANT_WIDTHS = (160, 320, 480, 640, 960, 1280)
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 78, "method": 4}),
+    "avif": ("AVIF", "image/avif", {"quality": 55}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+@lru_cache(maxsize=1)
+def supported_formats():
+    """Output formats the installed Pillow can actually encode."""
+    Image.init()
+    formats = ["webp", "jpeg"] if features.check("webp") else ["jpeg"]
+    if "AVIF" in Image.SAVE:
+        formats.insert(0, "avif")
+    return tuple(formats)
+
+
+def snap_width(width):
+    """Smallest VARIANT_WIDTHS entry >= width (the largest one if width exceeds them all)."""
+    for candidate in VARIANT_WIDTHS:
+        if width <= candidate:
+            return candidate
+    return VARIANT_WIDTHS[-1]
+
+
+def variant_name(filename, width, fmt):
+    # The full source name, extension included: foo.jpg and foo.png must not
+    # share variants, which are served as immutable
+    return f"{Path(filename).name}.w{width}.{fmt}"
+
+
+def render_variant(src_path, dst_path, width, fmt):
+    """
+    Resize ``src_path`` to at most ``width`` px wide (never upscaling) and encode
+    it as ``fmt`` at ``dst_path``. Written via a temp file + rename so readers
+    never see a half-written image. Returns the size in bytes.
+    """
+    pil_format, _, options = FORMATS[fmt]
+    dst_path = Path(dst_path)
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dst_path.with_name(f".{dst_path.name}.{os.getpid()}.tmp")
+
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+        if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        img.save(tmp_path, pil_format, **options)
+
+    os.replace(tmp_path, dst_path)
+    return dst_path.stat().st_size
+
+
+# Pre-generated during the crawl (see BrowserCrawler): thumbnails are 476px wide,
+# so 480 is effectively "full size" re-encoded.
+PREGENERATED_WIDTHS = (160, 320, 480)
+PREGENERATED_FORMATS = ("avif", "webp")
+LQIP_WIDTH = 16
+
+
+def _lqip_data_uri(img):
+    """Tiny blurred WebP placeholder, inlined as a data URI (a few hundred bytes)."""
+    small = img.copy()
+    small.thumbnail((LQIP_WIDTH, LQIP_WIDTH))
+    small = small.convert("RGB").filter(ImageFilter.GaussianBlur(1))
+    buf = io.BytesIO()
+    small.save(buf, "WEBP", quality=40)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def generate_listing_variants(src_path):
+    """
+    Produce the fixed responsive set for one downloaded thumbnail, next to it.
+
+    Runs in a worker process. Existing variant files are reused, so it is safe
+    to call again for images that were already processed. Returns the
+    metadata recorded on the listing:
+
+        {"src", "width", "height", "lqip",
+         "sources": {"avif": [{"file", "w"}, ...], "webp": [...]}}
+    """
+    src_path = Path(src_path)
+    formats = [f for f in PREGENERATED_FORMATS if f in supported_formats()]
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        width, height = img.size
+        lqip = _lqip_data_uri(img)
+
+    sources = {fmt: [] for fmt in formats}
+    seen_widths = set()
+    for target in PREGENERATED_WIDTHS:
+        w = min(target, width)
+        if w in seen_widths:
+            continue
+        seen_widths.add(w)
+        for fmt in formats:
+            name = variant_name(src_path.name, target, fmt)
+            dst = src_path.with_name(name)
+            if not dst.exists():
+                render_variant(src_path, dst, target, fmt)
+            sources[fmt].append({"file": name, "w": w})
+
+    return {"src": src_path.name, "width": width, "height": height, "lqip": lqip, "sources": sources}
@@ -0,0 +1,284 @@
+"""
+Market statistics per postcode outcode and per city, materialised to
+data/market_stats.json and updated incrementally after each scrape (stdlib only).
+
+For each outcode and city: listing count, median asking price, median price
+per sq ft (from ``size`` / ``square_footage``), and count and median price by
+bedrooms and by property type. The table keeps one compact row per listing
+(last seen at), so an update re-aggregates only the outcodes and cities whose
+rows changed; a listing drops out once it hasn't been scraped for
+MARKET_STATS_MAX_AGE_DAYS.
+
+    MARKET_STATS_FILE          path to the table (default data/market_stats.json, see core/paths.py)
+    MARKET_STATS_MAX_AGE_DAYS  days a listing still counts after it was last seen (default 30)
+"""
+import json
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from statistics import median
+
+from ai.yield_predictor import normalise_property_type, outcode_of
+from core.paths import MARKET_STATS_FILE
+
+MAX_AGE_DAYS = float(os.getenv("MARKET_STATS_MAX_AGE_DAYS", "30"))
+VERSION = 1
+
+SQM_TO_SQFT = 10.7639
+# Plausible floor areas; anything outside is a parsing accident (a plot size, a typo)
+MIN_SQFT, MAX_SQFT = 100, 20000
+
+_AREA = re.compile(
+    r"(\d[\d,]*(?:\.\d+)?)\s*(?:-\s*\d[\d,]*(?:\.\d+)?\s*)?"
+    r"(sq\.?\s*f(?:ee)?t|sqft|ft²|ft2|square\s+f(?:ee|oo)t|sq\.?\s*m|sqm|m²|m2|square\s+met(?:re|er)s?)",
+    re.IGNORECASE,
+)
+
+# Row layout: listing id -> [outcode, city, price, beds, property type, sq ft, last seen]
+OUTCODE, CITY, PRICE, BEDS, TYPE, SQFT, SEEN = range(7)
+
+
+def parse_sqft(value):
+    """Floor area in sq ft from "850 sq ft", "79 sq. m", "1,200 sqft" (or a bare number of sq ft); None if unusable."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        area = float(value)
+        return round(area) if MIN_SQFT <= area <= MAX_SQFT else None
+    return _parse_area_text(str(value))
+
+
+@lru_cache(maxsize=65536)
+def _parse_area_text(text):
+    # Size strings repeat a lot across listings ("850 sq ft")
+    match = _AREA.search(text)
+    if not match:
+        return None
+    area = float(match.group(1).replace(",", ""))
+    if "f" not in match.group(2).lower():
+        area *= SQM_TO_SQFT
+    return round(area) if MIN_SQFT <= area <= MAX_SQFT else None
+
+
+def floor_area(listing):
+    for key in ("size", "square_footage"):
+        area = parse_sqft(listing.get(key))
+        if area:
+            return area
+    return None
+
+
+def listing_row(listing, seen):
+    """The compact row for a normalised listing; None if it has no usable price."""
+    try:
+        price = int(float(listing.get("price") or 0))
+    except (TypeError, ValueError):
+        return None
+    if price <= 0:
+        return None
+    try:
+        beds = int(float(listing.get("beds", listing.get("bedrooms")) or 0))
+    except (TypeError, ValueError):
+        beds = 0
+    return [
+        outcode_of(listing.get("postcode") or listing.get("address")) or "",
+        str(listing.get("city") or "").strip(),
+        price,
+        beds,
+        normalise_property_type(listing.get("property_type")),
+        floor_area(listing),
+        int(seen),
+    ]
+
+
+def _median(values):
+    return round(float(median(values)), 2) if values else None
+
+
+def _breakdown(rows, column):
+    groups = {}
+    for r in rows:
+        groups.setdefault(str(r[column]), []).append(r[PRICE])
+    return {
+        key: {"count": len(prices), "medianPrice": _median(prices)}
+        for key, prices in sorted(groups.items())
+    }
+
+
+def summarise(rows, now):
+    """Aggregate one area's rows into its stats entry."""
+    per_sqft = [r[PRICE] / r[SQFT] for r in rows if r[SQFT]]
+    return {
+        "count": len(rows),
+        "medianPrice": _median([r[PRICE] for r in rows]),
+        "medianPricePerSqft": _median(per_sqft),
+        "withFloorArea": len(per_sqft),
+        "byBeds": _breakdown(rows, BEDS),
+        "byType": _breakdown(rows, TYPE),
+        "updatedAt": _iso(now),
+    }
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+
+class MarketStats:
+    """The materialised table: listing rows plus the outcode and city aggregates derived from them."""
+
+    def __init__(self, path=MARKET_STATS_FILE):
+        self.path = Path(path)
+        self.rows = {}
+        self.outcodes = {}
+        self.cities = {}
+        self.updated_at = None
+        if self.path.exists():
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[⚠️] Market stats unreadable ({e}); starting a fresh table")
+            return
+        if data.get("version") != VERSION:
+            # Older layout: rebuilt from the next scrape
+            return
+        self.rows = data.get("listings", {})
+        self.outcodes = data.get("outcodes", {})
+        self.cities = data.get("cities", {})
+        self.updated_at = data.get("updatedAt")
+
+    def update(self, listings, now=None):
+        """
+        Upsert this scrape's listings, expire stale rows and re-aggregate only
+        the outcodes and cities they touched. Returns what changed.
+        """
+        now = time.time() if now is None else now
+        dirty_outcodes, dirty_cities = set(), set()
+
+        def touch(row):
+            if row[OUTCODE]:
+                dirty_outcodes.add(row[OUTCODE])
+            if row[CITY]:
+                dirty_cities.add(row[CITY].lower())
+
+        changed = 0
+        for listing in listings:
+            listing_id = str(listing.get("id") or "")
+            row = listing_row(listing, now) if listing_id else None
+            if row is None:
+                continue
+            old = self.rows.get(listing_id)
+            self.rows[listing_id] = row
+            if old is not None and old[:SEEN] == row[:SEEN]:
+                continue
+            changed += 1
+            touch(row)
+            if old is not None:
+                touch(old)
+
+        cutoff = now - MAX_AGE_DAYS * 86400
+        expired = [listing_id for listing_id, row in self.rows.items() if row[SEEN] < cutoff]
+        for listing_id in expired:
+            touch(self.rows.pop(listing_id))
+
+        if dirty_outcodes or dirty_cities:
+            self._aggregate(dirty_outcodes, dirty_cities, now)
+        self.updated_at = _iso(now)
+        return {
+            "changed": changed,
+            "expired": len(expired),
+            "outcodes": len(dirty_outcodes),
+            "cities": len(dirty_cities),
+        }
+
+    def _aggregate(self, outcodes, cities, now):
+        by_outcode = {o: [] for o in outcodes}
+        by_city = {c: [] for c in cities}
+        for row in self.rows.values():
+            if row[OUTCODE] in by_outcode:
+                by_outcode[row[OUTCODE]].append(row)
+            city = row[CITY].lower()
+            if city in by_city:
+                by_city[city].append(row)
+
+        for outcode, rows in by_outcode.items():
+            if not rows:
+                self.outcodes.pop(outcode, None)
+                continue
+            entry = summarise(rows, now)
+            # An outcode can straddle a city boundary; label it with its usual city
+            labels = Counter(r[CITY] for r in rows if r[CITY])
+            entry["city"] = labels.most_common(1)[0][0] if labels else None
+            self.outcodes[outcode] = entry
+        for city, rows in by_city.items():
+            if not rows:
+                self.cities.pop(city, None)
+                continue
+            entry = summarise(rows, now)
+            entry["city"] = Counter(r[CITY] for r in rows).most_common(1)[0][0]
+            self.cities[city] = entry
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            # Rows are stored compact; they're for the next update, not for reading
+            json.dump({
+                "version": VERSION,
+                "updatedAt": self.updated_at,
+                "outcodes": self.outcodes,
+                "cities": self.cities,
+                "listings": self.rows,
+            }, f, ensure_ascii=False, separators=(",", ":"))
+        # Readers (the API) never see a half-written table
+        os.replace(tmp, self.path)
+        return self.path
+
+    def summary(self):
+        """The aggregates without the per-listing rows."""
+        return {"updatedAt": self.updated_at, "outcodes": self.outcodes, "cities": self.cities}
+
+    def lookup(self, postcode=None, city=None):
+        """(scope, area, entry) for a postcode's outcode, else the city; None if neither is known."""
+        outcode = outcode_of(postcode)
+        if outcode and outcode in self.outcodes:
+            return "outcode", outcode, self.outcodes[outcode]
+        key = str(city or "").strip().lower()
+        if key in self.cities:
+            return "city", self.cities[key]["city"], self.cities[key]
+        return None
+
+
+_loaded = {}
+
+
+def market_stats(path=MARKET_STATS_FILE):
+    """The shared table at ``path``, reloaded when the file changes."""
+    path = Path(path)
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime_ns = None
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime_ns:
+        cached = _loaded[path] = (mtime_ns, MarketStats(path))
+    return cached[1]
+
+
+def update_market_stats(listings, path=MARKET_STATS_FILE):
+    """Pipeline stage: fold a scrape's normalised listings into the stats table and save it."""
+    stats = MarketStats(path)
+    result = stats.update(listings)
+    stats.save()
+    print(
+        f"[📊] Market stats: {result['changed']} listings changed, {result['expired']} expired; "
+        f"re-aggregated {result['outcodes']} outcodes and {result['cities']} cities → {stats.path}"
+    )
+    return result
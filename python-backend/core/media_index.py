@@ -0,0 +1,178 @@
+"""
+In-memory index of servable media files (stdlib only).
+
+A lookup is a dict hit: no per-request directory scans. A daemon thread
+rescans the roots every ``refresh_seconds`` and replaces an entry whenever its
+file's (size, mtime_ns) changed, so a file overwritten in place is picked up
+even though its directory's mtime didn't move. A name the index doesn't hold
+yet (e.g. written since the last rescan) is stat'ed on its own, once per
+root; code that just wrote a file calls add().
+
+ETags hash the file's bytes, once per (size, mtime_ns) version: callers on an
+event loop check ``has_etag`` and compute etag() in a worker thread.
+"""
+import hashlib
+import mimetypes
+import os
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+class ImageEntry:
+    """One servable file: its stat, content type, X-Accel-Redirect path and (lazily) a content-hash ETag."""
+
+    __slots__ = ("path", "stat", "media_type", "accel_path", "_etag")
+
+    def __init__(self, path: Path, st: os.stat_result, accel_path: Optional[str] = None):
+        self.path = path
+        self.stat = st
+        self.media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        self.accel_path = accel_path
+        self._etag: Optional[str] = None
+
+    @property
+    def has_etag(self) -> bool:
+        return self._etag is not None
+
+    def same_version(self, st: os.stat_result) -> bool:
+        return (self.stat.st_size, self.stat.st_mtime_ns) == (st.st_size, st.st_mtime_ns)
+
+    def etag(self) -> str:
+        """Strong ETag from the file's bytes; reads the file, so keep it off the event loop."""
+        if self._etag is None:
+            digest = hashlib.blake2b(digest_size=12)
+            with open(self.path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 16), b""):
+                    digest.update(block)
+            self._etag = f'"{digest.hexdigest()}"'
+        return self._etag
+
+
+class ImageIndex:
+    """
+    filename -> ImageEntry for every file directly under ``roots`` (earlier roots win).
+
+    ``accel_path`` maps a file's path to its X-Accel-Redirect location, or None
+    to have the app send the file itself. The rescan thread starts on the
+    first lookup.
+    """
+
+    def __init__(
+        self,
+        roots: List[Path],
+        refresh_seconds: float,
+        accel_path: Optional[Callable[[Path], Optional[str]]] = None,
+    ):
+        self.roots = roots
+        self.refresh_seconds = refresh_seconds
+        self.accel_path = accel_path
+        self._entries: Dict[str, ImageEntry] = {}
+        # add()/discard() calls made while a rescan runs, replayed over its result
+        self._pending: Optional[Dict[str, Optional[ImageEntry]]] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _entry(self, path: Path, st: os.stat_result) -> ImageEntry:
+        return ImageEntry(path, st, self.accel_path(path) if self.accel_path else None)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="media-index", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.rescan()
+            except Exception as e:
+                print(f"[⚠️] Media index rescan failed: {e}")
+            time.sleep(self.refresh_seconds)
+
+    def rescan(self) -> None:
+        """Rebuild the index from the roots, keeping entries (and their ETags) whose file is unchanged."""
+        with self._lock:
+            previous = dict(self._entries)
+            self._pending = {}
+        entries: Dict[str, ImageEntry] = {}
+        scanned = False
+        try:
+            for root in self.roots:
+                try:
+                    it = os.scandir(root)
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+                with it:
+                    for e in it:
+                        if e.name in entries or e.name.startswith("."):
+                            continue
+                        try:
+                            if not e.is_file():
+                                continue
+                            st = e.stat()
+                        except FileNotFoundError:  # deleted mid-scan
+                            continue
+                        old = previous.get(e.name)
+                        if old is not None and old.path == Path(e.path) and old.same_version(st):
+                            entries[e.name] = old
+                        else:
+                            entries[e.name] = self._entry(Path(e.path), st)
+            scanned = True
+        finally:
+            with self._lock:
+                pending, self._pending = self._pending, None
+                if scanned:
+                    for name, entry in pending.items():
+                        if entry is None:
+                            entries.pop(name, None)
+                        else:
+                            entries[name] = entry
+                    self._entries = entries
+
+    def _stat_one(self, filename: str) -> Optional[ImageEntry]:
+        if filename.startswith("."):
+            return None
+        for root in self.roots:
+            path = root / filename
+            try:
+                st = os.stat(path)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            if stat.S_ISREG(st.st_mode):
+                return self._put(self._entry(path, st))
+        return None
+
+    def _put(self, entry: ImageEntry) -> ImageEntry:
+        name = entry.path.name
+        with self._lock:
+            current = self._entries.get(name)
+            if current is not None and current.path != entry.path:
+                return current
+            self._entries[name] = entry
+            if self._pending is not None:
+                self._pending[name] = entry
+        return entry
+
+    def get(self, filename: str) -> Optional[ImageEntry]:
+        if self._thread is None:
+            self.start()
+        entry = self._entries.get(filename)
+        if entry is None:
+            entry = self._stat_one(filename)
+        return entry
+
+    def add(self, path: Path) -> ImageEntry:
+        """Index a file just written under one of the roots, without waiting for a rescan."""
+        return self._put(self._entry(path, path.stat()))
+
+    def discard(self, filename: str) -> None:
+        with self._lock:
+            self._entries.pop(filename, None)
+            if self._pending is not None:
+                self._pending[filename] = None
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "roots": [str(r) for r in self.roots]}
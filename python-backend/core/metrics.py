@@ -0,0 +1,125 @@
+"""
+Prometheus metrics shared by the API processes (app.main and api.ai_yield_api).
+
+PrometheusMiddleware is a plain ASGI middleware (no BaseHTTPMiddleware task
+or body buffering): per request it does two perf_counter() calls, one gauge
+inc/dec and one histogram observe, so it can stay on under load. Routes are
+labelled by their template ("/api/properties/{property_id}"), never the raw
+path, so label cardinality stays bounded.
+"""
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.responses import Response
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    "yieldbase_http_request_duration_seconds",
+    "HTTP request latency by route template, until the last body byte is sent.",
+    ["app", "method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "yieldbase_http_requests_in_flight",
+    "HTTP requests currently being served.",
+    ["app"],
+)
+
+# Property snapshot (app.snapshot)
+SNAPSHOT_LISTINGS = Gauge("yieldbase_snapshot_listings", "Listings in the current property snapshot.")
+SNAPSHOT_AGE = Gauge("yieldbase_snapshot_age_seconds", "Age of the export file behind the current snapshot.")
+SNAPSHOT_RELOADS = Counter("yieldbase_snapshot_reloads_total", "Snapshot (re)builds from disk.")
+EXPORT_LOAD_SECONDS = Histogram(
+    "yieldbase_export_load_duration_seconds",
+    "Time to read, parse and index an export file into a snapshot.",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+# Image serving (app.image_cache)
+IMAGE_INDEX_ENTRIES = Gauge("yieldbase_image_index_entries", "Files in the in-memory image index.")
+IMAGE_VARIANT_CACHE_BYTES = Gauge("yieldbase_image_variant_cache_bytes", "Bytes held by the on-disk variant cache.")
+
+# AI yield upstream calls (api.ai_yield_api, ai.ensemble)
+AI_UPSTREAM_LATENCY = Histogram(
+    "yieldbase_ai_upstream_duration_seconds",
+    "Latency of completed upstream model calls.",
+    ["endpoint", "model"],
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+AI_UPSTREAM_ERRORS = Counter(
+    "yieldbase_ai_upstream_errors_total",
+    "Failed upstream model calls.",
+    ["endpoint", "model", "kind"],
+)
+AI_CACHE_REQUESTS = Counter(
+    "yieldbase_ai_cache_requests_total",
+    "AI yield answers served from cache (hit) or requiring an upstream call (miss).",
+    ["endpoint", "result"],
+)
+
+
+class PrometheusMiddleware:
+    def __init__(self, app, app_name):
+        self.app = app
+        self.app_name = app_name
+        self.in_flight = REQUESTS_IN_FLIGHT.labels(app_name)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            REQUEST_LATENCY.labels(self.app_name, scope["method"], route_label(scope), str(status)).observe(
+                time.perf_counter() - start
+            )
+
+
+def route_label(scope):
+    """
+    Route template for the request, e.g. "/api/properties/{property_id}".
+
+    The router records the matched route on the (shared) scope, but for an
+    include_router(prefix=...) route its path lacks the prefix; recover the
+    prefix as the part of the request path in front of what the route matched.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    path = scope["path"]
+    regex = getattr(route, "path_regex", None)
+    if regex is None or regex.match(path):
+        return template
+    cut = path.find("/", 1)
+    while cut != -1:
+        if regex.match(path[cut:]):
+            return path[:cut] + template
+        cut = path.find("/", cut + 1)
+    return template
+
+
+def metrics_endpoint():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def observe_upstream(endpoint, model, started, error=None):
+    """Record one upstream call that started at ``started`` (perf_counter)."""
+    if error is None:
+        AI_UPSTREAM_LATENCY.labels(endpoint, model).observe(time.perf_counter() - started)
+    else:
+        AI_UPSTREAM_ERRORS.labels(endpoint, model, type(error).__name__).inc()
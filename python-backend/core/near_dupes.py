@@ -0,0 +1,400 @@
+"""
+Near-duplicate listings: the same property found by several seeds
+(overlapping search regions) or marketed by several agents, under different
+URLs and therefore different ids.
+
+Each listing is reduced to shingles (normalised address tokens and postcode,
+word 3-grams of the description, key feature lines) summarised as a MinHash
+signature, plus dHashes of its cached thumbnails. LSH banding puts listings
+with similar signatures, or a shared photo, in a common bucket, so only those
+pairs are compared: roughly linear in listings rather than quadratic. A
+candidate pair is confirmed on its exact field overlaps plus beds/price
+guards; each resulting cluster keeps one canonical record (the one exported
+last run, else the lowest id, so its id stays put from run to run), which
+takes the others' tags, fills its missing fields from them and lists them
+under ``duplicates``.
+
+CrawlDeduper is the cheap front half: shared across a run's seeds, it lets
+the crawler skip enriching a card whose link (or numbered address, price and
+beds) a finished seed has already enriched.
+"""
+import os
+import re
+import zlib
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from core.image_hash import SAME_PHOTO_DISTANCE, dhash_file, hamming
+from core.telemetry import telemetry
+
+NUM_PERM = 63
+BANDS = 21  # 3 rows per band: candidates from a Jaccard of ~0.35, near-certain from 0.6
+ROWS = NUM_PERM // BANDS
+# Buckets this large are boilerplate collisions, not one property
+MAX_BUCKET = 200
+# Shingles in more than this share of a batch (and at least MAX_BUCKET
+# listings) - "close to the station", street and city names - say nothing
+# about which property it is; they are left out of the signatures so they
+# don't pull unrelated listings into shared buckets
+COMMON_SHARE = 0.01
+
+PRICE_TOLERANCE = 0.10
+ADDRESS_MIN = 0.6
+TEXT_MIN = 0.5
+IMAGE_DISTANCE = SAME_PHOTO_DISTANCE
+MAX_IMAGES = 8
+
+MEDIA_DIR = str(Path(__file__).resolve().parents[1] / "media_cache")
+
+# Fields a canonical record may take from its duplicates when it lacks them
+FILL_FIELDS = (
+    "description", "key_features", "size", "square_footage", "tenure",
+    "property_type", "baths", "postcode",
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_POSTCODE = re.compile(r"^[A-Z]{1,2}\d[A-Z\d]?\d[A-Z]{2}$")
+_ABBREVIATIONS = {
+    "rd": "road", "st": "street", "ave": "avenue", "av": "avenue", "ln": "lane",
+    "dr": "drive", "cl": "close", "ct": "court", "pl": "place", "gdns": "gardens",
+    "cres": "crescent", "sq": "square", "tce": "terrace", "apt": "flat", "apartment": "flat",
+}
+
+_MERSENNE = (1 << 61) - 1
+_perm_rng = np.random.default_rng(50)
+# Full-width coefficients: with small ones a*x stays below the prime for most
+# 32-bit x, the "permutations" preserve order and their minima all coincide
+_A = _perm_rng.integers(1, _MERSENNE, NUM_PERM, dtype=np.uint64)
+_B = _perm_rng.integers(0, _MERSENNE, NUM_PERM, dtype=np.uint64)
+
+
+def _words(text):
+    return _WORD.findall(str(text or "").lower())
+
+
+def address_tokens(address):
+    return {_ABBREVIATIONS.get(w, w) for w in _words(address)}
+
+
+def _link_key(link):
+    # Rightmove links carry per-search fragments/queries ("#/?channel=RES_BUY")
+    return str(link or "").split("#")[0].split("?")[0].rstrip("/")
+
+
+@lru_cache(maxsize=65536)
+def _thumbnail_hash(path):
+    # Thumbnails are cached by name and never rewritten, so the path is the key
+    try:
+        return dhash_file(path)
+    except (OSError, ValueError):
+        return None
+
+
+def _image_paths(listing):
+    paths = listing.get("image_paths") or [os.path.join(MEDIA_DIR, name) for name in listing.get("images") or [] if name]
+    return [str(p) for p in paths[:MAX_IMAGES] if p]
+
+
+class ListingFeatures:
+    """The comparable parts of one listing."""
+
+    __slots__ = ("address", "numbers", "postcode", "text", "hashes", "beds", "price", "shingles")
+
+    def __init__(self, listing):
+        self.address = address_tokens(listing.get("address") or listing.get("title"))
+        self.numbers = {t for t in self.address if t.isdigit()}
+        postcode = re.sub(r"\s+", "", str(listing.get("postcode") or "")).upper()
+        self.postcode = postcode if _POSTCODE.match(postcode) else None
+
+        words = _words(listing.get("description"))
+        self.text = {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+        self.text.update("f:" + " ".join(_words(f)) for f in listing.get("key_features") or [] if f)
+
+        self.hashes = [h for h in (_thumbnail_hash(p) for p in _image_paths(listing)) if h is not None]
+        self.beds = _int(listing.get("beds", listing.get("bedrooms")))
+        self.price = _price(listing.get("price"))
+
+        shingles = {"a:" + t for t in self.address}
+        if self.postcode:
+            shingles.add("p:" + self.postcode)
+        shingles.update("d:" + s for s in self.text)
+        self.shingles = shingles
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _price(value):
+    # Cards carry display text ("£120,000"); keep the digits as normalize_listing does
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = re.findall(r"\d+", str(value or ""))
+    return int("".join(digits)) if digits else 0
+
+
+def minhash(shingles):
+    """NUM_PERM-value MinHash signature of a shingle set (None if empty)."""
+    if not shingles:
+        return None
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # uint64 wrap-around on a*x + b is intended (as in datasketch's MinHash)
+    return (((np.outer(_A, x) + _B[:, None]) % _MERSENNE) & 0xFFFFFFFF).min(axis=1)
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _shared_images(a, b):
+    return sum(1 for h in a if any(hamming(h, g) <= IMAGE_DISTANCE for g in b))
+
+
+def _beds_or_price_differ(a, b):
+    if a.beds and b.beds and a.beds != b.beds:
+        return True
+    return bool(a.price and b.price and abs(a.price - b.price) > PRICE_TOLERANCE * max(a.price, b.price))
+
+
+def _numbers_differ(a, b):
+    # Different flat / house numbers: neighbours, not duplicates
+    return bool(a.numbers and b.numbers and not a.numbers & b.numbers)
+
+
+def same_property(a, b):
+    """Confirm an LSH candidate pair on the listings' actual features."""
+    if _beds_or_price_differ(a, b):
+        return False
+    # The same photos are the strongest evidence: agents reuse the vendor's set
+    if a.hashes and b.hashes and _shared_images(a.hashes, b.hashes) >= min(2, len(a.hashes), len(b.hashes)):
+        return True
+    if _numbers_differ(a, b):
+        return False
+    if a.postcode and b.postcode and a.postcode != b.postcode:
+        return False
+    if not a.text and not b.text:
+        # Card-only listings: nothing but the address to go on
+        return _jaccard(a.address, b.address) >= 0.9 and a.price == b.price
+    return _jaccard(a.address, b.address) >= ADDRESS_MIN and _jaccard(a.text, b.text) >= TEXT_MIN
+
+
+def _pairs_within(members, pairs):
+    for i, a in enumerate(members):
+        for b in members[i + 1:]:
+            pairs.add((a, b))
+
+
+def image_pairs(features):
+    """
+    Index pairs sharing a photo: bucketed on each 16-bit band of every dHash,
+    so re-encodes a few bits apart still meet. Kept apart from the MinHash,
+    where a rewritten description would outweigh a shared photo set.
+    """
+    buckets = {}
+    for idx, f in enumerate(features):
+        for key in {(band, (h >> (16 * band)) & 0xFFFF) for h in f.hashes for band in range(4)}:
+            buckets.setdefault(key, []).append(idx)
+    pairs = set()
+    for members in buckets.values():
+        if 1 < len(members) <= MAX_BUCKET:
+            _pairs_within(members, pairs)
+    return pairs
+
+
+def candidate_pairs(signatures):
+    """Index pairs sharing at least one LSH band bucket."""
+    indices = np.array([i for i, sig in enumerate(signatures) if sig is not None], dtype=np.int64)
+    if len(indices) < 2:
+        return set()
+    matrix = np.stack([signatures[i] for i in indices])
+    pairs = set()
+    oversized = 0
+    for band in range(BANDS):
+        # One uint64 key per band row (wrapping); a rare key collision only adds a pair to verify
+        key = np.zeros(len(indices), dtype=np.uint64)
+        for row in matrix[:, band * ROWS:(band + 1) * ROWS].T:
+            key = key * np.uint64(0x9E3779B97F4A7C15) + row
+        _, bucket, sizes = np.unique(key, return_inverse=True, return_counts=True)
+        oversized += int((sizes > MAX_BUCKET).sum())
+        # Only listings in buckets of 2..MAX_BUCKET, grouped by bucket
+        shared = np.flatnonzero((sizes[bucket] > 1) & (sizes[bucket] <= MAX_BUCKET))
+        shared = shared[np.argsort(bucket[shared], kind="stable")]
+        if not len(shared):
+            continue
+        starts = np.flatnonzero(np.diff(bucket[shared])) + 1
+        for members in np.split(indices[shared], starts):
+            _pairs_within(members.tolist(), pairs)
+    if oversized:
+        telemetry.count("dedupe.oversized_buckets", oversized)
+    return pairs
+
+
+def cluster(listings):
+    """Groups of indices into ``listings`` that are the same property (singletons omitted)."""
+    with telemetry.span("dedupe.features"):
+        features = [ListingFeatures(x) for x in listings]
+        frequency = Counter(s for f in features for s in f.shingles)
+        limit = max(MAX_BUCKET, COMMON_SHARE * len(listings))
+        common = {s for s, n in frequency.items() if n > limit}
+        signatures = [minhash(f.shingles - common) for f in features]
+    with telemetry.span("dedupe.lsh"):
+        pairs = candidate_pairs(signatures) | image_pairs(features)
+
+    parent = list(range(len(listings)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    with telemetry.span("dedupe.verify"):
+        for a, b in pairs:
+            ra, rb = find(a), find(b)
+            if ra != rb and same_property(features[a], features[b]):
+                parent[max(ra, rb)] = min(ra, rb)
+
+    groups = {}
+    for i in range(len(listings)):
+        groups.setdefault(find(i), []).append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def _empty(value):
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _absorb(canonical, other):
+    tags = list(canonical.get("tags") or [])
+    tags.extend(t for t in other.get("tags") or [] if t not in tags)
+    canonical["tags"] = tags
+    for key in FILL_FIELDS:
+        if _empty(canonical.get(key)) and not _empty(other.get(key)):
+            canonical[key] = other[key]
+    if other.get("id") != canonical.get("id"):
+        canonical.setdefault("duplicates", []).append(
+            {"id": other.get("id"), "sourceUrl": other.get("sourceUrl"), "price": other.get("price")}
+        )
+
+
+def _source_key(listing):
+    return _link_key(listing.get("sourceUrl") or listing.get("link"))
+
+
+def _foldable(card, target):
+    """Whether a crawl-time duplicate may be folded into ``target`` without its own enrichment."""
+    if _source_key(card) == _source_key(target):
+        return True
+    a, b = ListingFeatures(card), ListingFeatures(target)
+    return not _beds_or_price_differ(a, b) and not _numbers_differ(a, b)
+
+
+def collapse_duplicates(listings, previous_ids=()):
+    """
+    Pipeline stage: fold cards the crawler marked ``duplicate_of`` into the
+    listing they duplicate, then cluster the rest and keep one canonical
+    record per cluster. ``previous_ids`` are the ids the last run exported:
+    a cluster keeps whichever of them it holds, so the exported id (and the
+    change feed, alerts and synced posts keyed on it) doesn't flip between
+    runs. Returns the surviving listings in their original order.
+    """
+    by_link = {}
+    for listing in listings:
+        if not listing.get("duplicate_of"):
+            by_link.setdefault(_source_key(listing), listing)
+    kept = []
+    folded = unenriched = 0
+    for listing in listings:
+        duplicate_of = listing.pop("duplicate_of", None)
+        if not duplicate_of:
+            kept.append(listing)
+            continue
+        target = by_link.get(_link_key(duplicate_of))
+        if target is not None and _foldable(listing, target):
+            _absorb(target, listing)
+            folded += 1
+        else:
+            # Never enriched (no detail fields, remote image URLs): not exportable as is
+            unenriched += 1
+            reason = "no such listing" if target is None else "beds/price/number differ"
+            print(f"[⚠️] Dropping unenriched duplicate card {listing.get('sourceUrl')} of {duplicate_of}: {reason}")
+
+    previous_ids = set(previous_ids)
+    dropped = set()
+    groups = cluster(kept)
+    for group in groups:
+        # Last run's canonical record, else the lowest id: stable across runs
+        best = min(group, key=lambda i: (kept[i].get("id") not in previous_ids, str(kept[i].get("id") or "")))
+        for i in group:
+            if i != best:
+                _absorb(kept[best], kept[i])
+                dropped.add(i)
+
+    telemetry.count("dedupe.folded", folded)
+    telemetry.count("dedupe.unenriched_dropped", unenriched)
+    telemetry.count("dedupe.near_duplicates", len(dropped))
+    print(
+        f"[♻️] Near-duplicates: {folded} crawl duplicates folded, {len(dropped)} listings merged "
+        f"into {len(groups)} canonical records"
+    )
+    return [x for i, x in enumerate(kept) if i not in dropped]
+
+
+class CrawlDeduper:
+    """
+    Shared by every seed's crawler in one run: claim() says whether a search
+    card was already enriched (same link, or same numbered address, price and
+    beds), so the crawler can skip its detail page and thumbnails.
+
+    Cards claimed during a seed stay pending until commit(): a seed that
+    fails is dropped whole, so later seeds must not point at its listings.
+    """
+
+    def __init__(self):
+        self._links = {}
+        self._cards = {}
+        self._pending_links = {}
+        self._pending_cards = {}
+
+    @staticmethod
+    def _card_key(card):
+        address = frozenset(address_tokens(card.get("address") or card.get("title")))
+        # Display addresses are often just "Street, Town": without a house or
+        # flat number they can't tell neighbours apart
+        if not any(t.isdigit() for t in address):
+            return None
+        return address, _price(card.get("price")), _int(card.get("bedrooms") or card.get("beds"))
+
+    def claim(self, card):
+        """The link of the enriched listing this card duplicates, else None (and the card is pending)."""
+        link = _link_key(card.get("link"))
+        key = self._card_key(card)
+        for links, cards in ((self._links, self._cards), (self._pending_links, self._pending_cards)):
+            if link and link in links:
+                return links[link]
+            if key is not None and key in cards:
+                return cards[key]
+        if link:
+            self._pending_links[link] = card.get("link")
+            if key is not None:
+                self._pending_cards[key] = card.get("link")
+        return None
+
+    def commit(self):
+        """The seed finished: its enriched listings are now targets for later seeds."""
+        self._links.update(self._pending_links)
+        self._cards.update(self._pending_cards)
+        self.discard()
+
+    def discard(self):
+        """The seed failed: forget its cards."""
+        self._pending_links = {}
+        self._pending_cards = {}
@@ -1 +1,78 @@
-# normalizer.py - placeholder for scraping-engine/core
+"""Normalisation of scraped listings (stdlib only)."""
+import hashlib
+import re
+
+from core.geo import fill_coordinates
+
+
+def normalize_listing(x: dict) -> dict:
+    """Map a scraped listing onto the stable backend/frontend schema (returns a copy)."""
+    y = dict(x)
+
+    # sourceUrl
+    source_url = y.get("external_url") or y.get("link")
+    y["sourceUrl"] = source_url if source_url else None
+
+    # id (stable)
+    if source_url:
+        y["id"] = hashlib.sha1(str(source_url).encode("utf-8")).hexdigest()[:12]
+    else:
+        title = str(y.get("title", ""))
+        address = str(y.get("address", ""))
+        y["id"] = hashlib.sha1(f"{title}|{address}".encode("utf-8")).hexdigest()[:12]
+
+    # price → int
+    raw = str(y.get("price", "")).replace("Â", "")
+    digits = re.findall(r"\d+", raw)
+    y["price"] = int("".join(digits)) if digits else 0
+
+    # city → derive from tags (first tag is always the city)
+    tags = y.get("tags", [])
+    if tags and len(tags) > 0:
+        # Capitalize first letter of city name
+        city_raw = str(tags[0])
+        y["city"] = city_raw.capitalize()
+    elif not y.get("city"):
+        # Fallback: try to extract from address
+        address = str(y.get("address", ""))
+        if "," in address:
+            # Address format often: "Street, City, Postcode"
+            parts = [p.strip() for p in address.split(",")]
+            if len(parts) >= 2:
+                y["city"] = parts[-2]  # Second to last is usually city
+            else:
+                y["city"] = parts[0] if parts else ""
+        else:
+            y["city"] = ""
+
+    # currency (always GBP for Rightmove)
+    if not y.get("currency"):
+        y["currency"] = "GBP"
+
+    # postcode → extract from address if not present
+    if not y.get("postcode"):
+        address = str(y.get("address", ""))
+        # UK postcode pattern (simplified)
+        postcode_match = re.search(r"\b[A-Z]{1,2}\d{1,2}[A-Z]?\s?\d[A-Z]{2}\b", address, re.IGNORECASE)
+        if postcode_match:
+            y["postcode"] = postcode_match.group(0).upper()
+        else:
+            y["postcode"] = ""
+
+    # beds / baths mapping
+    if "bedrooms" in y:
+        try:
+            y["beds"] = int(y.get("bedrooms") or 0)
+        except Exception:
+            y["beds"] = 0
+
+    if "bathrooms" in y:
+        try:
+            y["baths"] = int(y.get("bathrooms") or 0)
+        except Exception:
+            y["baths"] = 0
+
+    # latitude / longitude → map pin, else postcode centroid
+    fill_coordinates(y)
+
+    return y
@@ -0,0 +1,30 @@
+"""
+Data locations shared by the scraper (writers) and the API (readers), so both
+sides always resolve the same files (stdlib only).
+
+    YIELDBASE_DATA_DIR    data dir (default python-backend/data)
+    CHANGE_LOG_FILE       change feed event log (default <data>/changes.jsonl)
+    CHANGE_STATE_FILE     change feed previous-run state (default <data>/change_state.json)
+    SAVED_SEARCHES_FILE   saved searches (default <data>/saved_searches.json)
+    ALERTS_OUTBOX_FILE    saved-search alerts, JSON lines (default <data>/alerts_outbox.jsonl)
+    ALERTS_CURSOR_FILE    last change feed seq matched for alerts (default <data>/alerts_cursor.json)
+    MARKET_STATS_FILE     market stats table (default <data>/market_stats.json)
+"""
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DATA_DIR = Path(os.getenv("YIELDBASE_DATA_DIR", str(BASE_DIR / "data")))
+EXPORTS_DIR = DATA_DIR / "exports"
+
+
+def _data_file(env, name):
+    return Path(os.getenv(env, str(DATA_DIR / name)))
+
+
+CHANGE_LOG_FILE = _data_file("CHANGE_LOG_FILE", "changes.jsonl")
+CHANGE_STATE_FILE = _data_file("CHANGE_STATE_FILE", "change_state.json")
+SAVED_SEARCHES_FILE = _data_file("SAVED_SEARCHES_FILE", "saved_searches.json")
+ALERTS_OUTBOX_FILE = _data_file("ALERTS_OUTBOX_FILE", "alerts_outbox.jsonl")
+ALERTS_CURSOR_FILE = _data_file("ALERTS_CURSOR_FILE", "alerts_cursor.json")
+MARKET_STATS_FILE = _data_file("MARKET_STATS_FILE", "market_stats.json")
@@ -0,0 +1,55 @@
+"""
+Where the crawler sends its requests, and how it backs off.
+
+Set RIGHTMOVE_BASE_URL (e.g. http://127.0.0.1:8766, see devtools/stub_rightmove.py)
+to crawl a fixture server instead of rightmove.co.uk: www.rightmove.co.uk URLs
+are rewritten onto it and media.rightmove.co.uk URLs onto its /media/ path.
+Only the request target changes; listing links and ids keep the real URLs.
+
+CRAWL_DELAY_SCALE multiplies the crawler's polite delays (0 disables them when
+running against the fixture server).
+"""
+import os
+import time
+from email.utils import parsedate_to_datetime
+
+RIGHTMOVE_ORIGIN = "https://www.rightmove.co.uk"
+MEDIA_ORIGIN = "https://media.rightmove.co.uk"
+
+RIGHTMOVE_BASE_URL = os.getenv("RIGHTMOVE_BASE_URL", "").rstrip("/")
+CRAWL_DELAY_SCALE = float(os.getenv("CRAWL_DELAY_SCALE", "1"))
+MAX_RETRY_AFTER = 60
+
+
+def site_url(url):
+    """The URL to actually request for a Rightmove page or image URL."""
+    if not RIGHTMOVE_BASE_URL or not url:
+        return url
+    if url.startswith(RIGHTMOVE_ORIGIN):
+        return RIGHTMOVE_BASE_URL + url[len(RIGHTMOVE_ORIGIN):]
+    if url.startswith(MEDIA_ORIGIN):
+        return RIGHTMOVE_BASE_URL + "/media" + url[len(MEDIA_ORIGIN):]
+    return url
+
+
+def retry_after(value, default):
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP-date),
+    capped at MAX_RETRY_AFTER; ``default`` when missing or unparseable.
+    """
+    if not value:
+        return default
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return default
+    return min(MAX_RETRY_AFTER, max(0.0, seconds))
+
+
+def polite_delay(seconds):
+    """A polite delay scaled by CRAWL_DELAY_SCALE."""
+    return seconds * CRAWL_DELAY_SCALE
@@ -0,0 +1,158 @@
+"""
+Lightweight run telemetry for the crawl pipeline: named timing spans, counters,
+and a JSON run report with per-stage p50/p95/p99.
+
+    from core.telemetry import telemetry
+
+    with telemetry.span("detail.request"):
+        resp = requests.get(url)
+    telemetry.count("bytes.detail", len(resp.content))
+
+Spans and counters are process-wide and thread-safe. Recording a span costs
+two perf_counter() calls and a list append, so instrumentation stays on.
+"""
+import cProfile
+import io
+import json
+import math
+import os
+import pstats
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+REPORTS_DIR = Path("data") / "run_reports"
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    idx = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[idx]
+
+
+class Telemetry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.spans = defaultdict(list)
+            self.counters = Counter()
+            self.started_at = datetime.now()
+            self._t0 = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.spans[name].append(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def summary(self):
+        with self._lock:
+            spans = {name: sorted(values) for name, values in self.spans.items()}
+            counters = dict(self.counters)
+        wall = time.perf_counter() - self._t0
+        stages = {}
+        for name, values in sorted(spans.items(), key=lambda kv: -sum(kv[1])):
+            total = sum(values)
+            stages[name] = {
+                "count": len(values),
+                "total_s": round(total, 4),
+                "share": round(total / wall, 4) if wall else 0.0,
+                "p50_s": round(_percentile(values, 50), 4),
+                "p95_s": round(_percentile(values, 95), 4),
+                "p99_s": round(_percentile(values, 99), 4),
+                "max_s": round(values[-1], 4),
+            }
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_s": round(wall, 3),
+            "stages": stages,
+            "counters": dict(sorted(counters.items())),
+        }
+
+    def write_report(self, path=None, extra=None):
+        """Write the summary (plus ``extra`` fields) as JSON; returns the path."""
+        report = self.summary()
+        if extra:
+            report.update(extra)
+        if path is None:
+            REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+            path = REPORTS_DIR / f"run_{self.started_at.strftime('%Y%m%d_%H%M%S')}.json"
+        path = Path(path)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return path
+
+    def print_summary(self, top=12):
+        report = self.summary()
+        print(f"\n[⏱️] Run took {report['wall_s']:.1f}s")
+        for name, s in list(report["stages"].items())[:top]:
+            print(
+                f"    {name:<28} n={s['count']:<5} total={s['total_s']:>9.2f}s "
+                f"({s['share']:>5.1%})  p50={s['p50_s']:.3f}s  p95={s['p95_s']:.3f}s  p99={s['p99_s']:.3f}s"
+            )
+        for name, value in report["counters"].items():
+            print(f"    {name:<28} {value}")
+
+
+telemetry = Telemetry()
+
+
+@contextmanager
+def profiled(mode, out_dir=REPORTS_DIR):
+    """
+    Profile the enclosed block. ``mode`` is None (off), "cprofile" (writes a
+    .prof for snakeviz/pstats and prints the top functions) or "pyinstrument"
+    (writes an HTML call tree; needs ``pip install pyinstrument``).
+    """
+    if not mode:
+        yield
+        return
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    if mode == "pyinstrument":
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            path = out_dir / f"profile_{stamp}.html"
+            path.write_text(profiler.output_html(), encoding="utf-8")
+            print(f"[⏱️] pyinstrument profile → {path}")
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = out_dir / f"profile_{stamp}.prof"
+        profiler.dump_stats(os.fspath(path))
+        buf = io.StringIO()
+        pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(25)
+        print(buf.getvalue())
+        print(f"[⏱️] cProfile stats → {path}")
@@ -2,9 +2,12 @@ import json
 from datetime import datetime
 from pathlib import Path
 
-def write_to_json(data, filename_prefix="rightmove"):
-    base_dir = Path(__file__).resolve().parents[1]
-    output_dir = base_dir / "data" / "exports"
+from core.paths import EXPORTS_DIR
+
+def write_to_json(data, filename_prefix="rightmove", output_dir=None):
+    if output_dir is None:
+        output_dir = EXPORTS_DIR
+    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M")
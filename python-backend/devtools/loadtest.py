@@ -0,0 +1,346 @@
+"""
+Load test for the property API: replays a mix of /api/properties filter
+queries, detail lookups and image fetches, and reports throughput and
+p50/p95/p99 latency per scenario against an SLO.
+
+    python devtools/loadtest.py                                  # synthetic data, local app
+    python devtools/loadtest.py --listings 100000 --concurrency 64 --duration 60
+    python devtools/loadtest.py --rate 200 --slo p95=250,p99=1000
+    python devtools/loadtest.py --base-url http://127.0.0.1:8000  # an already running API
+
+Without --base-url it writes a synthetic export (and thumbnails) to a scratch
+data dir and starts uvicorn app.main:app on it (YIELDBASE_DATA_DIR,
+IMAGE_MEDIA_DIRS, IMAGE_VARIANT_DIR). By default the driver is closed-loop
+(--concurrency clients back to back); --rate switches to an open-loop
+arrival rate with latency measured from each request's scheduled start, so
+queueing behind a slow server is not hidden.
+
+Exits 1 if any scenario misses the SLO or errors. The report is written to
+data/run_reports/loadtest_<ts>.json.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from core.telemetry import REPORTS_DIR, Telemetry  # noqa: E402
+from core.market_stats import MarketStats  # noqa: E402
+from devtools.rightmove_fixtures import CITIES, CITY_CENTRES, OUTCODES, export_listings, thumbnail_jpeg  # noqa: E402
+
+# (scenario, weight); a filter query mix close to what the listings page sends
+SCENARIOS = [
+    ("properties.all", 5),
+    ("properties.filter", 35),
+    ("properties.search", 10),
+    ("properties.geo", 10),
+    ("properties.facets", 10),
+    ("market.stats", 5),
+    ("property.detail", 20),
+    ("image.original", 15),
+    ("image.variant", 5),
+]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_data(data_dir, listings, images):
+    """Write a synthetic export and up to ``images`` thumbnails; returns the media dir."""
+    exports = data_dir / "exports"
+    media = data_dir / "media_cache"
+    exports.mkdir(parents=True, exist_ok=True)
+    media.mkdir(parents=True, exist_ok=True)
+
+    items = export_listings(listings)
+    with open(exports / f"rightmove_loadtest_{listings}.json", "w", encoding="utf-8") as f:
+        json.dump(items, f, ensure_ascii=False)
+    stats = MarketStats(data_dir / "market_stats.json")
+    stats.update(items)
+    stats.save()
+
+    written = 0
+    for item in items:
+        for name in item["images"]:
+            if written >= images:
+                break
+            path = media / name
+            if not path.exists():
+                path.write_bytes(thumbnail_jpeg(name))
+            written += 1
+        if written >= images:
+            break
+    print(f"[🧪] Synthetic data: {listings} listings, {written} thumbnails in {data_dir}")
+    return media
+
+
+def start_app(data_dir, media_dir, port, workers):
+    env = dict(os.environ)
+    env.update({
+        "YIELDBASE_DATA_DIR": str(data_dir),
+        "IMAGE_MEDIA_DIRS": str(media_dir),
+        "IMAGE_VARIANT_DIR": str(data_dir / "variants"),
+    })
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+
+
+async def wait_ready(client, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("API did not become ready")
+
+
+class Workload:
+    """Picks the next request: a scenario name and its URL."""
+
+    def __init__(self, listings, image_names, seed):
+        self.ids = [p["id"] for p in listings]
+        self.images = image_names
+        self.rng = random.Random(seed)
+        self.names = [name for name, _ in SCENARIOS if name.startswith(("properties", "market")) or self._has(name)]
+        self.weights = [w for name, w in SCENARIOS if name in self.names]
+
+    def _has(self, name):
+        return bool(self.ids) if name == "property.detail" else bool(self.images)
+
+    def _filters(self):
+        rng = self.rng
+        params = {}
+        if rng.random() < 0.6:
+            params["city"] = rng.choice(CITIES)
+        if rng.random() < 0.5:
+            params["maxPrice"] = rng.choice([100000, 150000, 200000, 250000])
+            if rng.random() < 0.4:
+                params["minPrice"] = rng.choice([50000, 75000, 100000])
+        if rng.random() < 0.4:
+            params["beds"] = rng.randint(1, 4)
+        if rng.random() < 0.3:
+            params["yield"] = rng.choice([6, 7, 8, 10])
+        if rng.random() < 0.3:
+            params["page"] = rng.randint(1, 5)
+        return params
+
+    def _search(self):
+        rng = self.rng
+        q = rng.choice(["hmo", "garden", '"chain free"', "parking", "university", '"rear garden" freehold'])
+        return {"q": q, "city": rng.choice(CITIES)} if rng.random() < 0.3 else {"q": q}
+
+    def _geo(self):
+        rng = self.rng
+        lat, lng = rng.choice(CITY_CENTRES)
+        if rng.random() < 0.5:
+            return {"lat": lat, "lng": lng, "radiusKm": rng.choice([1, 3, 5, 10])}
+        # A map viewport around the city centre
+        return {"bbox": f"{lng - 0.15:.4f},{lat - 0.08:.4f},{lng + 0.15:.4f},{lat + 0.08:.4f}"}
+
+    def next(self):
+        name = self.rng.choices(self.names, self.weights)[0]
+        if name == "properties.all":
+            return name, "/api/properties", None
+        if name == "properties.filter":
+            return name, "/api/properties", self._filters()
+        if name == "properties.search":
+            return name, "/api/properties", self._search()
+        if name == "properties.geo":
+            return name, "/api/properties", self._geo()
+        if name == "properties.facets":
+            return name, "/api/properties/facets", self._filters()
+        if name == "property.detail":
+            return name, f"/api/properties/{self.rng.choice(self.ids)}", None
+        if name == "market.stats":
+            if self.rng.random() < 0.5:
+                return name, "/api/market-stats", {"outcode": self.rng.choice(OUTCODES)}
+            return name, "/api/market-stats", {"city": self.rng.choice(CITIES)}
+        image = self.rng.choice(self.images)
+        if name == "image.original":
+            return name, f"/api/images/{image}", None
+        return name, f"/api/images/{image}", {"w": self.rng.choice([320, 640]), "fmt": "webp"}
+
+
+async def _request(client, stats, workload, scheduled=None):
+    name, url, params = workload.next()
+    start = time.perf_counter() if scheduled is None else scheduled
+    try:
+        resp = await client.get(url, params=params)
+        status = str(resp.status_code)
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    stats.record(name, time.perf_counter() - start)
+    stats.count(f"{name}.{status}")
+
+
+async def closed_loop(client, stats, workload, concurrency, duration):
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await _request(client, stats, workload)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client, stats, workload, rate, duration, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+    tasks = []
+    t0 = time.perf_counter()
+    for k in range(int(rate * duration)):
+        scheduled = t0 + k / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await slots.acquire()
+
+        async def one(scheduled=scheduled):
+            try:
+                await _request(client, stats, workload, scheduled)
+            finally:
+                slots.release()
+
+        tasks.append(asyncio.ensure_future(one()))
+    await asyncio.gather(*tasks)
+
+
+def parse_slo(spec):
+    """Parse "p95=250,p99=1000" (ms) into {"p95_s": 0.25, "p99_s": 1.0}."""
+    slo = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            key, ms = part.split("=", 1)
+            slo[f"{key.strip()}_s"] = float(ms) / 1000
+    return slo
+
+
+def report(stats, slo, wall, args):
+    summary = stats.summary()
+    scenarios = {}
+    failed = []
+    print(f"\n[📈] {sum(s['count'] for s in summary['stages'].values())} requests in {wall:.1f}s")
+    print(f"    {'scenario':<20} {'n':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  errors")
+    for name, s in sorted(summary["stages"].items()):
+        statuses = {k[len(name) + 1:]: v for k, v in summary["counters"].items() if k.startswith(name + ".")}
+        errors = sum(v for code, v in statuses.items() if not code.startswith(("2", "3")))
+        misses = [key[:-2] for key, limit in slo.items() if s.get(key, 0) > limit]
+        if misses or errors:
+            failed.append(name)
+        scenarios[name] = {
+            "count": s["count"],
+            "rps": round(s["count"] / wall, 1),
+            "p50_ms": round(s["p50_s"] * 1000, 1),
+            "p95_ms": round(s["p95_s"] * 1000, 1),
+            "p99_ms": round(s["p99_s"] * 1000, 1),
+            "max_ms": round(s["max_s"] * 1000, 1),
+            "statuses": statuses,
+            "slo_missed": misses,
+        }
+        row = scenarios[name]
+        flag = f"  ✗ SLO {','.join(misses)}" if misses else ""
+        print(
+            f"    {name:<20} {row['count']:>7} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}  {errors}{flag}"
+        )
+
+    path = Path(args.report) if args.report else REPORTS_DIR / f"loadtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "started_at": summary["started_at"],
+            "wall_s": round(wall, 2),
+            "mode": f"open-loop {args.rate}/s" if args.rate else f"closed-loop x{args.concurrency}",
+            "listings": args.listings if not args.base_url else None,
+            "slo_ms": {key[:-2]: round(v * 1000, 1) for key, v in slo.items()},
+            "scenarios": scenarios,
+            "passed": not failed,
+        }, f, indent=2)
+    print(f"[⏱️] Load test report → {path}")
+    if failed:
+        print(f"[❌] SLO missed or errors in: {', '.join(failed)}")
+    return not failed
+
+
+async def run(args):
+    slo = parse_slo(args.slo)
+    server = None
+    base_url = args.base_url
+    scratch = None
+    if not base_url:
+        scratch = Path(args.data_dir) if args.data_dir else Path(tempfile.mkdtemp(prefix="yieldbase-loadtest-"))
+        media = prepare_data(scratch, args.listings, args.images)
+        port = _free_port()
+        server = start_app(scratch, media, port, args.workers)
+        base_url = f"http://127.0.0.1:{port}"
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            await wait_ready(client)
+            # Warm-up: loads the snapshot and gives us real ids and image names
+            listings = (await client.get("/api/properties")).json()
+            if scratch is not None:
+                image_names = sorted(p.name for p in (scratch / "media_cache").iterdir())
+            else:
+                image_names = sorted({name for p in listings[:2000] for name in (p.get("images") or [])})
+            workload = Workload(listings, image_names, args.seed)
+            print(f"[🚦] {base_url}: {len(listings)} listings, {args.duration}s, "
+                  + (f"{args.rate} req/s open-loop" if args.rate else f"{args.concurrency} concurrent clients"))
+
+            stats = Telemetry()
+            started = time.perf_counter()
+            if args.rate:
+                await open_loop(client, stats, workload, args.rate, args.duration, args.concurrency)
+            else:
+                await closed_loop(client, stats, workload, args.concurrency, args.duration)
+            wall = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        if scratch is not None and not args.data_dir:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    return report(stats, slo, wall, args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default=None, help="test a running API instead of starting one")
+    parser.add_argument("--listings", type=int, default=20000, help="synthetic export size")
+    parser.add_argument("--images", type=int, default=300, help="synthetic thumbnails to serve")
+    parser.add_argument("--data-dir", default=None, help="scratch data dir (default: a new temp dir)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the started app")
+    parser.add_argument("--concurrency", type=int, default=32, help="clients (closed-loop) / max in flight (open-loop)")
+    parser.add_argument("--rate", type=float, default=None, help="open-loop arrival rate in requests/s")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--slo", default="p95=250,p99=1000", help="per-scenario latency SLO in ms")
+    parser.add_argument("--seed", type=int, default=43)
+    parser.add_argument("--report", default=None, help="report path (default data/run_reports/loadtest_<ts>.json)")
+    args = parser.parse_args()
+
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
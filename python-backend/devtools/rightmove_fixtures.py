@@ -0,0 +1,228 @@
+"""
+Deterministic synthetic Rightmove data, shared by benchmarks/ and
+devtools/stub_rightmove.py: raw scraped listings, normalised export records,
+and search result pages that match the selectors in config/rightmove.yaml.
+"""
+import hashlib
+import io
+import random
+
+CITIES = [
+    "manchester", "liverpool", "leeds", "newcastle", "sheffield", "nottingham",
+    "leicester", "coventry", "birmingham", "stoke", "hull", "sunderland", "glasgow",
+]
+STREETS = ["High Street", "Station Road", "Church Lane", "Park Avenue", "Victoria Road", "Mill Lane"]
+TYPES = ["flat", "terraced house", "semi-detached house", "maisonette"]
+TENURES = ["Freehold", "Leasehold", "Share of freehold"]
+FEATURES = [
+    "Chain free", "HMO licence", "Rear garden", "Off-street parking", "Double glazing", "Gas central heating",
+    "Close to university", "Recently refurbished", "Tenanted", "Loft conversion", "En-suite", "Open-plan kitchen",
+]
+# Approximate city centres (same order as CITIES), for synthetic coordinates
+CITY_CENTRES = [
+    (53.4808, -2.2426), (53.4084, -2.9916), (53.8008, -1.5491), (54.9783, -1.6178), (53.3811, -1.4701),
+    (52.9548, -1.1581), (52.6369, -1.1398), (52.4068, -1.5197), (52.4862, -1.8904), (53.0027, -2.1794),
+    (53.7676, -0.3274), (54.9069, -1.3838), (55.8642, -4.2518),
+]
+# Description sentences are "The {room} {detail}.": varied enough that two
+# unrelated listings rarely share more than the opening line
+ROOMS = ["kitchen", "lounge", "main bedroom", "bathroom", "garden", "hallway", "dining room", "second bedroom"]
+DETAILS = [
+    "has been fitted to a high standard", "enjoys plenty of natural light", "overlooks a quiet residential street",
+    "was redecorated last year", "offers generous storage", "opens onto a private patio",
+    "benefits from new flooring", "would suit a growing family",
+]
+OUTCODES = ["M14", "L15", "LS6", "NE6", "S10", "NG7", "LE2", "CV1", "B29", "ST4", "HU5", "SR2", "G12"]
+MEDIA = "https://media.rightmove.co.uk/dir/crop/10:9-16:9/81k/80868/{pid}/80868_{pid}_IMG_{n:02d}_0000_max_1024x768.jpeg"
+
+
+def _rng(seed):
+    return random.Random(seed)
+
+
+def raw_listing(i, rng):
+    """A listing as extract_data + scrape_detail_page leave it, before normalize_listing."""
+    pid = 160000000 + i
+    city = rng.randrange(len(CITIES))
+    street = rng.choice(STREETS)
+    beds = rng.randint(1, 5)
+    ptype = rng.choice(TYPES)
+    address = f"{rng.randint(1, 200)} {street}, {CITIES[city].capitalize()}, {OUTCODES[city]} {rng.randint(1, 9)}AB"
+    return {
+        "title": address,
+        "address": address,
+        "price": f"£{rng.randrange(60, 400) * 1000:,}",
+        "property_type": ptype.capitalize(),
+        "size": f"{rng.randint(35, 140)} sq m" if rng.random() < 0.3 else f"{rng.randint(400, 1500)} sq ft",
+        "description": f"A {beds} bedroom {ptype} close to the station. " * 3,
+        "link": f"https://www.rightmove.co.uk/properties/{pid}#/?channel=RES_BUY",
+        "image": MEDIA.format(pid=pid, n=0),
+        "images": [MEDIA.format(pid=pid, n=n) for n in range(rng.randint(4, 12))],
+        "bedrooms": str(beds),
+        "bathrooms": str(rng.randint(1, 2)),
+        "tenure": rng.choice(TENURES),
+        "tags": [CITIES[city], "high-yield", "btl"],
+    }
+
+
+def raw_listings(n, seed=41):
+    rng = _rng(seed)
+    return [raw_listing(i, rng) for i in range(n)]
+
+
+def export_listing(i, rng):
+    """A listing as it appears in data/exports/*.json (normalised and yield-scored)."""
+    pid = 160000000 + i
+    city = rng.randrange(len(CITIES))
+    beds = rng.randint(1, 5)
+    price = rng.randrange(60, 400) * 1000
+    monthly = rng.randrange(450, 1800)
+    ptype = rng.choice(TYPES)
+    images = [f"80868_{pid}_IMG_{n:02d}_0000_max_476x317.jpeg" for n in range(rng.randint(4, 12))]
+    title = f"{rng.randint(1, 200)} {rng.choice(STREETS)}"
+    rooms = " ".join(f"The {room} {rng.choice(DETAILS)}." for room in rng.sample(ROOMS, 4))
+    return {
+        "id": f"{pid:012x}",
+        "title": title,
+        "price": price,
+        "currency": "GBP",
+        "address": f"{title}, {CITIES[city].capitalize()}",
+        "city": CITIES[city].capitalize(),
+        "postcode": f"{OUTCODES[city]} {rng.randint(1, 9)}AB",
+        "beds": beds,
+        "baths": rng.randint(1, 2),
+        "tenure": rng.choice(TENURES),
+        "yield": round(monthly * 12 / price * 100, 2),
+        "estimatedMonthlyRent": monthly,
+        "estimatedAnnualRent": monthly * 12,
+        "isHighYield": monthly * 12 / price >= 0.07,
+        "property_type": ptype.capitalize(),
+        "size": f"{rng.randint(35, 140)} sq m" if rng.random() < 0.3 else f"{rng.randint(400, 1500)} sq ft",
+        "description": (
+            f"A {beds} bedroom {ptype} on {title}, close to the station. "
+            f"Built in {rng.randint(1880, 2020)}, with a {rng.randint(8, 40)}ft garden. {rooms}"
+        ),
+        "key_features": rng.sample(FEATURES, rng.randint(3, 6)),
+        "latitude": round(CITY_CENTRES[city][0] + rng.gauss(0, 0.04), 6),
+        "longitude": round(CITY_CENTRES[city][1] + rng.gauss(0, 0.06), 6),
+        "locationPrecision": "exact",
+        "image": images[0],
+        "images": images,
+        "sourceUrl": f"https://www.rightmove.co.uk/properties/{pid}",
+        "tags": [CITIES[city], "high-yield", "btl"],
+    }
+
+
+def export_listings(n, seed=41):
+    rng = _rng(seed)
+    return [export_listing(i, rng) for i in range(n)]
+
+
+def with_duplicates(listings, rate=0.1, seed=50):
+    """
+    ``listings`` plus a re-listing of roughly ``rate`` of them, as a second
+    agent or an overlapping seed would show it: new id and URL, price within
+    3%, abbreviated address, one sentence of description swapped for the
+    agent's own, fewer features and photos. Returns (listings, duplicate id -> original id).
+    """
+    rng = _rng(seed)
+    out = list(listings)
+    originals = {}
+    for n, listing in enumerate(rng.sample(listings, int(len(listings) * rate))):
+        pid = 190000000 + n
+        copy = dict(listing)
+        sentences = listing["description"].split(". ")
+        sentences[rng.randrange(1, len(sentences))] = "Viewing is highly recommended"
+        copy.update({
+            "id": f"{pid:012x}",
+            "price": int(round(listing["price"] * rng.uniform(0.97, 1.03), -3)),
+            "address": listing["address"].replace("Road", "Rd").replace("Street", "St").replace("Avenue", "Ave"),
+            "description": ". ".join(sentences),
+            "key_features": listing["key_features"][:-1],
+            "images": listing["images"][: max(1, len(listing["images"]) // 2)],
+            "sourceUrl": f"https://www.rightmove.co.uk/properties/{pid}",
+            "tags": [listing["city"].lower(), "cheap"],
+        })
+        originals[copy["id"]] = listing["id"]
+        out.insert(rng.randrange(len(out) + 1), copy)
+    return out, originals
+
+
+def saved_searches(n, seed=49):
+    """Saved searches as core/alerts.py stores them: a city and a price band, sometimes beds and yield."""
+    rng = _rng(seed)
+    searches = []
+    for i in range(n):
+        low = rng.randrange(50, 350) * 1000
+        search = {
+            "id": f"search{i:06d}",
+            "email": f"investor{i}@example.com",
+            "city": rng.choice(CITIES).capitalize(),
+            "minPrice": low,
+            "maxPrice": low + rng.randrange(10, 60) * 1000,
+        }
+        if rng.random() < 0.5:
+            search["minBeds"] = rng.randint(1, 4)
+        if rng.random() < 0.5:
+            search["minYield"] = rng.choice([5, 6, 7, 8, 10])
+        searches.append(search)
+    return searches
+
+
+def thumbnail_jpeg(key, size=(476, 317)):
+    """A small JPEG, distinct per ``key`` so image matching/dedupe see different pictures."""
+    from PIL import Image, ImageDraw
+
+    width, height = size
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    img = Image.new("RGB", size, tuple(digest[:3]))
+    draw = ImageDraw.Draw(img)
+    for i in range(6):
+        x, y = digest[3 + i] * width // 255, digest[9 + i] * height // 255
+        draw.rectangle([x, y, x + width // 5, y + height // 5], fill=tuple(digest[i:i + 3][::-1]))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=80)
+    return buf.getvalue()
+
+
+_CARD = """
+<div class="propertyCard-details">
+  <a class="propertyCard-anchor" href="/properties/{pid}#/?channel=RES_BUY"></a>
+  <div data-testid="property-address">{address}</div>
+  <address class="propertyCard-addr">{address}</address>
+  <a data-testid="property-price" href="/properties/{pid}">{price}</a>
+  <p data-testid="property-description">{description}</p>
+  {imgs}
+  <ul data-testid="property-features">
+    <li>{beds} bedrooms</li><li>{baths} bathrooms</li><li>Tenure: {tenure}</li><li>{sqft} sq ft</li>
+  </ul>
+</div>"""
+
+
+def search_page_html(n=24, seed=41, start=0):
+    """
+    A search results page with ``n`` property cards (Rightmove shows 24 per
+    page), numbered from ``start`` as for the page at ``&index=start``.
+    """
+    rng = _rng(seed * 1000003 + start)
+    cards = []
+    for i in range(start, start + n):
+        listing = raw_listing(i, rng)
+        pid = 160000000 + i
+        imgs = "".join(
+            f'<img data-testid="property-img-{k}" src="{url.replace("max_1024x768", "max_476x317")}">'
+            for k, url in enumerate(listing["images"])
+        )
+        cards.append(_CARD.format(
+            pid=pid,
+            address=listing["address"],
+            price=listing["price"],
+            description=listing["description"],
+            imgs=imgs,
+            beds=listing["bedrooms"],
+            baths=listing["bathrooms"],
+            tenure=listing["tenure"].lower(),
+            sqft=rng.randint(400, 1500),
+        ))
+    filler = "<div class='ad-slot'><span>advert</span></div>" * 40
+    return f"<!DOCTYPE html><html><head><title>Search</title></head><body>{filler}{''.join(cards)}{filler}</body></html>"
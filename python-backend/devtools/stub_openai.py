@@ -0,0 +1,107 @@
+"""
+Local stub of an OpenAI-compatible chat completions API for exercising the AI
+yield endpoints offline (single model, ensemble and batch).
+
+    uvicorn devtools.stub_openai:app --port 8765
+    OPENROUTER_API_BASE=http://127.0.0.1:8765/v1 uvicorn api.ai_yield_api:app --port 8000
+
+Behaviour is configured with environment variables:
+
+    STUB_LATENCY       per-model latency in seconds, e.g. "anthropic/claude-3-opus=12,*=0.3"
+    STUB_JITTER        extra uniform random latency in seconds (default 0.2)
+    STUB_FAILURE_RATE  probability of answering 500 (default 0)
+
+Replies are deterministic JSON yields derived from the prompt, so cached and
+fresh answers can be compared. Batch prompts get one result per item.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="OpenAI-compatible stub")
+
+CALLS = {"total": 0, "by_model": {}}
+
+
+def _parse_latency(spec):
+    table = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            model, seconds = part.rsplit("=", 1)
+            table[model.strip()] = float(seconds)
+    return table
+
+
+LATENCY = _parse_latency(os.getenv("STUB_LATENCY", "*=0.3"))
+JITTER = float(os.getenv("STUB_JITTER", "0.2"))
+FAILURE_RATE = float(os.getenv("STUB_FAILURE_RATE", "0"))
+
+
+def _fake_yield(text):
+    digest = hashlib.sha1(text.encode("utf-8")).digest()
+    return round(4.0 + digest[0] / 255 * 5.0, 2)
+
+
+def _reply_for(prompt):
+    # Batch prompts (ai.yield_prompts.build_batch_prompt) end with a JSON array
+    if "Properties: [" in prompt:
+        items = json.loads(prompt.split("Properties: ", 1)[1])
+        return json.dumps({"results": [
+            {
+                "index": item["index"],
+                "predicted_yield": _fake_yield(json.dumps({k: v for k, v in item.items() if k != "index"}, sort_keys=True)),
+                "summary": "Stub estimate.",
+                "trend_note": "Stub trend.",
+                "ai_confidence": "Medium",
+            }
+            for item in items
+        ]})
+    return json.dumps({
+        "predicted_yield": _fake_yield(prompt),
+        "summary": "Stub estimate.",
+        "trend_note": "Stub trend.",
+        "ai_confidence": "Medium",
+    })
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    CALLS["total"] += 1
+    CALLS["by_model"][model] = CALLS["by_model"].get(model, 0) + 1
+
+    delay = LATENCY.get(model, LATENCY.get("*", 0.0)) + random.uniform(0, JITTER)
+    await asyncio.sleep(delay)
+    if FAILURE_RATE and random.random() < FAILURE_RATE:
+        return JSONResponse({"error": {"message": "stub injected failure"}}, status_code=500)
+
+    prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+    return {
+        "id": f"stub-{CALLS['total']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": _reply_for(prompt)},
+        }],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 64, "total_tokens": len(prompt) // 4 + 64},
+    }
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": m, "object": "model"} for m in LATENCY if m != "*"]}
+
+
+@app.get("/stub/calls")
+async def calls():
+    return CALLS
@@ -0,0 +1,166 @@
+"""
+Local fixture server standing in for rightmove.co.uk, so the crawler can be
+load-tested and benchmarked offline.
+
+    uvicorn devtools.stub_rightmove:app --port 8766
+    RIGHTMOVE_BASE_URL=http://127.0.0.1:8766 CRAWL_DELAY_SCALE=0 python scrape_main.py --pages 3
+
+Serves search result pages (/property-for-sale/find.html, paginated by
+&index=), detail pages (/properties/{id}) and thumbnails (/media/...), which
+is where core.site.site_url() sends Rightmove URLs. Search pages are
+templated from devtools/rightmove_fixtures.py and detail pages are the
+recorded sample-html.txt, unless STUB_RECORDED_DIR holds recorded pages.
+
+Behaviour is configured with environment variables:
+
+    STUB_LATENCY        latency in seconds per kind (search, detail, media), e.g. "search=0.8,*=0.2"
+    STUB_JITTER         extra uniform random latency in seconds (default 0.1)
+    STUB_LISTINGS       listings per search before pages come back empty (default 240)
+    STUB_429_RATE       probability of answering 429 Too Many Requests (default 0)
+    STUB_RATE_LIMIT     requests per second across all clients before 429s (default 0 = unlimited)
+    STUB_RETRY_AFTER    Retry-After seconds sent with injected 429s (default 2, "" to omit)
+    STUB_RECORDED_DIR   directory of recorded search_*.html / detail_*.html pages
+    STUB_SEED           seed for the templated pages and the 429 injection (default 41)
+
+GET /stub/stats reports requests, 429s and bytes per kind.
+"""
+import asyncio
+import math
+import os
+import random
+import time
+import zlib
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+
+from devtools.rightmove_fixtures import search_page_html, thumbnail_jpeg
+
+app = FastAPI(title="Rightmove fixture server")
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SAMPLE_DETAIL = BACKEND_DIR / "sample-html.txt"
+SAMPLE_PROPERTY_ID = "163496732"
+PAGE_SIZE = 24
+
+JITTER = float(os.getenv("STUB_JITTER", "0.1"))
+LISTINGS = int(os.getenv("STUB_LISTINGS", "240"))
+RATE_429 = float(os.getenv("STUB_429_RATE", "0"))
+RATE_LIMIT = float(os.getenv("STUB_RATE_LIMIT", "0"))
+RETRY_AFTER = os.getenv("STUB_RETRY_AFTER", "2")
+RECORDED_DIR = os.getenv("STUB_RECORDED_DIR")
+SEED = int(os.getenv("STUB_SEED", "41"))
+
+
+def _parse_latency(spec):
+    table = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            kind, seconds = part.rsplit("=", 1)
+            table[kind.strip()] = float(seconds)
+    return table
+
+
+LATENCY = _parse_latency(os.getenv("STUB_LATENCY", "*=0.1"))
+_random = random.Random(SEED)
+STATS = {"requests": Counter(), "throttled": Counter(), "bytes": Counter()}
+
+
+class _TokenBucket:
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Seconds until a token is available; 0 if one was taken."""
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+_bucket = _TokenBucket(RATE_LIMIT) if RATE_LIMIT > 0 else None
+
+
+def _recorded(prefix):
+    if not RECORDED_DIR:
+        return []
+    return sorted(Path(RECORDED_DIR).glob(f"{prefix}_*.html"))
+
+
+async def _respond(kind, make_response):
+    """Apply latency and 429 injection, then build and count the response."""
+    STATS["requests"][kind] += 1
+    delay = LATENCY.get(kind, LATENCY.get("*", 0.0)) + _random.uniform(0, JITTER)
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+    wait = _bucket.take() if _bucket is not None else 0.0
+    if wait or _random.random() < RATE_429:
+        STATS["throttled"][kind] += 1
+        headers = {}
+        if wait:
+            headers["Retry-After"] = str(math.ceil(wait))
+        elif RETRY_AFTER:
+            headers["Retry-After"] = RETRY_AFTER
+        return Response("Too Many Requests", status_code=429, headers=headers)
+
+    response = make_response()
+    STATS["bytes"][kind] += len(response.body)
+    return response
+
+
+@lru_cache(maxsize=256)
+def _search_page(seed, start):
+    recorded = _recorded("search")
+    if recorded:
+        return recorded[(start // PAGE_SIZE) % len(recorded)].read_text(encoding="utf-8")
+    return search_page_html(max(0, min(PAGE_SIZE, LISTINGS - start)), seed=seed, start=start)
+
+
+@lru_cache(maxsize=1)
+def _detail_template():
+    return SAMPLE_DETAIL.read_text(encoding="utf-8")
+
+
+def _detail_page(property_id):
+    recorded = _recorded("detail")
+    if recorded:
+        index = zlib.crc32(property_id.encode("utf-8")) % len(recorded)
+        return recorded[index].read_text(encoding="utf-8")
+    return _detail_template().replace(SAMPLE_PROPERTY_ID, property_id)
+
+
+@lru_cache(maxsize=1024)
+def _thumbnail(path):
+    return thumbnail_jpeg(path)
+
+
+@app.get("/property-for-sale/find.html")
+async def search(request: Request, index: int = 0):
+    # Different searches (locationIdentifier etc.) get different listings
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.items()) if k != "index")
+    seed = SEED + zlib.crc32(query.encode("utf-8"))
+    return await _respond("search", lambda: HTMLResponse(_search_page(seed, max(0, index))))
+
+
+@app.get("/properties/{property_id}")
+async def detail(property_id: str):
+    return await _respond("detail", lambda: HTMLResponse(_detail_page(property_id)))
+
+
+@app.get("/media/{path:path}")
+async def media(path: str):
+    return await _respond("media", lambda: Response(_thumbnail(path), media_type="image/jpeg"))
+
+
+@app.get("/stub/stats")
+async def stats():
+    return JSONResponse({key: dict(counter) for key, counter in STATS.items()})
@@ -1,10 +1,14 @@
 import yaml
 from core.browser_crawler import BrowserCrawler
 from core.writer import write_to_json
+from core.market_stats import update_market_stats
+from core.change_feed import previous_ids, record_changes
+from core.alerts import match_alerts
+from core.near_dupes import CrawlDeduper, collapse_duplicates
+from core.yield_scorer import score_yields
+from core.normalizer import normalize_listing
+from core.telemetry import profiled, telemetry
 
-# Normalization helpers (stdlib only)
-import re
-import hashlib
 import argparse
 from pathlib import Path
 
@@ -35,8 +39,28 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--pages", type=int, default=2)
     parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=None,
+                        help="profile the whole run (output in data/run_reports/)")
+    parser.add_argument("--report", default=None, help="run report path (default data/run_reports/run_<ts>.json)")
     args = parser.parse_args()
 
+    telemetry.reset()
+    with profiled(args.profile):
+        with telemetry.span("run.total"):
+            exported = run(args)
+
+    telemetry.print_summary()
+    report = telemetry.write_report(args.report, extra={
+        "pages": args.pages,
+        "limit": args.limit,
+        "profile": args.profile,
+        "listings_exported": exported,
+    })
+    print(f"[⏱️] Run report → {report}")
+
+
+def run(args):
+    """Crawl every seed, normalise, score and export. Returns the number of listings written."""
     # 🔧 Load config
     with open("config/rightmove.yaml", "r") as f:
         config = yaml.safe_load(f)
@@ -57,6 +81,9 @@ def main():
     print("-" * 70)
 
     all_listings = []
+    failed_seeds = 0
+    # One per run, so a house found by several (overlapping) seeds is enriched once
+    deduper = CrawlDeduper()
 
     # 🕷️ Crawl each seed URL
     for idx, seed_entry in enumerate(seed_urls, 1):
@@ -73,7 +100,8 @@ def main():
         print(f"URL: {url[:75]}...")
         
         try:
-            crawler = BrowserCrawler(base_url=url, config=config)
+            telemetry.count("seeds.crawled")
+            crawler = BrowserCrawler(base_url=url, config=config, deduper=deduper)
             # Pass limit to crawler for per-seed limiting (before enrichment)
             per_seed_limit = args.limit if args.limit and args.limit > 0 else None
             listings = crawler.crawl(pages=args.pages, limit=per_seed_limit)
@@ -86,6 +114,8 @@ def main():
             print(f"✓ Collected {len(listings)} properties")
             
         except Exception as e:
+            telemetry.count("seeds.failed")
+            failed_seeds += 1
             print(f"✗ ERROR: {e}")
             continue
 
@@ -96,76 +126,15 @@ def main():
     print(f"Total: {len(all_listings)} properties")
 
     # 🔄 Normalize listings for stable backend/frontend schema
-    def normalize_listing(x: dict) -> dict:
-        y = dict(x)
-
-        # sourceUrl
-        source_url = y.get("external_url") or y.get("link")
-        y["sourceUrl"] = source_url if source_url else None
-
-        # id (stable)
-        if source_url:
-            y["id"] = hashlib.sha1(str(source_url).encode("utf-8")).hexdigest()[:12]
-        else:
-            title = str(y.get("title", ""))
-            address = str(y.get("address", ""))
-            y["id"] = hashlib.sha1(f"{title}|{address}".encode("utf-8")).hexdigest()[:12]
-
-        # price → int
-        raw = str(y.get("price", "")).replace("Â", "")
-        digits = re.findall(r"\d+", raw)
-        y["price"] = int("".join(digits)) if digits else 0
-
-        # city → derive from tags (first tag is always the city)
-        tags = y.get("tags", [])
-        if tags and len(tags) > 0:
-            # Capitalize first letter of city name
-            city_raw = str(tags[0])
-            y["city"] = city_raw.capitalize()
-        elif not y.get("city"):
-            # Fallback: try to extract from address
-            address = str(y.get("address", ""))
-            if "," in address:
-                # Address format often: "Street, City, Postcode"
-                parts = [p.strip() for p in address.split(",")]
-                if len(parts) >= 2:
-                    y["city"] = parts[-2]  # Second to last is usually city
-                else:
-                    y["city"] = parts[0] if parts else ""
-            else:
-                y["city"] = ""
-
-        # currency (always GBP for Rightmove)
-        if not y.get("currency"):
-            y["currency"] = "GBP"
-
-        # postcode → extract from address if not present
-        if not y.get("postcode"):
-            address = str(y.get("address", ""))
-            # UK postcode pattern (simplified)
-            postcode_match = re.search(r"\b[A-Z]{1,2}\d{1,2}[A-Z]?\s?\d[A-Z]{2}\b", address, re.IGNORECASE)
-            if postcode_match:
-                y["postcode"] = postcode_match.group(0).upper()
-            else:
-                y["postcode"] = ""
-
-        # beds / baths mapping
-        if "bedrooms" in y:
-            try:
-                y["beds"] = int(y.get("bedrooms") or 0)
-            except Exception:
-                y["beds"] = 0
-
-        if "bathrooms" in y:
-            try:
-                y["baths"] = int(y.get("bathrooms") or 0)
-            except Exception:
-                y["baths"] = 0
-
-        return y
-
-    listings = [normalize_listing(l) for l in all_listings]
-    
+    with telemetry.span("normalize"):
+        listings = [normalize_listing(l) for l in all_listings]
+
+    # ♻️ One canonical record per property (same house under several seeds or
+    # agents), before anything downstream scores, stores or serves it twice.
+    # Clusters keep last run's id so the change feed doesn't see removed + new
+    with telemetry.span("near_dupes"):
+        listings = collapse_duplicates(listings, previous_ids=previous_ids())
+
     # Dedupe
     deduped = dedupe_by_id(listings)
     dups = len(listings) - len(deduped)
@@ -173,8 +142,26 @@ def main():
         print(f"Removed {dups} duplicates")
     print(f"Final: {len(deduped)} unique properties")
 
+    # 📈 Estimate rent / yield for every listing in one batch
+    with telemetry.span("score_yields"):
+        score_yields(deduped)
+
     # 💾 Write export
-    write_to_json(deduped, filename_prefix="rightmove")
+    with telemetry.span("write_export"):
+        write_to_json(deduped, filename_prefix="rightmove")
+
+    # 🔔 Emit new / price-changed / removed events for downstream consumers.
+    # A run that missed listings (failed seed, --limit) can't tell removals
+    with telemetry.span("change_feed"):
+        changes = record_changes(deduped, complete=not failed_seeds and not args.limit)
+
+    # 📬 Saved-search alerts for the new / re-priced listings only
+    with telemetry.span("alerts"):
+        match_alerts(changes)
+
+    # 📊 Fold this scrape into the per-outcode / per-city market stats
+    with telemetry.span("market_stats"):
+        update_market_stats(deduped)
 
     # 🧹 Keep only the most recent 10 export files (fail silently)
     try:
@@ -194,6 +181,7 @@ def main():
         pass
 
     print("[i] WordPress push skipped (disabled in Phase 3)")
+    return len(deduped)
 
 
 if __name__ == "__main__":
@@ -1,58 +1,240 @@
+import hashlib
 import os
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 import mimetypes
 
-USERNAME = "admin"
-APP_PASSWORD = "TMZR rc3u L39R klKG yICZ EAHK"
-BASE_URL = "http://localhost/propertyapp"
+USERNAME = os.getenv("WP_USERNAME", "admin")
+APP_PASSWORD = os.getenv("WP_APP_PASSWORD", "TMZR rc3u L39R klKG yICZ EAHK")
+BASE_URL = os.getenv("WP_BASE_URL", "http://localhost/propertyapp").rstrip("/")
+MEDIA_URL = f"{BASE_URL}/wp-json/wp/v2/media"
 
-def upload_image(image_url_or_path, referer=None):
-    is_local_file = os.path.isfile(image_url_or_path)
+# Connections kept alive per host; should cover post workers + media workers.
+WP_POOL_SIZE = int(os.getenv("WP_POOL_SIZE", "16"))
+WP_UPLOAD_ATTEMPTS = int(os.getenv("WP_UPLOAD_ATTEMPTS", "3"))
+# Bytes per read when piping a remote image into WordPress.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+IMAGE_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept": "image/webp,image/apng,image/*,*/*;q=0.8",
+}
+
+_session = None
+_session_lock = threading.Lock()
 
-    try:
-        if is_local_file:
-            filename = os.path.basename(image_url_or_path)
-            mime_type = mimetypes.guess_type(filename)[0] or "image/jpeg"
-            with open(image_url_or_path, "rb") as f:
-                image_data = f.read()
-
-        else:
-            headers = {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/124.0.0.0 Safari/537.36"
-                ),
-                "Accept": "image/webp,image/apng,image/*,*/*;q=0.8",
-                "Referer": referer or image_url_or_path.split('/dir/')[0]
-            }
-            response = requests.get(image_url_or_path, headers=headers, timeout=12)
-            response.raise_for_status()
-            image_data = response.content
-            filename = os.path.basename(image_url_or_path.split("?")[0])
-            mime_type = mimetypes.guess_type(filename)[0] or "image/jpeg"
 
-    except Exception as e:
-        print(f"❌ Failed to load image: {image_url_or_path} | {e}")
+def get_session():
+    """Process-wide keep-alive session. GETs are retried by urllib3; POSTs never are (see upload_image)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=frozenset({"GET", "HEAD"}),
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=WP_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def local_image_path(image_url_or_path):
+    """Path of a cached image, accepting the Windows-style 'media_cache\\x.jpeg' paths in exports."""
+    if not image_url_or_path or image_url_or_path.startswith(("http://", "https://")):
         return None
+    path = image_url_or_path.replace("\\", "/")
+    return path if os.path.isfile(path) else None
+
+
+def find_media(filename, session=None):
+    """Media ID of an attachment already uploaded as ``filename``, or None. Raises if the lookup fails."""
+    session = session or get_session()
+    stem = os.path.splitext(filename)[0]
+    resp = session.get(
+        MEDIA_URL,
+        params={"search": stem, "per_page": 20},
+        auth=HTTPBasicAuth(USERNAME, APP_PASSWORD),
+        timeout=10,
+    )
+    resp.raise_for_status()
+    for item in resp.json():
+        title = (item.get("title") or {}).get("rendered", "")
+        if title in (stem, filename) or (item.get("source_url") or "").endswith("/" + filename):
+            return item.get("id")
+    return None
+
+
+class RemoteImageBody:
+    """
+    Iterable request body that pipes a remote image into the upload chunk by
+    chunk, hashing it on the way through. Has a length when the source sent
+    Content-Length, so the upload goes out with Content-Length rather than
+    chunked encoding.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.sha256 = hashlib.sha256()
+        length = response.headers.get("Content-Length")
+        self._length = int(length) if length and length.isdigit() else None
+
+    def __iter__(self):
+        for chunk in self.response.iter_content(STREAM_CHUNK_SIZE):
+            self.sha256.update(chunk)
+            yield chunk
+
+    def __len__(self):
+        # requests only asks for the length to set Content-Length (0 = unknown -> chunked)
+        return self._length or 0
+
+    def close(self):
+        self.response.close()
 
+
+def _open_remote(session, url, referer):
+    headers = {**IMAGE_HEADERS, "Referer": referer or url.split('/dir/')[0]}
+    response = session.get(url, headers=headers, timeout=12, stream=True)
     try:
-        response = requests.post(
-            f"{BASE_URL}/wp-json/wp/v2/media",
-            auth=HTTPBasicAuth(USERNAME, APP_PASSWORD),
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Content-Type": mime_type
-            },
-            data=image_data
-        )
         response.raise_for_status()
-        media_id = response.json().get("id")
-        if media_id:
-            print(f"[✅] Uploaded image: {filename} → media_id={media_id}")
+    except Exception:
+        response.close()
+        raise
+    return RemoteImageBody(response)
+
+
+def upload_image(image_url_or_path, referer=None, session=None, ledger=None, reuse_existing=False):
+    """
+    Upload one image and return its media ID. The body is streamed: local
+    files straight from the file handle, remote images piped from the source
+    response, so memory stays flat whatever the image size.
+
+    With a SyncLedger, images whose content was uploaded before (by path, URL
+    or identical file bytes) are not sent again, and concurrent calls for the
+    same image share one upload; ``reuse_existing`` also looks WordPress up by
+    filename first.
+    """
+    session = session or get_session()
+    local_path = local_image_path(image_url_or_path)
+    digest = None
+
+    if local_path:
+        filename = os.path.basename(local_path)
+        try:
+            if ledger is not None:
+                digest = ledger.local_file_hash(local_path)
+                media_id = ledger.media_id(digest)
+                if media_id:
+                    return media_id
+        except OSError as e:
+            print(f"❌ Failed to load image: {image_url_or_path} | {e}")
+            return None
+        open_body = lambda: open(local_path, "rb")  # noqa: E731
+        known = lambda: ledger.media_id(digest)  # noqa: E731
+        flight_key = digest
+
+    else:
+        if ledger is not None:
+            media_id = ledger.media_id(ledger.url_hash(image_url_or_path))
+            if media_id:
+                return media_id
+        filename = os.path.basename(image_url_or_path.split("?")[0])
+        open_body = lambda: _open_remote(session, image_url_or_path, referer)  # noqa: E731
+        known = lambda: ledger.media_id(ledger.url_hash(image_url_or_path))  # noqa: E731
+        # The content hash is only known once the image has been piped through
+        flight_key = "url:" + image_url_or_path
+
+    mime_type = mimetypes.guess_type(filename)[0] or "image/jpeg"
+
+    def upload():
+        if ledger is not None:
+            # An upload of the same image may have finished since the check above
+            media_id = known()
+            if media_id:
+                return media_id
+        media_id = None
+        if reuse_existing:
+            try:
+                media_id = find_media(filename, session)
+            except Exception as e:
+                print(f"[⚠️] Media lookup failed for {filename} | {e}")
+        streamed_digest = None
+        if not media_id:
+            media_id, streamed_digest = _post_media(session, filename, mime_type, open_body)
+        if media_id and ledger is not None and (digest or streamed_digest):
+            ledger.record_media(digest or streamed_digest, media_id, url=None if local_path else image_url_or_path)
         return media_id
 
-    except Exception as e:
-        print(f"❌ Upload failed for {filename} | {e}")
-        return None
+    if ledger is None:
+        return upload()
+    return ledger.upload_once(flight_key, upload)
+
+
+def _post_media(session, filename, mime_type, open_body):
+    """
+    POST a media item, opening a fresh body for every attempt (a stream can only
+    be sent once). Returns (media_id or None, sha256 of a piped remote body or None).
+    """
+    # POST /media is not idempotent: a timeout may still have created the
+    # attachment, so look for it by filename before trying again (and don't
+    # re-upload while we can't tell).
+    for attempt in range(1, WP_UPLOAD_ATTEMPTS + 1):
+        if attempt > 1:
+            time.sleep(0.5 * 2 ** (attempt - 2))
+            try:
+                media_id = find_media(filename, session)
+            except Exception as e:
+                print(f"[⚠️] Media lookup failed for {filename} | {e}")
+                continue
+            if media_id:
+                print(f"[♻️] Found earlier upload of {filename} → media_id={media_id}")
+                return media_id, None
+        try:
+            body = open_body()
+        except Exception as e:
+            print(f"❌ Failed to load image: {filename} | {e}")
+            return None, None
+        try:
+            response = session.post(
+                MEDIA_URL,
+                auth=HTTPBasicAuth(USERNAME, APP_PASSWORD),
+                headers={
+                    "Content-Disposition": f"attachment; filename={filename}",
+                    "Content-Type": mime_type
+                },
+                data=body,
+                timeout=30,
+            )
+            if response.status_code >= 500:
+                raise requests.HTTPError(f"{response.status_code} from WordPress", response=response)
+            response.raise_for_status()
+            media_id = response.json().get("id")
+            if media_id:
+                print(f"[✅] Uploaded image: {filename} → media_id={media_id}")
+            return media_id, body.sha256.hexdigest() if isinstance(body, RemoteImageBody) else None
+
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            if e.response is not None and e.response.status_code < 500:
+                print(f"❌ Upload failed for {filename} | {e}")
+                return None, None
+            print(f"[⚠️] Upload attempt {attempt}/{WP_UPLOAD_ATTEMPTS} failed for {filename} | {e}")
+        except Exception as e:
+            print(f"❌ Upload failed for {filename} | {e}")
+            return None, None
+        finally:
+            body.close()
+
+    print(f"❌ Upload failed for {filename} after {WP_UPLOAD_ATTEMPTS} attempts")
+    return None, None
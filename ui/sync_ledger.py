@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+LEDGER_FILE = Path(os.getenv("WP_SYNC_LEDGER", "data/wp_sync_ledger.json"))
+
+
+def content_hash(data):
+    """SHA-256 of bytes, or of a JSON-serialisable value in canonical form."""
+    if not isinstance(data, (bytes, bytearray)):
+        data = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SyncLedger:
+    """
+    What has already been pushed to WordPress, so a run only sends the day's changes.
+
+        posts: listing key   -> {"post_id", "hash"}   (hash of the post's source data)
+        media: image sha256  -> media id
+        urls:  image URL     -> image sha256         (skip re-downloading known images)
+        files: local path    -> [size, mtime_ns, sha256]   (skip re-hashing unchanged files)
+
+    Thread-safe; written atomically by save(). upload_once() lets concurrent
+    listings that share an image wait for one upload instead of each sending it.
+    """
+
+    def __init__(self, path=LEDGER_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        data = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        self.posts = data.get("posts", {})
+        self.media = data.get("media", {})
+        self.urls = data.get("urls", {})
+        self.files = data.get("files", {})
+        self._dirty = False
+        # Uploads in progress: key -> [done event, media id]
+        self._inflight = {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {"posts": self.posts, "media": self.media, "urls": self.urls, "files": self.files}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=1)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+    # -- posts --
+
+    def post(self, key):
+        with self._lock:
+            return self.posts.get(key)
+
+    def record_post(self, key, post_id, source_hash):
+        with self._lock:
+            self.posts[key] = {"post_id": post_id, "hash": source_hash}
+            self._dirty = True
+
+    def forget_post(self, key):
+        with self._lock:
+            if self.posts.pop(key, None) is not None:
+                self._dirty = True
+
+    # -- media --
+
+    def local_file_hash(self, path):
+        """sha256 of a local file, re-read only when its size or mtime changed."""
+        st = os.stat(path)
+        with self._lock:
+            cached = self.files.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = file_hash(path)
+        with self._lock:
+            self.files[path] = [st.st_size, st.st_mtime_ns, digest]
+            self._dirty = True
+        return digest
+
+    def url_hash(self, url):
+        with self._lock:
+            return self.urls.get(url)
+
+    def media_id(self, digest):
+        with self._lock:
+            return self.media.get(digest) if digest else None
+
+    def record_media(self, digest, media_id, url=None):
+        with self._lock:
+            self.media[digest] = media_id
+            if url:
+                self.urls[url] = digest
+            self._dirty = True
+
+    def upload_once(self, key, upload):
+        """
+        Run ``upload()`` once per ``key`` (image sha256, or URL before it is
+        downloaded) at a time: callers arriving while it runs wait and get its
+        media id (None if it failed) instead of uploading the same image again.
+        """
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = [threading.Event(), None]
+        if not leader:
+            call[0].wait()
+            return call[1]
+        try:
+            call[1] = upload()
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call[0].set()
+        return call[1]
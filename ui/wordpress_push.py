@@ -1,106 +1,281 @@
+import os
 import re
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 from requests.exceptions import RequestException
-from ui.image_helper import upload_image
+from ui.image_helper import BASE_URL, get_session, upload_image
+from ui.sync_ledger import SyncLedger, content_hash
 
-WP_URL = "http://localhost/propertyapp/wp-json/wp/v2/ukproperty"
-JWT_TOKEN = (
+WP_URL = f"{BASE_URL}/wp-json/wp/v2/ukproperty"
+JWT_TOKEN = os.getenv("WP_JWT_TOKEN") or (
     "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9."
     "eyJpc3MiOiJodHRwOi8vbG9jYWxob3N0L3Byb3BlcnR5YXBwIiwiaWF0IjoxNzUwMzM0MjMz"
     "LCJuYmYiOjE3NTAzMzQyMzMsImV4cCI6MTc1MDkzOTAzMywiZGF0YSI6eyJ1c2VyIjp7Imlk"
     "IjoiMSJ9fX0.db2rUEubbmRXnQg2ecr0F9_CZgZk6j89bzB2-Qdrb2I"
 )
 
-def push_to_wordpress(listing):
+# Listings posted concurrently, and media uploads in flight across all of them
+WP_POST_WORKERS = int(os.getenv("WP_POST_WORKERS", "4"))
+WP_MEDIA_WORKERS = int(os.getenv("WP_MEDIA_WORKERS", "8"))
+WP_POST_ATTEMPTS = int(os.getenv("WP_POST_ATTEMPTS", "3"))
+WP_DEBUG = os.getenv("WP_DEBUG") == "1"
+
+
+def _auth_headers():
+    return {
+        "Authorization": f"Bearer {JWT_TOKEN}",
+        "Content-Type": "application/json",
+    }
+
+
+def listing_key(listing):
+    """Stable identity of a listing across runs: the Rightmove property id when known."""
+    match = re.search(r"/properties/(\d+)", listing.get("link") or "")
+    if match:
+        return f"rm{match.group(1)}"
+    return str(listing.get("id") or content_hash([listing.get("title"), listing.get("address")])[:16])
+
+
+def listing_slug(listing):
+    """Stable post slug, so a retried create can be recognised: '<title>-rm<rightmove id>'."""
+    title_slug = re.sub(r"[^a-z0-9]+", "-", listing.get("title", "").lower()).strip("-")[:60]
+    match = re.search(r"/properties/(\d+)", listing.get("link") or "")
+    return f"{title_slug}-rm{match.group(1)}" if match else title_slug
+
+
+def find_post(slug, session=None):
+    """ID of an existing property post with ``slug``, or None. Raises if the lookup fails."""
+    session = session or get_session()
+    resp = session.get(WP_URL, headers=_auth_headers(), params={"slug": slug, "status": "any"}, timeout=10)
+    resp.raise_for_status()
+    posts = resp.json()
+    return posts[0]["id"] if posts else None
+
+
+def build_payload(listing):
+    # Clean up price
+    raw_price = listing.get("price", "0")
+    clean_price = int(re.sub(r"\D", "", str(raw_price)) or "0")
+
+    # Handle yield robustly
+    yield_value = listing.get("yield")
     try:
-        # 👇 Print everything we scraped for this property
-        print("\n--- LISTING DATA ---")
-        print(json.dumps(listing, indent=2, ensure_ascii=False))
-        print("--- END LISTING DATA ---\n")
-
-        headers = {
-            "Authorization": f"Bearer {JWT_TOKEN}",
-            "Content-Type": "application/json",
-        }
-
-        # Clean up price
-        raw_price = listing.get("price", "0")
-        clean_price = int(re.sub(r"\D", "", str(raw_price)) or "0")
-
-        # Handle yield robustly
-        yield_value = listing.get("yield")
+        clean_yield = float(yield_value) if yield_value not in (None, "", "None") else None
+    except Exception:
+        clean_yield = None
+
+    # Build payload for your actual ACF fields
+    acf_payload = {
+    "property_type": listing.get("property_type"),
+    "bedrooms": listing.get("bedrooms"),
+    "bathrooms": listing.get("bathrooms"),
+    "size": listing.get("size"),
+    "tenure": listing.get("tenure"),
+    "key_features": listing.get("key_features"),
+    "description": listing.get("description"),
+    "floorplan": listing.get("floorplan"),
+    "brochure_pdf": listing.get("brochure_pdf"),
+    "council_tax": listing.get("council_tax"),
+    "parking": listing.get("parking"),
+    "garden": listing.get("garden"),
+    "accessibility": listing.get("accessibility"),
+    "postcode": listing.get("postcode"),
+    }
+
+
+    if clean_yield is not None:
+        acf_payload["yield"] = clean_yield
+
+    return {
+        "title": listing["title"].strip(),
+        "slug": listing_slug(listing),
+        "content": listing.get("description", "").strip(),
+        "status": "publish",
+        "acf": acf_payload,
+    }
+
+
+def _media_inputs(listing):
+    # Determine input for featured image: local path first, then URL
+    featured_input = listing.get("image_path") or listing.get("image")
+    # Prepare gallery inputs: local paths first, then URL list
+    gallery_inputs = listing.get("image_paths") or listing.get("images", [])
+    return featured_input, [i for i in gallery_inputs if i and i != featured_input]
+
+
+def upload_listing_media(listing, session=None, media_pool=None, ledger=None, reuse_existing=False):
+    """
+    Upload the featured image and gallery, in parallel on ``media_pool`` when
+    given. With ``reuse_existing``, attachments already in WordPress under the
+    same filename are used instead of uploading again. Returns
+    (featured_media_id or None, [gallery media ids], number of failed uploads).
+    """
+    featured_input, gallery_inputs = _media_inputs(listing)
+    referer = listing.get("link") or listing.get("source_url") or "https://www.rightmove.co.uk/"
+    inputs = ([featured_input] if featured_input else []) + gallery_inputs
+
+    if media_pool is not None:
+        futures = [media_pool.submit(upload_image, i, referer, session, ledger, reuse_existing) for i in inputs]
+        ids = [f.result() for f in futures]
+    else:
+        ids = [upload_image(i, referer, session, ledger, reuse_existing) for i in inputs]
+
+    for img_input, media_id in zip(inputs, ids):
+        if not media_id:
+            label = "Featured image" if img_input == featured_input else "Gallery image"
+            print(f"[❌] {label} failed for {listing.get('title')}: {img_input}")
+
+    featured_id = ids[0] if featured_input else None
+    gallery_ids = [media_id for media_id in ids[1 if featured_input else 0:] if media_id]
+    return featured_id, gallery_ids, sum(1 for media_id in ids if not media_id)
+
+
+def source_hash(listing, payload):
+    """Hash of everything a post is built from; unchanged hash => nothing to send."""
+    return content_hash({"payload": payload, "media": _media_inputs(listing)})
+
+
+def _update_post(session, post_id, payload):
+    """PATCH an existing post (idempotent, so plain retries are safe). Returns the response or None if gone."""
+    for attempt in range(1, WP_POST_ATTEMPTS + 1):
+        if attempt > 1:
+            time.sleep(0.5 * 2 ** (attempt - 2))
         try:
-            clean_yield = float(yield_value) if yield_value not in (None, "", "None") else None
-        except Exception:
-            clean_yield = None
-
-        # Build payload for your actual ACF fields
-        acf_payload = {
-        "property_type": listing.get("property_type"),
-        "bedrooms": listing.get("bedrooms"),
-        "bathrooms": listing.get("bathrooms"),
-        "size": listing.get("size"),
-        "tenure": listing.get("tenure"),
-        "key_features": listing.get("key_features"),
-        "description": listing.get("description"),
-        "floorplan": listing.get("floorplan"),
-        "brochure_pdf": listing.get("brochure_pdf"),
-        "council_tax": listing.get("council_tax"),
-        "parking": listing.get("parking"),
-        "garden": listing.get("garden"),
-        "accessibility": listing.get("accessibility"),
-        "postcode": listing.get("postcode"),
-        }
-
-
-        if clean_yield is not None:
-            acf_payload["yield"] = clean_yield
-
-        payload = {
-            "title": listing["title"].strip(),
-            "content": listing.get("description", "").strip(),
-            "status": "publish",
-            "acf": acf_payload,
-        }
-
-        # Determine input for featured image: local path first, then URL
-        featured_input = listing.get("image_path") or listing.get("image")
-        referer = listing.get("link") or listing.get("source_url") or "https://www.rightmove.co.uk/"
-
-        # Upload featured image
-        if featured_input:
-            featured_media_id = upload_image(featured_input, referer)
-            if featured_media_id:
-                payload["featured_media"] = featured_media_id
-            else:
-                print(f"[❌] Featured image failed for {listing['title']}: {featured_input}")
+            resp = session.patch(f"{WP_URL}/{post_id}", headers=_auth_headers(), json=payload, timeout=10)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            print(f"[⚠️] Update attempt {attempt}/{WP_POST_ATTEMPTS} failed ({payload['title']}): {e}")
+            continue
+        if resp.status_code in (404, 410):
+            return None
+        if resp.status_code < 500:
+            return resp
+        print(f"[⚠️] Update attempt {attempt}/{WP_POST_ATTEMPTS} failed ({payload['title']}): {resp.status_code}")
+    raise requests.ConnectionError(f"update of post {post_id} failed after {WP_POST_ATTEMPTS} attempts")
 
-        # Prepare gallery inputs: local paths first, then URL list
-        gallery_inputs = listing.get("image_paths") or listing.get("images", [])
-        gallery_ids = []
 
-        for img_input in gallery_inputs:
-            if img_input == featured_input:
+def _create_post(session, payload):
+    """POST a new post; returns its id or None. Each retry first checks whether the last attempt landed."""
+    for attempt in range(1, WP_POST_ATTEMPTS + 1):
+        if attempt > 1:
+            time.sleep(0.5 * 2 ** (attempt - 2))
+            try:
+                existing = find_post(payload["slug"], session)
+            except RequestException as e:
+                print(f"[⚠️] Post lookup failed for {payload['slug']} | {e}")
                 continue
-            img_id = upload_image(img_input, referer)
-            if img_id:
-                gallery_ids.append(img_id)
-            else:
-                print(f"[❌] Gallery image failed: {img_input}")
+            if existing:
+                print(f"[♻️] Posted (confirmed on retry): {payload['title']}")
+                return existing
+        try:
+            resp = session.post(WP_URL, headers=_auth_headers(), json=payload, timeout=10)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            print(f"[⚠️] Post attempt {attempt}/{WP_POST_ATTEMPTS} failed ({payload['title']}): {e}")
+            continue
+        if resp.status_code == 201:
+            return resp.json().get("id")
+        if resp.status_code < 500:
+            print(f"[❌] Post failed ({payload['title']}): {resp.status_code} | {resp.text}")
+            return None
+        print(f"[⚠️] Post attempt {attempt}/{WP_POST_ATTEMPTS} failed ({payload['title']}): {resp.status_code}")
+
+    print(f"[❌] Post failed ({payload['title']}) after {WP_POST_ATTEMPTS} attempts")
+    return None
 
+
+def push_to_wordpress(listing, session=None, media_pool=None, ledger=None):
+    """
+    Create, update or skip one listing. Returns "created", "updated" or
+    "skipped" on success and False on failure.
+
+    With a SyncLedger, a listing whose source data is unchanged since the last
+    successful push is skipped without any request, a known one is PATCHed in
+    place, and images already uploaded are referenced by their media ID.
+    """
+    session = session or get_session()
+    try:
+        if WP_DEBUG:
+            print("\n--- LISTING DATA ---")
+            print(json.dumps(listing, indent=2, ensure_ascii=False))
+            print("--- END LISTING DATA ---\n")
+
+        payload = build_payload(listing)
+        key = listing_key(listing)
+        digest = source_hash(listing, payload)
+        known = ledger.post(key) if ledger is not None else None
+        if known and known["hash"] == digest:
+            return "skipped"
+
+        # Known post (from the ledger, or found by slug when the ledger lost it): update in place
+        post_id = known["post_id"] if known else None
+        recovered = False
+        if post_id is None and ledger is not None:
+            post_id = find_post(payload["slug"], session)
+            recovered = post_id is not None
+
+        featured_media_id, gallery_ids, failed_uploads = upload_listing_media(
+            listing, session, media_pool, ledger, reuse_existing=recovered
+        )
+        if featured_media_id:
+            payload["featured_media"] = featured_media_id
         if gallery_ids:
             payload["acf"]["gallery"] = gallery_ids
+        if failed_uploads:
+            digest = None  # publish what we have, but don't mark it in sync: retry next run
 
-        # POST to WordPress
-        resp = requests.post(WP_URL, headers=headers, json=payload, timeout=10)
-        if resp.status_code == 201:
-            print(f"[✅] Posted: {payload['title']} with {len(gallery_ids)} extra images")
-            return True
-        else:
-            print(f"[❌] Post failed ({payload['title']}): {resp.status_code} | {resp.text}")
+        if post_id is not None:
+            resp = _update_post(session, post_id, payload)
+            if resp is None:
+                print(f"[⚠️] Post {post_id} no longer exists, re-creating: {payload['title']}")
+                ledger.forget_post(key)
+            elif resp.ok:
+                ledger.record_post(key, post_id, digest)
+                print(f"[🔄] Updated: {payload['title']} (post {post_id})")
+                return "updated"
+            else:
+                print(f"[❌] Update failed ({payload['title']}): {resp.status_code} | {resp.text}")
+                return False
+
+        post_id = _create_post(session, payload)
+        if post_id is None:
             return False
+        if ledger is not None:
+            ledger.record_post(key, post_id, digest)
+        print(f"[✅] Posted: {payload['title']} with {len(gallery_ids)} extra images")
+        return "created"
 
     except RequestException as e:
         print(f"[❌] Exception posting {listing.get('title')}: {e}")
         return False
+
+
+def publish_listings(listings, post_workers=WP_POST_WORKERS, media_workers=WP_MEDIA_WORKERS, ledger=None):
+    """
+    Push listings from a worker pool over one keep-alive session. Media uploads
+    for all listings share a separate bounded pool, so a listing with a large
+    gallery can't monopolise the connections. The sync ledger (loaded from
+    WP_SYNC_LEDGER when not given) is saved as results come in and at the end.
+
+    Yields (listing, result, error) as each listing finishes, where result is
+    what push_to_wordpress returned.
+    """
+    session = get_session()
+    ledger = ledger if ledger is not None else SyncLedger()
+    try:
+        with ThreadPoolExecutor(max_workers=media_workers, thread_name_prefix="wp-media") as media_pool, \
+                ThreadPoolExecutor(max_workers=post_workers, thread_name_prefix="wp-post") as post_pool:
+            futures = {
+                post_pool.submit(push_to_wordpress, listing, session, media_pool, ledger): listing
+                for listing in listings
+            }
+            for n, future in enumerate(as_completed(futures), 1):
+                listing = futures[future]
+                if n % 25 == 0:
+                    ledger.save()
+                try:
+                    yield listing, future.result(), None
+                except Exception as e:
+                    yield listing, False, e
+    finally:
+        ledger.save()